@@ -1,8 +1,25 @@
+import multiprocessing
+import tracemalloc
 from dataclasses import dataclass
 from time import perf_counter_ns
-from typing import cast
+from typing import Any, cast
 
-from src.engine.ecs import ECS, Component, Entity
+import numpy as np
+import numpy.typing as npt
+
+from src.engine.constants import (
+    COMPONENT_STORAGE_COLUMNAR,
+    COMPONENT_STORAGE_SPARSE,
+)
+from src.engine.ecs import (
+    ECS,
+    Component,
+    Entity,
+    OnAdd,
+    OnChange,
+    OnRemove,
+)
+from src.engine.ecs.processes import ProcessPool
 
 
 @dataclass
@@ -23,6 +40,40 @@ class Acceleration(Component):
     dy: float
 
 
+@dataclass
+class OnFire(Component): ...
+
+
+@dataclass
+class Selected(Component):
+    storage = COMPONENT_STORAGE_SPARSE
+
+
+@dataclass
+class ColumnarPosition(Component):
+    storage = COMPONENT_STORAGE_COLUMNAR
+    x: float
+    y: float
+
+
+@dataclass
+class ColumnarVelocity(Component):
+    storage = COMPONENT_STORAGE_COLUMNAR
+    dx: float
+    dy: float
+
+
+def pure_python_movement(
+    columns: dict[type[Component], npt.NDArray[Any]], dt: float
+) -> None:
+    positions = columns[ColumnarPosition]
+    velocities = columns[ColumnarVelocity]
+    for row in range(len(positions)):
+        x, y = positions[row]
+        dx, dy = velocities[row]
+        positions[row] = (x + dx * dt, y + dy * dt)
+
+
 if __name__ == "__main__":
     ecs = ECS()
     samples: list[float] = []
@@ -63,6 +114,131 @@ if __name__ == "__main__":
         samples.append(perf_counter_ns() - t0)
     print(f"avg {sum(samples) / steps} ns/call")
 
+    samples = []
+    print(f"Bench query after structural change ({steps}):", end=" ")
+    for _ in range(steps):
+        ecs.set_components(entities[0], components)
+        t0 = perf_counter_ns()
+        _ = ecs.query([Position, Velocity])
+        samples.append(perf_counter_ns() - t0)
+    print(f"avg {sum(samples) / steps} ns/call")
+
+    samples = []
+    print(f"Bench query chunks after structural change ({steps}):", end=" ")
+    for _ in range(steps):
+        ecs.set_components(entities[0], components)
+        t0 = perf_counter_ns()
+        for _ in ecs.query_chunks(Position, Velocity):
+            pass
+        samples.append(perf_counter_ns() - t0)
+    print(f"avg {sum(samples) / steps} ns/call")
+
+    samples = []
+    print(f"Bench query without OnFire chunks ({steps}):", end=" ")
+    for _ in range(steps):
+        t0 = perf_counter_ns()
+        for _ in ecs.query_chunks(Position, Velocity, without=[OnFire]):
+            pass
+        samples.append(perf_counter_ns() - t0)
+    print(f"avg {sum(samples) / steps} ns/call")
+
+    samples = []
+    print(f"Bench movement system ({steps}):", end=" ")
+    for _ in range(steps):
+        t0 = perf_counter_ns()
+        _, result = ecs.query([Position, Velocity])
+        for pos, vel in zip(result[Position], result[Velocity]):
+            pos.x += vel.dx * 0.016
+            pos.y += vel.dy * 0.016
+        samples.append(perf_counter_ns() - t0)
+    print(f"avg {sum(samples) / steps} ns/call")
+
+    samples = []
+    print(f"Bench movement system, iter ({steps}):", end=" ")
+    for _ in range(steps):
+        t0 = perf_counter_ns()
+        for _, (pos, vel) in ecs.iter(Position, Velocity):
+            pos.x += vel.dx * 0.016
+            pos.y += vel.dy * 0.016
+        samples.append(perf_counter_ns() - t0)
+    print(f"avg {sum(samples) / steps} ns/call")
+
+    columnar_ecs = ECS()
+    for _ in range(n):
+        entity = columnar_ecs.spawn()
+        columnar_ecs.set_components(
+            entity,
+            [ColumnarPosition(x=0, y=0), ColumnarVelocity(dx=1, dy=1)],
+        )
+
+    samples = []
+    print(f"Bench columnar movement system ({steps}):", end=" ")
+    for _ in range(steps):
+        t0 = perf_counter_ns()
+        _, result = columnar_ecs.query([ColumnarPosition, ColumnarVelocity])
+        result[ColumnarPosition] += result[ColumnarVelocity] * 0.016
+        samples.append(perf_counter_ns() - t0)
+    print(f"avg {sum(samples) / steps} ns/call")
+
+    samples = []
+    print(f"Bench set components, add one tag ({n}):", end=" ")
+    for entity in entities:
+        components = cast(
+            list[Component],
+            [
+                Position(x=0, y=0),
+                Velocity(dx=1, dy=1),
+                Acceleration(dx=1, dy=1),
+                OnFire(),
+            ],
+        )
+        t0 = perf_counter_ns()
+        ecs.set_components(entity, components)
+        samples.append(perf_counter_ns() - t0)
+    print(f"avg {sum(samples) / n} ns/call")
+
+    samples = []
+    print(f"Bench remove component ({n}):", end=" ")
+    for entity in entities:
+        t0 = perf_counter_ns()
+        ecs.remove_component(entity, OnFire)
+        samples.append(perf_counter_ns() - t0)
+    print(f"avg {sum(samples) / n} ns/call")
+
+    samples = []
+    print(f"Bench add component ({n}):", end=" ")
+    for entity in entities:
+        t0 = perf_counter_ns()
+        ecs.add_component(entity, OnFire())
+        samples.append(perf_counter_ns() - t0)
+    print(f"avg {sum(samples) / n} ns/call")
+
+    samples = []
+    print(f"Bench add sparse component ({n}):", end=" ")
+    for entity in entities:
+        t0 = perf_counter_ns()
+        ecs.add_component(entity, Selected())
+        samples.append(perf_counter_ns() - t0)
+    print(f"avg {sum(samples) / n} ns/call")
+
+    samples = []
+    print(f"Bench remove sparse component ({n}):", end=" ")
+    for entity in entities:
+        t0 = perf_counter_ns()
+        ecs.remove_component(entity, Selected)
+        samples.append(perf_counter_ns() - t0)
+    print(f"avg {sum(samples) / n} ns/call")
+
+    for entity in entities[:: n // 100]:
+        ecs.add_component(entity, Selected())
+    samples = []
+    print(f"Bench query joining 100 sparse tags ({steps}):", end=" ")
+    for _ in range(steps):
+        t0 = perf_counter_ns()
+        _ = ecs.query([Position, Selected])
+        samples.append(perf_counter_ns() - t0)
+    print(f"avg {sum(samples) / steps} ns/call")
+
     samples = []
     print(f"Bench entity remove ({n}):", end=" ")
     for entity in entities:
@@ -70,3 +246,205 @@ if __name__ == "__main__":
         ecs.remove(entity)
         samples.append(perf_counter_ns() - t0)
     print(f"avg {sum(samples) / n} ns/call")
+
+    for count in (100_000, 1_000_000):
+        positions = [Position(x=0, y=0) for _ in range(count)]
+        velocities = [Velocity(dx=1, dy=1) for _ in range(count)]
+        accelerations = [Acceleration(dx=1, dy=1) for _ in range(count)]
+
+        print(f"Bench per-entity spawn + set components ({count}):", end=" ")
+        ecs = ECS()
+        t0 = perf_counter_ns()
+        for i in range(count):
+            entity = ecs.spawn()
+            ecs.set_components(
+                entity, [positions[i], velocities[i], accelerations[i]]
+            )
+        print(f"total {(perf_counter_ns() - t0) / 1e6} ms")
+
+        print(f"Bench spawn batch ({count}):", end=" ")
+        ecs = ECS()
+        t0 = perf_counter_ns()
+        _ = ecs.spawn_batch(
+            count,
+            {
+                Position: positions,
+                Velocity: velocities,
+                Acceleration: accelerations,
+            },
+        )
+        print(f"total {(perf_counter_ns() - t0) / 1e6} ms")
+
+    ecs = ECS()
+    entities = ecs.spawn_batch(
+        n,
+        {
+            Position: [Position(x=0, y=0) for _ in range(n)],
+            Velocity: [Velocity(dx=1, dy=1) for _ in range(n)],
+        },
+    )
+    for entity in entities[::2]:
+        ecs.commands.add_component(entity, OnFire())
+    for entity in entities[1::2]:
+        ecs.commands.remove(entity)
+    print(f"Bench commands flush ({n}):", end=" ")
+    t0 = perf_counter_ns()
+    ecs.commands.apply()
+    print(f"avg {(perf_counter_ns() - t0) / n} ns/command")
+
+    count = 100_000
+    ecs = ECS()
+    entities = ecs.spawn_batch(
+        count, {Position: [Position(x=0, y=0) for _ in range(count)]}
+    )
+    index: set[Entity] = set(entities)
+    ecs.observe(OnAdd[Position], index.update)
+    ecs.observe(OnRemove[Position], index.difference_update)
+    ecs.observe(OnChange[Position], index.update)
+    samples = []
+    rebuilds = []
+    for step in range(steps):
+        for entity in entities[step * 100 : step * 100 + 100]:
+            ecs.mark_changed(entity, Position)
+            ecs.commands.remove(entity)
+            ecs.commands.spawn([Position(x=1, y=1)])
+        t0 = perf_counter_ns()
+        ecs.commands.apply()
+        samples.append(perf_counter_ns() - t0)
+
+        t0 = perf_counter_ns()
+        rebuilt = set(ecs.query([Position])[0])
+        rebuilds.append(perf_counter_ns() - t0)
+        assert rebuilt == index
+    print(
+        f"Bench observed index, 300 changes/tick ({count}):"
+        + f" avg {sum(samples) / steps} ns/tick,"
+        + f" full rebuild avg {sum(rebuilds) / steps} ns/tick"
+    )
+
+    count = 1_000_000
+    chunk = np.zeros((1000, 2))
+    for reserved in (False, True):
+        ecs = ECS()
+        t0 = perf_counter_ns()
+        if reserved:
+            _ = ecs.reserve([ColumnarPosition, ColumnarVelocity], count)
+        for _ in range(count // len(chunk)):
+            _ = ecs.spawn_batch(
+                len(chunk), {ColumnarPosition: chunk, ColumnarVelocity: chunk}
+            )
+        print(
+            f"Bench columnar spawn in chunks of {len(chunk)}"
+            + f"{', reserved' if reserved else ''} ({count}):"
+            + f" total {(perf_counter_ns() - t0) / 1e6} ms"
+        )
+
+    entities = ecs.query([ColumnarPosition])[0]
+    ecs.remove_batch(entities[count // 10 :])
+    for entity in entities[: count // 10 : 1000]:
+        ecs.add_component(entity, OnFire())
+        ecs.add_component(entity, Selected())
+        ecs.remove_component(entity, OnFire)
+    before = ecs.fragmentation()
+    t0 = perf_counter_ns()
+    dropped = ecs.compact()
+    elapsed = (perf_counter_ns() - t0) / 1e6
+    after = ecs.fragmentation()
+    print(
+        f"Bench compact ({count}): {elapsed} ms, {dropped} archetypes dropped,"
+        + f" slack {before.slack_bytes / 2**20:.1f} MiB"
+        + f" -> {after.slack_bytes / 2**20:.1f} MiB"
+    )
+
+    count = 100_000
+    ecs = ECS()
+    entities = ecs.spawn_batch(
+        count,
+        {
+            Position: [Position(x=0, y=0) for _ in range(count)],
+            ColumnarPosition: np.zeros((count, 2)),
+        },
+    )
+    for entity in entities[::3]:
+        ecs.add_component(entity, OnFire())
+    picked = np.random.default_rng(0).choice(entities, 10_000, replace=False)
+    picked_list = picked.tolist()
+
+    t0 = perf_counter_ns()
+    for entity in picked_list:
+        archetype, row = ecs.entities[entity]
+        _ = ecs.components[archetype][ColumnarPosition][row]
+    print(
+        f"Bench columnar gather, per-entity loop ({len(picked)}):"
+        + f" total {(perf_counter_ns() - t0) / 1e6} ms"
+    )
+    for component_type in (ColumnarPosition, Position):
+        t0 = perf_counter_ns()
+        _ = ecs.get_many(picked, component_type)
+        print(
+            f"Bench get_many {component_type.__name__} ({len(picked)}):"
+            + f" total {(perf_counter_ns() - t0) / 1e6} ms"
+        )
+    values = np.ones((len(picked), 2))
+    t0 = perf_counter_ns()
+    ecs.set_many(picked, ColumnarPosition, values)
+    print(
+        f"Bench set_many ColumnarPosition ({len(picked)}):"
+        + f" total {(perf_counter_ns() - t0) / 1e6} ms"
+    )
+
+    count = 1_000_000
+    print(f"Bench entity locations, dict of tuples ({count}):", end=" ")
+    tracemalloc.start()
+    locations = {entity: (0, entity) for entity in range(count)}
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{size / 2**20:.1f} MiB")
+    del locations
+
+    print(f"Bench entity locations, entity table ({count}):", end=" ")
+    ecs = ECS()
+    tracemalloc.start()
+    _ = ecs.spawn_batch(count, {})
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    print(
+        f"{ecs.entities.nbytes() / 2**20:.1f} MiB table,"
+        + f" {sum(s.size for s in snapshot.statistics('filename')) / 2**20:.1f}"
+        + " MiB total with the row list and ids"
+    )
+
+    count = 200_000
+    shared_ecs = ECS(shared_columns=True)
+    _ = shared_ecs.spawn_batch(
+        count,
+        {
+            ColumnarPosition: np.zeros((count, 2)),
+            ColumnarVelocity: np.ones((count, 2)),
+        },
+    )
+    for workers in (1, 2, 4, 8):
+        pool = ProcessPool(
+            shared_ecs,
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+        )
+        # warm up the workers, so process startup isn't measured.
+        pool.run(pure_python_movement, [ColumnarPosition, ColumnarVelocity])
+
+        samples = []
+        print(
+            f"Bench process pool movement ({count}, {workers} workers):",
+            end=" ",
+        )
+        for _ in range(5):
+            t0 = perf_counter_ns()
+            pool.run(
+                pure_python_movement,
+                [ColumnarPosition, ColumnarVelocity],
+                dt=0.016,
+                mutable=[ColumnarPosition],
+            )
+            samples.append(perf_counter_ns() - t0)
+        print(f"avg {sum(samples) / len(samples) / 1e6:.1f} ms/call")
+        pool.shutdown()
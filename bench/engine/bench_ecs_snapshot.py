@@ -0,0 +1,105 @@
+import os
+import pickle
+import tempfile
+from dataclasses import dataclass
+from time import perf_counter_ns
+
+import numpy as np
+
+from src.engine.constants import COMPONENT_STORAGE_COLUMNAR
+from src.engine.ecs import ECS, Component
+from src.engine.ecs.snapshot import load, save
+
+
+@dataclass
+class Position(Component):
+    x: float
+    y: float
+
+
+@dataclass
+class Velocity(Component):
+    dx: float
+    dy: float
+
+
+@dataclass
+class ColumnarPosition(Component):
+    storage = COMPONENT_STORAGE_COLUMNAR
+    x: float
+    y: float
+
+
+@dataclass
+class ColumnarVelocity(Component):
+    storage = COMPONENT_STORAGE_COLUMNAR
+    dx: float
+    dy: float
+
+
+def bench(name: str, ecs: ECS, n: int, directory: str) -> None:
+    path = os.path.join(directory, f"{name}.ecs")
+    component_types = list(ecs.types.values())
+
+    t0 = perf_counter_ns()
+    size = save(ecs, path)
+    elapsed = (perf_counter_ns() - t0) / 1e9
+    print(
+        f"Bench snapshot save, {name} ({n}):"
+        + f" {elapsed * 1e3:.1f} ms, {size / 2**20:.1f} MiB,"
+        + f" {size / 2**20 / elapsed:.0f} MiB/s"
+    )
+
+    t0 = perf_counter_ns()
+    _ = load(path, component_types)
+    elapsed = (perf_counter_ns() - t0) / 1e9
+    print(
+        f"Bench snapshot load, {name} ({n}):"
+        + f" {elapsed * 1e3:.1f} ms, {n / elapsed / 1e6:.1f} M entities/s"
+    )
+
+    pickle_path = os.path.join(directory, f"{name}.pickle")
+    t0 = perf_counter_ns()
+    with open(pickle_path, "wb") as file:
+        pickle.dump(
+            (dict(ecs.entities), ecs.entity_rows, ecs.components, ecs.types),
+            file,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+    elapsed = (perf_counter_ns() - t0) / 1e9
+    size = os.path.getsize(pickle_path)
+    print(
+        f"Bench pickle dump, {name} ({n}):"
+        + f" {elapsed * 1e3:.1f} ms, {size / 2**20:.1f} MiB"
+    )
+
+    t0 = perf_counter_ns()
+    with open(pickle_path, "rb") as file:
+        _ = pickle.load(file)
+    elapsed = (perf_counter_ns() - t0) / 1e9
+    print(f"Bench pickle load, {name} ({n}): {elapsed * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    n = 1_000_000
+
+    with tempfile.TemporaryDirectory() as directory:
+        ecs = ECS()
+        _ = ecs.spawn_batch(
+            n,
+            {
+                Position: [Position(x=i, y=i) for i in range(n)],
+                Velocity: [Velocity(dx=1, dy=1) for _ in range(n)],
+            },
+        )
+        bench("table", ecs, n, directory)
+
+        ecs = ECS()
+        _ = ecs.spawn_batch(
+            n,
+            {
+                ColumnarPosition: np.zeros((n, 2)),
+                ColumnarVelocity: np.ones((n, 2)),
+            },
+        )
+        bench("columnar", ecs, n, directory)
@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+from time import perf_counter_ns
+
+import numpy as np
+
+from src.engine.constants import COMPONENT_STORAGE_COLUMNAR
+from src.engine.ecs import ECS, Component, SpatialIndex
+
+# entities per unit of area, kept constant so the neighbourhood size is too.
+DENSITY = 0.25
+RADIUS = 4.0
+QUERIES = 200
+
+
+@dataclass
+class Position(Component):
+    storage = COMPONENT_STORAGE_COLUMNAR
+    x: float
+    y: float
+
+
+def timed(name: str, n: int, calls: int, func) -> float:
+    t0 = perf_counter_ns()
+    for _ in range(calls):
+        _ = func()
+    avg = (perf_counter_ns() - t0) / calls
+    print(f"Bench {name} ({n}): avg {avg:.0f} ns/call")
+    return avg
+
+
+def bench(n: int) -> None:
+    rng = np.random.default_rng(0)
+    side = (n / DENSITY) ** 0.5
+    ecs = ECS()
+    _ = ecs.spawn_batch(n, {Position: rng.uniform(0, side, (n, 2))})
+
+    index = SpatialIndex(ecs, Position, cell_size=RADIUS)
+    t0 = perf_counter_ns()
+    _ = index.sync()
+    print(
+        f"Bench spatial sync, full ({n}):"
+        + f" {(perf_counter_ns() - t0) / 1e6:.1f} ms"
+    )
+
+    centers = iter(rng.uniform(0, side, (QUERIES * 2, 2)).tolist())
+    indexed = timed(
+        "spatial query_radius",
+        n,
+        QUERIES,
+        lambda: index.query_radius(next(centers), RADIUS),
+    )
+
+    def brute_force() -> list[int]:
+        entities, components = ecs.query([Position])
+        center = np.array(next(centers))
+        distances = ((components[Position] - center) ** 2).sum(axis=1)
+        return [entities[i] for i in np.flatnonzero(distances <= RADIUS**2)]
+
+    scanned = timed("brute force radius query", n, QUERIES, brute_force)
+    print(f"Bench spatial query speedup ({n}): {scanned / indexed:.1f}x")
+
+    _ = timed(
+        "spatial query_aabb",
+        n,
+        QUERIES,
+        lambda: index.query_aabb(
+            (side / 2, side / 2), (side / 2 + RADIUS, side / 2 + RADIUS)
+        ),
+    )
+
+    # move a tenth of the entities, as a movement system would.
+    for entities, (columns,) in ecs.query_chunks(Position):
+        moved = len(entities) // 10
+        columns[:moved] += 1.0
+        for entity in entities[:moved]:
+            ecs.mark_changed(entity, Position)
+    t0 = perf_counter_ns()
+    synced = index.sync()
+    print(
+        f"Bench spatial sync, {synced} changed ({n}):"
+        + f" {(perf_counter_ns() - t0) / 1e6:.1f} ms"
+    )
+
+    t0 = perf_counter_ns()
+    pairs = index.pairs(1.0)
+    print(
+        f"Bench spatial pairs, {len(pairs)} found ({n}):"
+        + f" {(perf_counter_ns() - t0) / 1e6:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    for n in (1_000, 10_000, 100_000):
+        bench(n)
@@ -0,0 +1,257 @@
+import asyncio
+import gc
+import sys
+import threading
+import tracemalloc
+from dataclasses import make_dataclass
+from time import perf_counter_ns
+
+from src.engine.constants import (
+    EVENT_COALESCE_LATEST,
+    EVENT_QUEUE_DROP_OLDEST,
+)
+from src.engine.event_manager import Event, EventManager
+from src.engine.events import (
+    DebugDrawCall,
+    DrawCall,
+    InputEvent,
+    KeyEvent,
+    MouseMoveEvent,
+    UpdateTick,
+)
+
+LISTENERS = 4
+# cursor samples per frame, like a 1000 Hz mouse at 60 fps.
+SAMPLES_PER_FRAME = 16
+
+
+def listener(event: MouseMoveEvent) -> None:
+    _ = event.x * event.y
+
+
+def bench_dispatcher(n: int, **kwargs) -> None:
+    events = EventManager()
+    for _ in range(LISTENERS):
+        events.listen(MouseMoveEvent, listener, threadsafe=True, **kwargs)
+    threads = threading.active_count()
+
+    t0 = perf_counter_ns()
+    for i in range(n):
+        events.emit(MouseMoveEvent(i, i))
+    emitted = perf_counter_ns() - t0
+    _ = events.join()
+    total = perf_counter_ns() - t0
+
+    dropped = sum(
+        q.dropped for q in events.threadsafe_listeners[MouseMoveEvent]
+    )
+    policy = kwargs.get("policy", "block")
+    print(
+        f"Bench dispatcher emit, {policy} ({n}):"
+        + f" avg {emitted / n:.0f} ns/event,"
+        + f" delivered in {total / 1e6:.1f} ms,"
+        + f" {dropped} dropped,"
+        + f" {threading.active_count() - threads} extra threads"
+    )
+    events.shutdown()
+
+
+def bench_to_thread(n: int) -> None:
+    """The previous approach: one `asyncio.to_thread` per listener per event."""
+
+    async def emit_all() -> None:
+        tasks = []
+        for i in range(n):
+            event = MouseMoveEvent(i, i)
+            for _ in range(LISTENERS):
+                tasks.append(
+                    asyncio.create_task(asyncio.to_thread(listener, event))
+                )
+        _ = await asyncio.gather(*tasks)
+
+    t0 = perf_counter_ns()
+    asyncio.run(emit_all())
+    total = perf_counter_ns() - t0
+    print(
+        f"Bench asyncio.to_thread emit ({n}):"
+        + f" avg {total / n:.0f} ns/event, delivered in {total / 1e6:.1f} ms"
+    )
+
+
+def bench_coalescing(frames: int, queued: bool) -> None:
+    events = EventManager()
+    calls = 0
+
+    def on_mouse_move(event: MouseMoveEvent) -> None:
+        nonlocal calls
+        calls += 1
+        listener(event)
+
+    events.listen(MouseMoveEvent, on_mouse_move)
+    if queued:
+        _ = events.queue(MouseMoveEvent, DrawCall, EVENT_COALESCE_LATEST)
+
+    t0 = perf_counter_ns()
+    for frame in range(frames):
+        for i in range(SAMPLES_PER_FRAME):
+            events.emit(MouseMoveEvent(frame, i))
+        events.emit(DrawCall(dt=1 / 60))
+    total = perf_counter_ns() - t0
+    mode = "latest" if queued else "unqueued"
+    print(
+        f"Bench mouse moves, {mode} ({frames} frames):"
+        + f" avg {total / frames:.0f} ns/frame, {calls} listener calls"
+    )
+    events.shutdown()
+
+
+def bench_dispatch_tables(n: int) -> None:
+    """Emit `DrawCall` among listeners of unrelated and base event types."""
+
+    events = EventManager()
+    for event_type in (DrawCall, UpdateTick, KeyEvent, MouseMoveEvent):
+        for priority in range(4):
+            events.listen(event_type, listener_noop, priority=priority)
+    events.listen(InputEvent, listener_noop)
+    events.listen(Event, listener_noop)
+    event = DrawCall(dt=1 / 60)
+
+    t0 = perf_counter_ns()
+    for _ in range(n):
+        events.emit(event)
+    table = (perf_counter_ns() - t0) / n
+
+    # what checking every listener with isinstance would cost instead.
+    registered = [
+        (event_type, listener.callback)
+        for event_type, listeners in events.listeners.items()
+        for listener in listeners
+    ]
+    t0 = perf_counter_ns()
+    for _ in range(n):
+        for event_type, callback in registered:
+            if isinstance(event, event_type):
+                callback(event)
+    scan = (perf_counter_ns() - t0) / n
+
+    print(
+        f"Bench DrawCall emit ({n}): dispatch table avg {table:.0f} ns,"
+        + f" isinstance scan avg {scan:.0f} ns"
+    )
+    events.shutdown()
+
+
+def bench_stats(n: int) -> None:
+    """The cost of instrumentation on a `DrawCall` with four listeners."""
+
+    events = EventManager()
+    for _ in range(4):
+        events.listen(DrawCall, listener_noop)
+    event = DrawCall(dt=1 / 60)
+
+    def emit_all() -> float:
+        t0 = perf_counter_ns()
+        for _ in range(n):
+            events.emit(event)
+        return (perf_counter_ns() - t0) / n
+
+    disabled = emit_all()
+    _ = events.enable_stats()
+    enabled = emit_all()
+    print(
+        f"Bench DrawCall emit with stats ({n}): disabled avg {disabled:.0f} ns,"
+        + f" enabled avg {enabled:.0f} ns"
+    )
+    events.shutdown()
+
+
+# the events as they were before being slotted.
+DICT_EVENTS = {
+    event_type: make_dataclass(
+        f"Dict{event_type.__name__}",
+        [(name, float) for name in event_type.__dataclass_fields__],
+        bases=(Event,),
+    )
+    for event_type in (DrawCall, DebugDrawCall, UpdateTick, MouseMoveEvent)
+}
+
+
+def bench_frame_allocations(frames: int, reuse: bool) -> None:
+    """A frame's events: the three frame events plus queued mouse moves."""
+
+    events = EventManager()
+    types = {t: t for t in DICT_EVENTS} if reuse else DICT_EVENTS
+    mouse_move = types[MouseMoveEvent]
+    frame_types = [types[t] for t in (DrawCall, DebugDrawCall, UpdateTick)]
+    for event_type in (*frame_types, mouse_move):
+        events.listen(event_type, listener_noop)
+    _ = events.queue(mouse_move, frame_types[0], EVENT_COALESCE_LATEST)
+    reused = [events.reuse(t(1 / 60)) for t in frame_types]
+
+    def frame() -> None:
+        for i in range(SAMPLES_PER_FRAME):
+            events.emit(mouse_move(i, i))
+        if reuse:
+            for event in reused:
+                event.dt = 1 / 60
+                events.emit(event)
+        else:
+            for event_type in frame_types:
+                events.emit(event_type(1 / 60))
+
+    frame()
+    collections = [0]
+
+    def count(phase: str, info: dict[str, int]) -> None:
+        if phase == "start":
+            collections[0] += 1
+
+    gc.collect()
+    gc.callbacks.append(count)
+    t0 = perf_counter_ns()
+    for _ in range(frames):
+        frame()
+    elapsed = (perf_counter_ns() - t0) / frames
+    gc.callbacks.remove(count)
+
+    tracemalloc.start()
+    frame()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    frame()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    sample = mouse_move(0, 0)
+    size = sys.getsizeof(sample)
+    if hasattr(sample, "__dict__"):
+        size += sys.getsizeof(sample.__dict__)
+    mode = "slotted, reused" if reuse else "dict, allocated"
+    print(
+        f"Bench frame events, {mode} ({frames} frames):"
+        + f" avg {elapsed:.0f} ns/frame, {size} B per input event,"
+        + f" {peak - current} B peak per frame,"
+        + f" {collections[0]} gc collections"
+    )
+    events.shutdown()
+
+
+def listener_noop(event: Event) -> None:
+    _ = event
+
+
+if __name__ == "__main__":
+    for reuse in (False, True):
+        bench_frame_allocations(100_000, reuse)
+    bench_dispatch_tables(100_000)
+    bench_stats(100_000)
+    for frames in (1_000, 10_000):
+        bench_coalescing(frames, queued=False)
+        bench_coalescing(frames, queued=True)
+
+    for n in (1_000, 10_000, 100_000):
+        bench_dispatcher(n)
+        bench_dispatcher(n, queue_size=1, policy=EVENT_QUEUE_DROP_OLDEST)
+        # a thread per callback gets too slow to wait for beyond this.
+        if n <= 10_000:
+            bench_to_thread(n)
@@ -0,0 +1,12 @@
+"""Scenario benchmarks for the ECS.
+
+Run every scenario, or a few of them, with::
+
+    python -m bench.engine.ecs [--scenario NAME ...] [--scale 0.1]
+        [--json results.json] [--baseline baseline.json] [--threshold 0.1]
+
+Every scenario reports p50/p99/mean time per operation and the memory of
+its world. `--json` writes the results, which can be passed back as
+`--baseline` after a change to see its effect. Scenarios whose p50 regressed
+by more than `--threshold` make the run exit with status 1.
+"""
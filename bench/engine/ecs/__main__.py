@@ -0,0 +1,72 @@
+import argparse
+import sys
+
+from .harness import load, regressions, report, run, save
+from .scenarios import SCENARIOS
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.engine.ecs",
+        description="Run the ECS benchmark scenarios.",
+    )
+    _ = parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=[scenario.name for scenario in SCENARIOS],
+        help="only run this scenario, may be repeated",
+    )
+    _ = parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="multiply every scenario's entity count",
+    )
+    _ = parser.add_argument("--json", help="write the results to this file")
+    _ = parser.add_argument(
+        "--baseline", help="compare against results written by --json"
+    )
+    _ = parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="p50 slowdown counted as a regression, 0.1 being 10%%",
+    )
+    _ = parser.add_argument(
+        "--list", action="store_true", help="list the scenarios and exit"
+    )
+    args = parser.parse_args()
+
+    if args.list:
+        for scenario in SCENARIOS:
+            print(f"{scenario.name}: {scenario.description}")
+        return 0
+
+    baseline = load(args.baseline) if args.baseline else {}
+    selected = [
+        scenario
+        for scenario in SCENARIOS
+        if not args.scenario or scenario.name in args.scenario
+    ]
+
+    results = []
+    for scenario in selected:
+        result = run(scenario, args.scale)
+        results.append(result)
+        print(report(result, baseline.get(result.name)), flush=True)
+
+    if args.json:
+        save(results, args.json)
+
+    regressed = regressions(results, baseline, args.threshold)
+    if regressed:
+        print(
+            f"Regressed by more than {args.threshold:.0%}:"
+            + f" {', '.join(regressed)}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""Timing, memory accounting and baseline comparison for ECS scenarios."""
+
+import gc
+import json
+import platform
+import sys
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from os import PathLike
+from time import perf_counter_ns
+from typing import Any
+
+import numpy as np
+
+SCHEMA_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """A benchmark: a world to build and an operation to time on it.
+
+    Attributes:
+        name: Unique name, used to match results against baselines.
+        description: What is being measured, for the report.
+        setup: Builds the world for `size` entities and returns the timed
+            step, which is called once per sample. Everything allocated
+            by `setup` counts towards the scenario's memory.
+        size: The default number of entities, scaled by `--scale`.
+        samples: The number of timed steps.
+        ops_per_sample: How many operations one step performs, so results
+            are reported per operation.
+    """
+
+    name: str
+    description: str
+    setup: Callable[[int], Callable[[], object]]
+    size: int
+    samples: int = 200
+    ops_per_sample: int = 1
+
+
+@dataclass(frozen=True)
+class Result:
+    """The measurements of one scenario run, in nanoseconds per operation.
+
+    Attributes:
+        name: The scenario's name.
+        size: The number of entities it ran with.
+        samples: The number of timed steps.
+        p50_ns: Median time per operation.
+        p99_ns: 99th percentile time per operation.
+        mean_ns: Mean time per operation.
+        setup_ms: How long building the world took.
+        memory_bytes: Memory held by the world once built, per tracemalloc.
+    """
+
+    name: str
+    size: int
+    samples: int
+    p50_ns: float
+    p99_ns: float
+    mean_ns: float
+    setup_ms: float
+    memory_bytes: int
+
+
+def run(scenario: Scenario, scale: float = 1.0) -> Result:
+    """Build a scenario's world and time its step.
+
+    The world is built twice: once under tracemalloc to measure its memory
+    and once without, so tracing doesn't slow the timed steps down.
+    """
+
+    size = max(1, int(scenario.size * scale))
+
+    gc.collect()
+    tracemalloc.start()
+    step = scenario.setup(size)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del step
+    gc.collect()
+
+    t0 = perf_counter_ns()
+    step = scenario.setup(size)
+    setup_ms = (perf_counter_ns() - t0) / 1e6
+
+    # one untimed step to warm up caches.
+    _ = step()
+    samples = np.empty(scenario.samples, dtype=np.float64)
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for i in range(scenario.samples):
+            t0 = perf_counter_ns()
+            _ = step()
+            samples[i] = perf_counter_ns() - t0
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    samples /= scenario.ops_per_sample
+    return Result(
+        name=scenario.name,
+        size=size,
+        samples=scenario.samples,
+        p50_ns=float(np.percentile(samples, 50)),
+        p99_ns=float(np.percentile(samples, 99)),
+        mean_ns=float(samples.mean()),
+        setup_ms=setup_ms,
+        memory_bytes=memory,
+    )
+
+
+def report(result: Result, baseline: Result | None = None) -> str:
+    line = (
+        f"Bench {result.name} ({result.size}):"
+        + f" p50 {result.p50_ns:.0f} ns, p99 {result.p99_ns:.0f} ns,"
+        + f" mean {result.mean_ns:.0f} ns/op,"
+        + f" {result.memory_bytes / 2**20:.1f} MiB"
+    )
+    if baseline is not None and baseline.size != result.size:
+        line += f" | not comparable, baseline ran at {baseline.size}"
+    elif baseline is not None:
+        line += (
+            f" | p50 {change(baseline.p50_ns, result.p50_ns):+.1%},"
+            + f" p99 {change(baseline.p99_ns, result.p99_ns):+.1%},"
+            + f" memory {change(baseline.memory_bytes, result.memory_bytes):+.1%}"
+            + " vs baseline"
+        )
+    return line
+
+
+def change(before: float, after: float) -> float:
+    """The relative change from `before` to `after`, 0.1 being 10% worse."""
+
+    if not before:
+        return 0.0
+    return (after - before) / before
+
+
+def regressions(
+    results: list[Result], baseline: dict[str, Result], threshold: float
+) -> list[str]:
+    """The names of scenarios whose p50 got worse than `threshold`.
+
+    Scenarios which ran at a different size than their baseline aren't
+    comparable and are skipped.
+    """
+
+    return [
+        result.name
+        for result in results
+        if (before := baseline.get(result.name)) is not None
+        and before.size == result.size
+        and change(before.p50_ns, result.p50_ns) > threshold
+    ]
+
+
+def save(results: list[Result], path: str | PathLike[str]) -> None:
+    document: dict[str, Any] = {
+        "version": SCHEMA_VERSION,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": [asdict(result) for result in results],
+    }
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2)
+        _ = file.write("\n")
+
+
+def load(path: str | PathLike[str]) -> dict[str, Result]:
+    """Read results written by :py:func:`save`, keyed by scenario name.
+
+    Raises:
+        ValueError: if the file was written by an incompatible version.
+    """
+
+    with open(path) as file:
+        document = json.load(file)
+    if document.get("version") != SCHEMA_VERSION:
+        raise ValueError(
+            f"Unsupported benchmark results version {document.get('version')}"
+        )
+    return {saved["name"]: Result(**saved) for saved in document["results"]}
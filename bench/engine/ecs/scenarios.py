@@ -0,0 +1,327 @@
+"""The ECS benchmark scenarios.
+
+Each setup function builds a world of `n` entities and returns the step to
+time on it. They only use the public ECS API, so the same scenarios can run
+against any revision that has it.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass, make_dataclass
+from itertools import cycle
+
+import numpy as np
+
+from src.engine.constants import (
+    COMPONENT_STORAGE_COLUMNAR,
+    COMPONENT_STORAGE_SPARSE,
+)
+from src.engine.ecs import ECS, Changed, Component
+
+from .harness import Scenario
+
+type Step = Callable[[], object]
+
+# 2**8 combinations of tags, for hundreds of archetypes.
+FRAGMENTATION_TAGS = 8
+CHURN_BATCH = 1000
+
+
+@dataclass
+class Position(Component):
+    x: float = 0.0
+    y: float = 0.0
+
+
+@dataclass
+class Velocity(Component):
+    dx: float = 0.0
+    dy: float = 0.0
+
+
+@dataclass
+class Health(Component):
+    value: int = 100
+
+
+@dataclass
+class ColumnarPosition(Component):
+    storage = COMPONENT_STORAGE_COLUMNAR
+    x: float = 0.0
+    y: float = 0.0
+
+
+@dataclass
+class ColumnarVelocity(Component):
+    storage = COMPONENT_STORAGE_COLUMNAR
+    dx: float = 0.0
+    dy: float = 0.0
+
+
+@dataclass
+class OnFire(Component): ...
+
+
+@dataclass
+class Selected(Component):
+    storage = COMPONENT_STORAGE_SPARSE
+
+
+TAGS: list[type[Component]] = [
+    make_dataclass(f"Tag{i}", [], bases=(Component,))
+    for i in range(FRAGMENTATION_TAGS)
+]
+
+
+def spawn_movers(ecs: ECS, n: int, columnar: bool = False) -> list[int]:
+    if columnar:
+        return ecs.spawn_batch(
+            n,
+            {
+                ColumnarPosition: np.zeros((n, 2)),
+                ColumnarVelocity: np.ones((n, 2)),
+            },
+        )
+    return ecs.spawn_batch(
+        n,
+        {
+            Position: [Position() for _ in range(n)],
+            Velocity: [Velocity(1.0, 1.0) for _ in range(n)],
+        },
+    )
+
+
+def fragmented_world(n: int) -> ECS:
+    """`n` movers spread evenly over every combination of the tags."""
+
+    ecs = ECS()
+    combinations = 2**FRAGMENTATION_TAGS
+    for combination in range(combinations):
+        count = n // combinations + (combination < n % combinations)
+        if not count:
+            continue
+        tags = [t for bit, t in enumerate(TAGS) if combination >> bit & 1]
+        _ = ecs.spawn_batch(
+            count,
+            {
+                Position: [Position() for _ in range(count)],
+                Velocity: [Velocity(1.0, 1.0) for _ in range(count)],
+                **{t: [t() for _ in range(count)] for t in tags},
+            },
+        )
+    return ecs
+
+
+def fragmented_query(n: int) -> Step:
+    ecs = fragmented_world(n)
+    return lambda: ecs.query([Position, Velocity])
+
+
+def fragmented_movement(n: int) -> Step:
+    ecs = fragmented_world(n)
+
+    def step() -> None:
+        for _, (positions, velocities) in ecs.query_chunks(Position, Velocity):
+            for position, velocity in zip(positions, velocities):
+                position.x += velocity.dx
+                position.y += velocity.dy
+
+    return step
+
+
+def fragmented_query_without(n: int) -> Step:
+    ecs = fragmented_world(n)
+    return lambda: ecs.query([Position], without=TAGS[:4])
+
+
+def churn(component: Component) -> Callable[[int], Step]:
+    """Toggle `component` on a rolling batch of entities each step."""
+
+    def setup(n: int) -> Step:
+        ecs = ECS()
+        entities = spawn_movers(ecs, n)
+        batches = cycle(
+            [
+                entities[start : start + CHURN_BATCH]
+                for start in range(0, n, CHURN_BATCH)
+            ]
+        )
+        component_type = type(component)
+
+        def step() -> None:
+            batch = next(batches)
+            for entity in batch:
+                ecs.add_component(entity, component)
+            for entity in batch:
+                ecs.remove_component(entity, component_type)
+
+        return step
+
+    return setup
+
+
+def churn_commands(n: int) -> Step:
+    """Replace a batch of entities through commands each step."""
+
+    ecs = ECS()
+    _ = spawn_movers(ecs, n)
+    ecs.commands.apply()
+
+    def step() -> None:
+        # the previous batch is the only one on fire.
+        stale, _ = ecs.query([Position], with_=[OnFire])
+        for entity in stale:
+            ecs.commands.remove(entity)
+        for _ in range(CHURN_BATCH):
+            ecs.commands.spawn([Position(), Velocity(1.0, 1.0), OnFire()])
+        ecs.commands.apply()
+
+    return step
+
+
+def large_query_rebuild(n: int) -> Step:
+    """Flatten a large query right after a structural change."""
+
+    ecs = ECS()
+    _ = spawn_movers(ecs, n)
+
+    def step() -> None:
+        ecs.remove(ecs.spawn_batch(1, {Position: [Position()]})[0])
+        _ = ecs.query([Position])
+
+    return step
+
+
+def large_columnar_movement(n: int) -> Step:
+    ecs = ECS()
+    _ = spawn_movers(ecs, n, columnar=True)
+
+    def step() -> None:
+        for _, (positions, velocities) in ecs.query_chunks(
+            ColumnarPosition, ColumnarVelocity, mutable=[ColumnarPosition]
+        ):
+            positions += velocities * (1 / 60)
+
+    return step
+
+
+def large_changed_query(n: int) -> Step:
+    """Find the 1% of a large world which changed since the last step."""
+
+    ecs = ECS()
+    entities = spawn_movers(ecs, n, columnar=True)
+    changed = entities[:: max(1, n // 100)]
+
+    def step() -> None:
+        since = ecs.advance_tick()
+        for entity in changed:
+            ecs.mark_changed(entity, ColumnarPosition)
+        _ = ecs.query(
+            [ColumnarPosition], [Changed[ColumnarPosition]], since=since
+        )
+
+    return step
+
+
+def mixed_sparse_join(n: int) -> Step:
+    """Join 1% of dense movers with a sparse tag."""
+
+    ecs = ECS()
+    entities = spawn_movers(ecs, n, columnar=True)
+    for entity in entities[:: max(1, n // 100)]:
+        ecs.add_component(entity, Selected())
+    return lambda: ecs.query([ColumnarPosition, Selected])
+
+
+def mixed_gather(n: int) -> Step:
+    """Gather the positions of 1% of the entities, as after a raycast."""
+
+    ecs = ECS()
+    entities = spawn_movers(ecs, n, columnar=True)
+    for entity in entities[::3]:
+        ecs.add_component(entity, Health())
+    picked = np.random.default_rng(0).choice(
+        entities, max(1, n // 100), replace=False
+    )
+    return lambda: ecs.get_many(picked, ColumnarPosition)
+
+
+SCENARIOS: list[Scenario] = [
+    Scenario(
+        "fragmented_query",
+        "cached query over 256 archetypes",
+        fragmented_query,
+        size=100_000,
+    ),
+    Scenario(
+        "fragmented_movement",
+        "per-entity movement over 256 archetypes",
+        fragmented_movement,
+        size=100_000,
+        samples=20,
+    ),
+    Scenario(
+        "fragmented_query_without",
+        "cached exclusion query over 256 archetypes",
+        fragmented_query_without,
+        size=100_000,
+    ),
+    Scenario(
+        "churn_table_tag",
+        "add and remove a table tag, per component",
+        churn(OnFire()),
+        size=100_000,
+        samples=50,
+        ops_per_sample=2 * CHURN_BATCH,
+    ),
+    Scenario(
+        "churn_sparse_tag",
+        "add and remove a sparse tag, per component",
+        churn(Selected()),
+        size=100_000,
+        samples=50,
+        ops_per_sample=2 * CHURN_BATCH,
+    ),
+    Scenario(
+        "churn_commands",
+        "spawn and remove through commands, per command",
+        churn_commands,
+        size=100_000,
+        samples=50,
+        ops_per_sample=2 * CHURN_BATCH,
+    ),
+    Scenario(
+        "large_query_rebuild",
+        "flatten a query after a structural change",
+        large_query_rebuild,
+        size=1_000_000,
+        samples=20,
+    ),
+    Scenario(
+        "large_columnar_movement",
+        "vectorized movement over columnar storage",
+        large_columnar_movement,
+        size=1_000_000,
+        samples=50,
+    ),
+    Scenario(
+        "large_changed_query",
+        "changed filter matching 1% of the rows",
+        large_changed_query,
+        size=1_000_000,
+        samples=50,
+    ),
+    Scenario(
+        "mixed_sparse_join",
+        "dense query joined with a 1% sparse tag",
+        mixed_sparse_join,
+        size=1_000_000,
+        samples=50,
+    ),
+    Scenario(
+        "mixed_gather",
+        "get_many of 1% of the entities over two archetypes",
+        mixed_gather,
+        size=1_000_000,
+        samples=50,
+    ),
+]
@@ -1,17 +1,41 @@
 """Voxl client entry point"""
 
+from functools import partial
+from typing import TypedDict
+
 import imgui
 from dependency_injector.wiring import Provide, inject
 
 from src.client.di_containers import Voxl
 from src.client.player import Player
 from src.engine import AssetManager
+from src.engine.default_config import EVENT_STATS, EVENT_STATS_LISTENERS
+from src.engine.event_stats import EventStats
 from src.engine.events import DebugDrawCall
 from src.engine.renderer.renderer import Renderer
 from src.engine.scene import SceneGraph
 from src.engine.windowing.headless import Window
 
 
+class DebugConfig(TypedDict):
+    """Debug overlay configuration.
+
+    Attributes:
+        event_stats: Record event rates and listener latencies, and show
+            them in an "Events" window.
+        event_stats_listeners: How many of the slowest listeners to show.
+    """
+
+    event_stats: bool
+    event_stats_listeners: int
+
+
+default_config: DebugConfig = {
+    "event_stats": EVENT_STATS,
+    "event_stats_listeners": EVENT_STATS_LISTENERS,
+}
+
+
 def fps_meter(event: DebugDrawCall):
     dt = event.dt
     fps = int(1 / dt)
@@ -21,15 +45,44 @@ def fps_meter(event: DebugDrawCall):
     imgui.end()
 
 
+def event_stats_panel(
+    stats: EventStats, listeners: int, event: DebugDrawCall
+) -> None:
+    imgui.begin("Events")
+    rates = sorted(stats.rates().items(), key=lambda item: -item[1])
+    for event_type, rate in rates:
+        imgui.text(f"{event_type.__name__}: {rate:.0f}/s")
+
+    imgui.separator()
+    for listener in stats.slowest(listeners):
+        histogram = listener.histogram
+        line = (
+            f"{listener.name}: p50 {histogram.percentile(50) / 1e3:.0f} us,"
+            + f" p99 {histogram.percentile(99) / 1e3:.0f} us,"
+            + f" max {histogram.max_ns / 1e3:.0f} us"
+        )
+        if listener.over_budget:
+            imgui.text_colored(
+                f"{line} ({listener.over_budget} over)", 1, 0.3, 0.3
+            )
+        else:
+            imgui.text(line)
+    imgui.end()
+
+
 @inject
 def main(
     asset_manager: AssetManager = Provide[Voxl.core.asset_manager],  # pyright:ignore[reportUnknownMemberType]
     scene_graph: SceneGraph = Provide[Voxl.scene_graph],
     renderer: Renderer = Provide[Voxl.renderer],
     window: Window = Provide[Voxl.window],
+    debug: DebugConfig | None = Provide[Voxl.config.debug],
 ) -> None:
     """The main entry point."""
 
+    if debug is None:
+        debug = default_config
+
     asset_manager.load_assets("./assets/", "voxl")
     _ = renderer, scene_graph
 
@@ -37,13 +90,22 @@ def main(
     _ = Player(window)
 
     # event listeners
-    window.core.event_manager().listen(DebugDrawCall, fps_meter)
+    event_manager = window.core.event_manager()
+    event_manager.listen(DebugDrawCall, fps_meter)
+    if debug["event_stats"]:
+        stats = event_manager.enable_stats()
+        event_manager.listen(
+            DebugDrawCall,
+            partial(event_stats_panel, stats, debug["event_stats_listeners"]),
+        )
 
     try:
         window.mainloop()
     except KeyboardInterrupt:
         ...
 
+    window.core.frame_schedule().shutdown()
+    event_manager.shutdown()
     # TODO cleanup
 
 
@@ -1,6 +1,7 @@
 import math
 
 from src.engine import EventManager
+from src.engine.constants import FRAME_STAGE_UPDATE
 from src.engine.events import DrawCall, KeyEvent, MouseMoveEvent
 from src.engine.types import KeyState
 from src.engine.windowing.headless import Window
@@ -24,10 +25,10 @@ class Player:
 
         event_manager: EventManager = window.core.event_manager()
         event_manager.listen(KeyEvent, self.on_key, threadsafe=True)
-        event_manager.listen(
-            MouseMoveEvent, self.on_mouse_move, threadsafe=True
-        )
-        event_manager.listen(DrawCall, self.update)
+        # queued by the window, delivered once per frame before `update`.
+        event_manager.listen(MouseMoveEvent, self.on_mouse_move)
+        # moves the camera before the render stage reads it.
+        _ = window.core.frame_schedule().add(self.update, FRAME_STAGE_UPDATE)
 
     def on_key(self, event: KeyEvent) -> None:
         self.keys[event.key_name] = event.state != KeyState.RELEASE
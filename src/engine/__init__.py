@@ -6,6 +6,7 @@ from .compute import ComputeManager, ComputeManagerConfig, ComputePipeline
 from .core import Core
 from .ecs import ECS, Component, Entity
 from .event_manager import Event, EventManager
+from .frame_schedule import FrameSchedule
 
 __all__ = [
     "AssetManager",
@@ -18,6 +19,7 @@ __all__ = [
     "Core",
     "EventManager",
     "Event",
+    "FrameSchedule",
     "Entity",
     "Component",
     "ECS",
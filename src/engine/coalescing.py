@@ -0,0 +1,114 @@
+"""Per-frame queues which merge high-rate events until they're drained.
+
+Input callbacks can fire many times per frame, like `MouseMoveEvent` for
+every cursor sample. Instead of dispatching each one, an event type can be
+queued: emitting it only merges it into its :py:class:`CoalescingQueue`, and
+the merged events are dispatched once the queue's frame event (`DrawCall`,
+`UpdateTick`, ...) is emitted. Listener work then scales with the frame rate
+rather than the input rate.
+
+How events are merged depends on the queue's policy (see
+:py:data:`src.engine.types.EventCoalescePolicy`):
+
+- `latest` keeps only the newest event, for absolute values like positions.
+- `sum` adds up the numeric fields, for deltas like scrolling. Other fields
+  take the newest event's value.
+- `all` keeps every event in order, only deferring them to the frame.
+"""
+
+from dataclasses import fields, replace
+from threading import Lock
+from typing import TYPE_CHECKING
+
+from src.engine.constants import (
+    EVENT_COALESCE_ALL,
+    EVENT_COALESCE_LATEST,
+    EVENT_COALESCE_SUM,
+)
+from src.engine.types import EventCoalescePolicy
+
+if TYPE_CHECKING:
+    from .event_manager import Event
+
+
+class CoalescingQueue:
+    """The merged, not yet dispatched events of one event type.
+
+    Events may be pushed from any thread, like input callbacks, while the
+    queue is drained from the thread emitting the frame event.
+
+    Attributes:
+        event_type: The queued event type.
+        policy: How events are merged.
+        drain_on: The frame event type which dispatches the queue.
+        events: The merged events, oldest first.
+        received: How many events were pushed so far.
+        dispatched: How many events were drained so far.
+    """
+
+    event_type: type["Event"]
+    policy: EventCoalescePolicy
+    drain_on: type["Event"]
+    events: list["Event"]
+    received: int
+    dispatched: int
+
+    _lock: Lock
+
+    def __init__(
+        self,
+        event_type: type["Event"],
+        policy: EventCoalescePolicy,
+        drain_on: type["Event"],
+    ) -> None:
+        if policy not in (
+            EVENT_COALESCE_LATEST,
+            EVENT_COALESCE_SUM,
+            EVENT_COALESCE_ALL,
+        ):
+            raise ValueError(f"Unknown coalescing policy {policy!r}")
+
+        self.event_type = event_type
+        self.policy = policy
+        self.drain_on = drain_on
+        self.events = []
+        self.received = 0
+        self.dispatched = 0
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def push(self, event: "Event") -> None:
+        """Merge an event into the queue according to its policy."""
+
+        with self._lock:
+            self.received += 1
+            if not self.events or self.policy == EVENT_COALESCE_ALL:
+                self.events.append(event)
+            elif self.policy == EVENT_COALESCE_LATEST:
+                self.events[0] = event
+            else:
+                self.events[0] = add(self.events[0], event)
+
+    def drain(self) -> list["Event"]:
+        """Take the merged events, leaving the queue empty."""
+
+        with self._lock:
+            events, self.events = self.events, []
+            self.dispatched += len(events)
+        return events
+
+
+def add(previous: "Event", event: "Event") -> "Event":
+    """Sum the numeric fields of two events into a new one.
+
+    Non-numeric fields, including booleans, take `event`'s values.
+    """
+
+    summed = {}
+    for field in fields(event):
+        value = getattr(event, field.name)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            summed[field.name] = getattr(previous, field.name) + value
+    return replace(event, **summed)
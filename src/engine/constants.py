@@ -4,6 +4,9 @@ This modules contains constants. Basically magic values but with names. At least
 they're not magic values.
 """
 
+from src.engine.types import ComponentStorage as ComponentStorageType
+from src.engine.types import EventCoalescePolicy as EventCoalescePolicyType
+from src.engine.types import EventQueuePolicy as EventQueuePolicyType
 from src.engine.types import RenderBackend as RenderBackendType
 from src.engine.types import WindowBackend as WindowBackendType
 
@@ -17,3 +20,32 @@ RENDER_BACKEND_OPENGL: RenderBackendType = "opengl"
 
 # Asset manager
 TEXTURE_SUFFIX_WHITELIST: list[str] = ["jpg", "jpeg", "png", "bmp"]
+
+# ECS component storage
+COMPONENT_STORAGE_TABLE: ComponentStorageType = "table"
+COMPONENT_STORAGE_COLUMNAR: ComponentStorageType = "columnar"
+COMPONENT_STORAGE_SPARSE: ComponentStorageType = "sparse"
+
+# ECS entity ids, the low bits are the slot index and the rest the generation
+ENTITY_INDEX_BITS: int = 32
+
+# ECS snapshots
+ECS_SNAPSHOT_MAGIC: bytes = b"VOXLECS\0"
+ECS_SNAPSHOT_VERSION: int = 1
+ECS_SNAPSHOT_ALIGNMENT: int = 64
+
+# Event queue policies, what to do when a threadsafe listener falls behind
+EVENT_QUEUE_BLOCK: EventQueuePolicyType = "block"
+EVENT_QUEUE_DROP_NEWEST: EventQueuePolicyType = "drop_newest"
+EVENT_QUEUE_DROP_OLDEST: EventQueuePolicyType = "drop_oldest"
+
+# Event coalescing policies, how queued events are merged until drained
+EVENT_COALESCE_LATEST: EventCoalescePolicyType = "latest"
+EVENT_COALESCE_SUM: EventCoalescePolicyType = "sum"
+EVENT_COALESCE_ALL: EventCoalescePolicyType = "all"
+
+# Frame stages, in the order they run every frame
+FRAME_STAGE_PRE_UPDATE: str = "pre_update"
+FRAME_STAGE_UPDATE: str = "update"
+FRAME_STAGE_POST_UPDATE: str = "post_update"
+FRAME_STAGE_RENDER: str = "render"
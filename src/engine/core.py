@@ -7,6 +7,7 @@ from .asset_manager import AssetManager
 from .camera import Camera
 from .compute import ComputeManager
 from .event_manager import EventManager
+from .frame_schedule import FrameSchedule
 
 
 @final
@@ -17,12 +18,17 @@ class Core(containers.DeclarativeContainer):
         config: The core configuration.
         logging: Logging configuration.
         asset_manager: The asset manager.
+        frame_schedule: The staged listeners of every `DrawCall`.
     """
 
     config = providers.Configuration()
 
     event_manager = providers.Singleton(EventManager)
 
+    frame_schedule = providers.Singleton(
+        FrameSchedule, event_manager=event_manager
+    )
+
     logging = providers.Resource(
         logging.config.dictConfig,
         config=config.logging,
@@ -8,6 +8,10 @@ WINDOW_WIDTH: int = 854
 WINDOW_HEIGHT: int = 480
 SAMPLES: int = 1
 
+# DebugConfig
+EVENT_STATS: bool = False
+EVENT_STATS_LISTENERS: int = 10
+
 # ComputeManagerConfig
 POWER_PREFERENCE: str = "high-performance"
 
@@ -15,3 +19,17 @@ POWER_PREFERENCE: str = "high-performance"
 DEFAULT_FOV: float = 45.0
 DEFAULT_FAR: float = 1.0
 DEFAULT_NEAR: float = 1_000_000_000.0
+
+# ECS
+ECS_COLUMN_CAPACITY: int = 64
+ECS_PROCESS_MIN_ROWS: int = 4096
+ECS_SPATIAL_CELL_SIZE: float = 4.0
+
+# EventManager
+EVENT_DISPATCH_WORKERS: int = 4
+EVENT_DISPATCH_BATCH: int = 32
+EVENT_QUEUE_SIZE: int = 1024
+EVENT_LISTENER_BUDGET_MS: float = 2.0
+
+# FrameSchedule
+FRAME_SCHEDULE_WORKERS: int = 4
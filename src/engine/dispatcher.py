@@ -0,0 +1,260 @@
+"""A persistent worker pool which runs threadsafe event listeners.
+
+Every threadsafe listener gets its own bounded :py:class:`ListenerQueue`.
+Emitting an event only appends it to the queues of its listeners, and a
+fixed set of long-lived worker threads drains them, so no thread or task is
+created per event.
+
+A queue is only ever drained by one worker at a time, so each listener sees
+its events one after the other, in the order they were emitted. Different
+listeners do run concurrently.
+
+When a queue is full, its policy decides what happens (see
+:py:data:`src.engine.types.EventQueuePolicy`): the emitter either waits for
+room, or the newest or oldest event is dropped. Dropping the oldest suits
+high-rate events like `MouseMoveEvent`, where only the latest one matters.
+A blocking listener must not be emitted to from inside another listener,
+since every worker could end up waiting on a queue only they can drain.
+"""
+
+from collections import deque
+from collections.abc import Callable
+from logging import Logger, getLogger
+from threading import Condition, Lock, Thread
+from time import perf_counter_ns
+from typing import TYPE_CHECKING
+
+from src.engine.constants import (
+    EVENT_QUEUE_BLOCK,
+    EVENT_QUEUE_DROP_NEWEST,
+    EVENT_QUEUE_DROP_OLDEST,
+)
+from src.engine.default_config import (
+    EVENT_DISPATCH_BATCH as DEFAULT_BATCH,
+)
+from src.engine.default_config import (
+    EVENT_DISPATCH_WORKERS as DEFAULT_WORKERS,
+)
+from src.engine.types import EventQueuePolicy
+
+if TYPE_CHECKING:
+    from .event_manager import Event
+    from .event_stats import EventStats
+
+
+class ListenerQueue:
+    """The pending events of one threadsafe listener.
+
+    Attributes:
+        callback: The listener.
+        capacity: How many events may wait before the policy kicks in.
+        policy: What to do with events which don't fit.
+        priority: The listener's priority, higher ones are queued first.
+        events: The waiting events, oldest first.
+        dropped: How many events were dropped so far.
+        scheduled: Whether the queue is waiting for or held by a worker.
+    """
+
+    callback: Callable[["Event"], None]
+    capacity: int
+    policy: EventQueuePolicy
+    priority: int
+    events: deque["Event"]
+    dropped: int
+    scheduled: bool
+
+    def __init__(
+        self,
+        callback: Callable[["Event"], None],
+        capacity: int,
+        policy: EventQueuePolicy = EVENT_QUEUE_BLOCK,
+        priority: int = 0,
+    ) -> None:
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+
+        self.callback = callback
+        self.capacity = capacity
+        self.policy = policy
+        self.priority = priority
+        self.events = deque()
+        self.dropped = 0
+        self.scheduled = False
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+
+class Dispatcher:
+    """A bounded pool of worker threads draining listener queues.
+
+    The workers are started on the first submitted event and live until
+    :py:meth:`shutdown`. They're daemon threads, so they never keep the
+    process alive on their own.
+
+    Attributes:
+        workers: The number of worker threads.
+        batch: How many events a worker delivers from one queue before
+            moving on to the next, so busy listeners can't starve others.
+        logger: Where exceptions raised by listeners are logged.
+        stats: Where listener latencies are recorded, if anywhere.
+    """
+
+    workers: int
+    batch: int
+    logger: Logger
+    stats: "EventStats | None"
+
+    _lock: Lock
+    _work: Condition
+    _space: Condition
+    _idle: Condition
+    _ready: deque[ListenerQueue]
+    _pending: int
+    _threads: list[Thread]
+    _stopping: bool
+
+    def __init__(
+        self, workers: int = DEFAULT_WORKERS, batch: int = DEFAULT_BATCH
+    ) -> None:
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+
+        self.workers = workers
+        self.batch = batch
+        self.logger = getLogger("EventDispatcher")
+        self.stats = None
+
+        self._lock = Lock()
+        self._work = Condition(self._lock)
+        self._space = Condition(self._lock)
+        self._idle = Condition(self._lock)
+        self._ready = deque()
+        self._pending = 0
+        self._threads = []
+        self._stopping = False
+
+    @property
+    def pending(self) -> int:
+        """The number of events queued or being delivered."""
+
+        return self._pending
+
+    def submit(self, queue: ListenerQueue, event: "Event") -> bool:
+        """Queue an event for a listener, applying its policy when full.
+
+        Returns:
+            Whether the event was queued, rather than dropped.
+
+        Raises:
+            RuntimeError: if the dispatcher was shut down.
+        """
+
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError("Dispatcher is shut down")
+            if not self._threads:
+                self._start()
+
+            events = queue.events
+            if len(events) >= queue.capacity:
+                if queue.policy == EVENT_QUEUE_DROP_NEWEST:
+                    queue.dropped += 1
+                    return False
+                if queue.policy == EVENT_QUEUE_DROP_OLDEST:
+                    _ = events.popleft()
+                    queue.dropped += 1
+                    self._pending -= 1
+                while len(events) >= queue.capacity:
+                    _ = self._space.wait()
+                    if self._stopping:
+                        raise RuntimeError("Dispatcher is shut down")
+
+            events.append(event)
+            self._pending += 1
+            if not queue.scheduled:
+                queue.scheduled = True
+                self._ready.append(queue)
+                self._work.notify()
+            return True
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until every queued event has been delivered.
+
+        Returns:
+            False if `timeout` ran out first.
+        """
+
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the workers once the queued events are delivered.
+
+        Args:
+            wait: Block until the workers are done.
+        """
+
+        with self._lock:
+            self._stopping = True
+            self._work.notify_all()
+            self._space.notify_all()
+            threads = list(self._threads)
+
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _start(self) -> None:
+        for index in range(self.workers):
+            thread = Thread(
+                target=self._run,
+                name=f"EventDispatcher-{index}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._ready and not self._stopping:
+                    _ = self._work.wait()
+                if not self._ready:
+                    return
+
+                queue = self._ready.popleft()
+                events = queue.events
+                batch = [
+                    events.popleft()
+                    for _ in range(min(len(events), self.batch))
+                ]
+                self._space.notify_all()
+
+            stats = self.stats
+            for event in batch:
+                try:
+                    if stats is None:
+                        queue.callback(event)
+                    else:
+                        t0 = perf_counter_ns()
+                        try:
+                            queue.callback(event)
+                        finally:
+                            stats.record_call(
+                                queue.callback, perf_counter_ns() - t0
+                            )
+                except Exception:
+                    self.logger.exception(
+                        f"Listener {queue.callback!r} failed on {event!r}"
+                    )
+
+            with self._lock:
+                self._pending -= len(batch)
+                if events:
+                    self._ready.append(queue)
+                    self._work.notify()
+                else:
+                    queue.scheduled = False
+                if not self._pending:
+                    self._idle.notify_all()
@@ -0,0 +1,54 @@
+"""Module for the entity component system.
+
+Entities are plain integers, components are dataclasses and entities with the
+same set of component types share an archetype table. See
+:py:class:`src.engine.ecs.ecs.ECS` for the world itself,
+:py:mod:`src.engine.ecs.storage` for the available column storage backends and
+:py:mod:`src.engine.ecs.scheduler` for running systems in parallel and
+:py:mod:`src.engine.ecs.spatial` for proximity queries.
+"""
+
+from src.engine.types import Component, Entity
+
+from .archetype import ArchetypeInfo, FragmentationStats
+from .commands import Commands
+from .ecs import ECS
+from .entities import EntityTable
+from .observers import OnAdd, OnChange, OnRemove
+from .query import Added, Changed, Query, QueryFilter
+from .scheduler import Scheduler, System
+from .spatial import SpatialIndex
+from .storage import (
+    ArrayColumn,
+    Column,
+    ComponentBatch,
+    ComponentTicks,
+    SharedArrayColumn,
+    SparseSet,
+)
+
+__all__ = [
+    "ECS",
+    "Added",
+    "ArchetypeInfo",
+    "ArrayColumn",
+    "Changed",
+    "Column",
+    "Commands",
+    "Component",
+    "ComponentBatch",
+    "ComponentTicks",
+    "Entity",
+    "EntityTable",
+    "FragmentationStats",
+    "OnAdd",
+    "OnChange",
+    "OnRemove",
+    "Query",
+    "QueryFilter",
+    "Scheduler",
+    "SharedArrayColumn",
+    "SparseSet",
+    "SpatialIndex",
+    "System",
+]
@@ -0,0 +1,59 @@
+"""Immutable per-archetype metadata."""
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from src.engine.types import Archetype, Component
+
+
+@dataclass(frozen=True, slots=True)
+class ArchetypeInfo:
+    """What an archetype is made of, computed once when it's created.
+
+    Attributes:
+        mask: The archetype's bitmask of component type ids.
+        types: Its component types, ordered by type id. This is also the
+            order of its columns in `ECS.components` and `ECS.ticks`.
+        type_set: The same types, for cheap membership tests and set math.
+        columns: The position of every type in :py:attr:`types`.
+    """
+
+    mask: Archetype
+    types: tuple[type[Component], ...]
+    type_set: frozenset[type[Component]]
+    columns: Mapping[type[Component], int]
+
+    @classmethod
+    def create(
+        cls, mask: Archetype, types: tuple[type[Component], ...]
+    ) -> "ArchetypeInfo":
+        return cls(
+            mask=mask,
+            types=types,
+            type_set=frozenset(types),
+            columns=MappingProxyType(
+                {t: index for index, t in enumerate(types)}
+            ),
+        )
+
+    def __contains__(self, component_type: type[Component]) -> bool:
+        return component_type in self.type_set
+
+
+@dataclass(frozen=True, slots=True)
+class FragmentationStats:
+    """How much of the archetype storage is actually in use.
+
+    Attributes:
+        archetypes: The number of archetypes.
+        empty_archetypes: How many of those have no entities.
+        rows: The number of rows across all archetypes.
+        slack_bytes: Memory allocated by columns and their change ticks but
+            not holding any rows, sparse sets excluded.
+    """
+
+    archetypes: int
+    empty_archetypes: int
+    rows: int
+    slack_bytes: int
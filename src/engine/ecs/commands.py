@@ -0,0 +1,152 @@
+"""Deferred structural changes for the ECS.
+
+Spawning, removing or changing the component types of an entity moves rows
+around, which breaks anyone iterating query results at the time. Systems
+record those changes into a :py:class:`Commands` buffer instead, and the buffer
+is applied in one go at a sync point, like the end of a scheduler stage.
+"""
+
+from collections.abc import Collection
+from threading import Lock
+from typing import TYPE_CHECKING
+
+from src.engine.types import Component, Entity
+
+if TYPE_CHECKING:
+    from .ecs import ECS
+
+
+class Commands:
+    """A thread-safe buffer of structural ECS changes.
+
+    Recording is cheap and may happen from several systems at once. On
+    :py:meth:`apply`, the changes are applied in phases, each one grouped to
+    cut per-entity overhead:
+
+    1. `set_components`, batched per set of component types.
+    2. `add_component`/`remove_component`, in recorded order, sorted by the
+       entity's archetype.
+    3. `remove`, batched per archetype.
+    4. `spawn`, batched per set of component types.
+
+    Commands targeting entities which no longer exist are skipped. Observers
+    (see :py:mod:`src.engine.ecs.observers`) are flushed afterwards.
+
+    Attributes:
+        ecs: The ECS the commands are applied to.
+    """
+
+    ecs: "ECS"
+    _lock: Lock
+    _sets: dict[Entity, list[Component]]
+    _edits: list[tuple[Entity, Component | type[Component]]]
+    _removals: dict[Entity, None]
+    _spawns: list[list[Component]]
+
+    def __init__(self, ecs: "ECS") -> None:
+        self.ecs = ecs
+        self._lock = Lock()
+        self._sets = {}
+        self._edits = []
+        self._removals = {}
+        self._spawns = []
+
+    def __len__(self) -> int:
+        return (
+            len(self._sets)
+            + len(self._edits)
+            + len(self._removals)
+            + len(self._spawns)
+        )
+
+    def spawn(self, components: list[Component]) -> None:
+        """Spawn an entity with `components` once applied."""
+
+        with self._lock:
+            self._spawns.append(components)
+
+    def remove(self, entity: Entity) -> None:
+        with self._lock:
+            self._removals[entity] = None
+
+    def set_components(
+        self, entity: Entity, components: list[Component]
+    ) -> None:
+        """Replace an entity's components. The last recorded set wins."""
+
+        with self._lock:
+            self._sets[entity] = components
+
+    def add_component(self, entity: Entity, component: Component) -> None:
+        with self._lock:
+            self._edits.append((entity, component))
+
+    def remove_component(
+        self, entity: Entity, component_type: type[Component]
+    ) -> None:
+        with self._lock:
+            self._edits.append((entity, component_type))
+
+    def apply(self) -> None:
+        """Apply and clear every recorded command."""
+
+        with self._lock:
+            sets, self._sets = self._sets, {}
+            edits, self._edits = self._edits, []
+            removals, self._removals = self._removals, {}
+            spawns, self._spawns = self._spawns, []
+
+        ecs = self.ecs
+        alive = ecs.entities
+
+        targets = [entity for entity in sets if entity in alive]
+        for indices, components_by_type in self._group(
+            [sets[entity] for entity in targets]
+        ):
+            ecs.set_components_batch(
+                [targets[index] for index in indices], components_by_type
+            )
+
+        # stable, so every entity keeps the order of its own edits.
+        edits = [edit for edit in edits if edit[0] in alive]
+        edits.sort(key=lambda edit: alive[edit[0]][0])
+        for entity, edit in edits:
+            if isinstance(edit, Component):
+                ecs.add_component(entity, edit)
+            else:
+                ecs.remove_component(entity, edit)
+
+        ecs.remove_batch([entity for entity in removals if entity in alive])
+
+        for indices, components_by_type in self._group(spawns):
+            _ = ecs.spawn_batch(len(indices), components_by_type)
+
+        ecs.observers.flush()
+
+    @staticmethod
+    def _group(
+        component_lists: Collection[list[Component]],
+    ) -> list[tuple[list[int], dict[type[Component], list[Component]]]]:
+        """Group component lists by their set of types.
+
+        Returns:
+            Per group, the indices of its lists and their components
+            transposed into one list per type, as taken by
+            :py:meth:`src.engine.ecs.ecs.ECS.spawn_batch`.
+        """
+
+        groups: dict[
+            frozenset[type[Component]],
+            tuple[list[int], dict[type[Component], list[Component]]],
+        ] = {}
+        for index, components in enumerate(component_lists):
+            key = frozenset(type(component) for component in components)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = ([], {t: [] for t in key})
+
+            group[0].append(index)
+            for component in components:
+                group[1][type(component)].append(component)
+
+        return list(groups.values())
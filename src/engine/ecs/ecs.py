@@ -0,0 +1,1109 @@
+from collections.abc import Collection, Iterable, Iterator, Mapping, Sequence
+from typing import Any, TypeVar, cast
+
+import numpy as np
+import numpy.typing as npt
+from bidict import bidict
+
+from src.engine.constants import (
+    COMPONENT_STORAGE_COLUMNAR,
+    COMPONENT_STORAGE_SPARSE,
+)
+from src.engine.types import Archetype, Component, Entity, RowIndex
+
+from .archetype import ArchetypeInfo, FragmentationStats
+from .commands import Commands
+from .entities import EntityTable
+from .hooks import ComponentHook, ComponentHooks
+from .observers import Observer, ObserverEvent, Observers
+from .query import Query, QueryFilter
+from .storage import (
+    ArrayColumn,
+    Column,
+    ComponentBatch,
+    ComponentTicks,
+    SharedArrayColumn,
+    SparseSet,
+    column_dtype,
+    field_dtypes,
+    shrink_to_fit,
+    slack_bytes,
+    swap_remove,
+)
+
+C = TypeVar("C", bound=Component)
+
+
+class ECS:
+    _next_type_id: int
+
+    entities: EntityTable
+    archetypes: dict[Archetype, ArchetypeInfo]
+    entity_rows: dict[Archetype, list[Entity]]
+    components: dict[Archetype, dict[type[Component], Column]]
+    ticks: dict[Archetype, dict[type[Component], ComponentTicks]]
+    archetypes_by_type: dict[type[Component], list[Archetype]]
+    sparse: dict[type[Component], SparseSet[Component]]
+
+    _add_edges: dict[Archetype, dict[type[Component], Archetype]]
+    _remove_edges: dict[Archetype, dict[type[Component], Archetype]]
+
+    generations: dict[Archetype, int]
+    archetype_generation: int
+    change_tick: int
+    _generation_floor: int
+    _queries: dict[
+        tuple[
+            tuple[type[Component], ...],
+            tuple[QueryFilter, ...],
+            tuple[type[Component], ...],
+            tuple[type[Component], ...],
+        ],
+        Query[Any],
+    ]
+
+    types: bidict[int, type[Component]]
+
+    commands: Commands
+    hooks: dict[type[Component], ComponentHooks]
+    observers: Observers
+    shared_columns: bool
+
+    def __init__(self, shared_columns: bool = False):
+        """Initialize an empty world.
+
+        Args:
+            shared_columns: Allocate columnar components in shared memory,
+                so :py:class:`src.engine.ecs.processes.ProcessPool` workers
+                can process them.
+        """
+
+        self.shared_columns = shared_columns
+        self._next_type_id = 0
+
+        self.entities = EntityTable()
+        self.archetypes = {}
+        self.entity_rows = {}
+        self.components = {}
+        self.ticks = {}
+        self.archetypes_by_type = {}
+        self.sparse = {}
+        self._add_edges = {}
+        self._remove_edges = {}
+
+        self.generations = {}
+        self.archetype_generation = 0
+        self.change_tick = 1
+        self._generation_floor = 0
+        self._queries = {}
+
+        self.types = bidict({})
+
+        self.commands = Commands(self)
+        self.hooks = {}
+        self.observers = Observers(self)
+
+    def spawn(self) -> Entity:
+        empty_archetype = self.determine_archetype(frozenset())
+        row: RowIndex = len(self.entity_rows[empty_archetype])
+
+        entity = self.entities.allocate()
+        self.entities[entity] = (empty_archetype, row)
+        self.entity_rows[empty_archetype].append(entity)
+        self.generations[empty_archetype] += 1
+
+        return entity
+
+    def spawn_batch(
+        self,
+        n: int,
+        components_by_type: Mapping[type[Component], ComponentBatch],
+    ) -> list[Entity]:
+        """Spawn `n` entities which share the same component types.
+
+        The archetype is resolved once and every column is extended in one
+        go, which is a lot cheaper than `spawn` and `set_components` per
+        entity.
+
+        Args:
+            n: The number of entities to spawn.
+            components_by_type: `n` components per component type. Columnar
+                types may also be given as an `(n, fields)` array.
+
+        Returns:
+            The new entities, in row order.
+        """
+
+        self._check_batch(n, components_by_type)
+        table, sparse = self._split_sparse(components_by_type)
+        archetype = self.determine_archetype(frozenset(table))
+
+        entities = self.entities.allocate_many(n)
+        self._extend_rows(archetype, entities, table)
+        self._insert_sparse(entities, sparse)
+        if self.hooks:
+            self._run_add_hooks(entities, components_by_type)
+        return entities
+
+    def remove(self, entity: Entity) -> None:
+        """Remove an entity, freeing its id for reuse.
+
+        Recycled ids get a new generation, so handles to the removed entity
+        never refer to whichever entity takes its slot next.
+        """
+
+        if self.hooks:
+            self._run_remove_hooks(entity, self._entity_types(entity))
+        self._remove_components(entity)
+        self._discard_sparse(entity)
+        del self.entities[entity]
+
+    def is_alive(self, entity: Entity) -> bool:
+        """Whether `entity` exists, `False` for stale handles."""
+
+        return self.entities.is_alive(entity)
+
+    def remove_batch(self, entities: Collection[Entity]) -> None:
+        """Remove many entities, grouped per archetype.
+
+        Within an archetype rows are removed from the highest down, so the
+        row swapped into each hole is never one that's still to be removed.
+        """
+
+        rows_by_archetype: dict[Archetype, list[RowIndex]] = {}
+        for entity in dict.fromkeys(entities):
+            if self.hooks:
+                self._run_remove_hooks(entity, self._entity_types(entity))
+            archetype, row = self.entities.pop(entity)
+            rows_by_archetype.setdefault(archetype, []).append(row)
+            self._discard_sparse(entity)
+
+        for archetype, rows in rows_by_archetype.items():
+            rows.sort(reverse=True)
+            for row in rows:
+                self._remove_row(archetype, row)
+
+    def register_type(
+        self, component_type: type[Component], type_id: int
+    ) -> None:
+        """Register a component type under a given id, like a saved one.
+
+        Types registered later on demand get ids past every registered one.
+
+        Raises:
+            ValueError: if the id or the type is already registered to
+                something else.
+            TypeError: if the type is columnar but can't be packed into an
+                array.
+        """
+
+        registered = self.types.get(type_id)
+        if registered is component_type:
+            return
+        if registered is not None or component_type in self.types.inverse:
+            raise ValueError(
+                f"Can't register {component_type.__name__} as type {type_id}"
+            )
+
+        self._check_storage(component_type)
+        self.types[type_id] = component_type
+        self._next_type_id = max(self._next_type_id, type_id + 1)
+
+    def determine_archetype(
+        self, component_types: frozenset[type[Component]]
+    ) -> Archetype:
+        archetype: Archetype = 0
+        for component_type in component_types:
+            place: int = 0
+
+            if component_type not in self.types.inverse:
+                self._check_storage(component_type)
+                self.types[self._next_type_id] = component_type
+                place = self._next_type_id
+                self._next_type_id += 1
+            else:
+                place = self.types.inverse[component_type]
+
+            archetype |= 1 << place
+
+        if archetype not in self.archetypes:
+            info = ArchetypeInfo.create(
+                archetype,
+                tuple(
+                    sorted(component_types, key=lambda t: self.types.inverse[t])
+                ),
+            )
+            self.archetypes[archetype] = info
+            self.entity_rows[archetype] = []
+            # a recreated archetype mustn't repeat a generation cached
+            # queries saw before it was dropped.
+            self.generations[archetype] = self._generation_floor
+            self.archetype_generation += 1
+
+            self.components[archetype] = {
+                t: self._new_column(t) for t in info.types
+            }
+            self.ticks[archetype] = {t: ComponentTicks() for t in info.types}
+            for component_type in info.types:
+                self.archetypes_by_type.setdefault(component_type, []).append(
+                    archetype
+                )
+
+        return archetype
+
+    def reserve(
+        self, component_types: Collection[type[Component]], n: int
+    ) -> Archetype:
+        """Make room for `n` more entities with exactly `component_types`.
+
+        The columnar storage of their archetype is grown in one allocation,
+        instead of doubling its way up as entities come in. List columns
+        can't be reserved ahead of time.
+
+        Returns:
+            The archetype, created if needed.
+        """
+
+        archetype = self.determine_archetype(
+            frozenset(
+                t
+                for t in component_types
+                if t.storage != COMPONENT_STORAGE_SPARSE
+            )
+        )
+        size = len(self.entity_rows[archetype]) + n
+        for column in self.components[archetype].values():
+            if isinstance(column, ArrayColumn):
+                column.reserve(size)
+        return archetype
+
+    def compact(self) -> int:
+        """Drop empty archetypes and shrink oversized columns.
+
+        Archetypes pile up over time, including intermediate ones created by
+        adding or removing components one at a time, and are otherwise never
+        reclaimed. Dropped archetypes are recreated on demand. Columns whose
+        rows were reallocated invalidate views into them, like any
+        structural change.
+
+        Returns:
+            The number of archetypes dropped.
+        """
+
+        empty = [
+            archetype
+            for archetype, rows in self.entity_rows.items()
+            if not rows
+        ]
+        for archetype in empty:
+            self._drop_archetype(archetype)
+        if empty:
+            # the cached transitions may lead to dropped archetypes.
+            self._add_edges.clear()
+            self._remove_edges.clear()
+            self.archetype_generation += 1
+
+        for archetype, columns in self.components.items():
+            moved = False
+            for component_type, column in columns.items():
+                shrunk = shrink_to_fit(column)
+                if shrunk is not None:
+                    columns[component_type] = shrunk
+                    moved = True
+                moved |= self.ticks[archetype][component_type].shrink_to_fit()
+            if moved:
+                self.generations[archetype] += 1
+
+        return len(empty)
+
+    def fragmentation(self) -> FragmentationStats:
+        """Archetype and memory usage, to keep an eye on long-running worlds."""
+
+        slack = 0
+        for archetype, columns in self.components.items():
+            for component_type, column in columns.items():
+                slack += slack_bytes(column)
+                slack += self.ticks[archetype][component_type].slack_bytes()
+
+        return FragmentationStats(
+            archetypes=len(self.archetypes),
+            empty_archetypes=sum(
+                not rows for rows in self.entity_rows.values()
+            ),
+            rows=sum(map(len, self.entity_rows.values())),
+            slack_bytes=slack,
+        )
+
+    def _drop_archetype(self, archetype: Archetype) -> None:
+        info = self.archetypes.pop(archetype)
+        del self.entity_rows[archetype]
+        del self.ticks[archetype]
+        self._generation_floor = max(
+            self._generation_floor, self.generations.pop(archetype) + 1
+        )
+        for column in self.components.pop(archetype).values():
+            if isinstance(column, SharedArrayColumn):
+                column.release()
+        for component_type in info.types:
+            self.archetypes_by_type[component_type].remove(archetype)
+
+    def find_archetypes(
+        self,
+        component_types: Collection[type[Component]],
+        without: Collection[type[Component]] = (),
+    ) -> list[Archetype]:
+        """Find the archetypes which contain all of `component_types` and
+        none of `without`.
+
+        Unlike :py:meth:`determine_archetype`, this never registers types or
+        creates archetypes. Only the archetypes of the rarest requested type
+        are tested against the masks, or every archetype if no types are
+        required.
+        """
+
+        excluded_mask: Archetype = 0
+        for component_type in without:
+            type_id = self.types.inverse.get(component_type)
+            if type_id is not None:
+                excluded_mask |= 1 << type_id
+
+        required_mask: Archetype = 0
+        smallest: list[Archetype] | None = None
+        for component_type in component_types:
+            candidates = self.archetypes_by_type.get(component_type)
+            if not candidates:
+                return []
+
+            required_mask |= 1 << self.types.inverse[component_type]
+            if smallest is None or len(candidates) < len(smallest):
+                smallest = candidates
+
+        if smallest is None:
+            smallest = list(self.archetypes)
+
+        return [
+            archetype
+            for archetype in smallest
+            if (archetype & required_mask) == required_mask
+            and not archetype & excluded_mask
+        ]
+
+    def sparse_set(self, component_type: type[C]) -> SparseSet[C]:
+        """The storage of a sparse component type, created on first use."""
+
+        sparse_set = self.sparse.get(component_type)
+        if sparse_set is None:
+            sparse_set = self.sparse[component_type] = SparseSet(component_type)
+        return cast(SparseSet[C], sparse_set)
+
+    @staticmethod
+    def _check_storage(component_type: type[Component]) -> None:
+        """Reject columnar types which can't be packed, before registering.
+
+        Raises:
+            TypeError: see :py:func:`src.engine.ecs.storage.column_dtype`.
+        """
+
+        if component_type.storage == COMPONENT_STORAGE_COLUMNAR:
+            _ = column_dtype(component_type)
+
+    def _new_column(self, component_type: type[Component]) -> Column:
+        if component_type.storage == COMPONENT_STORAGE_COLUMNAR:
+            if self.shared_columns:
+                return SharedArrayColumn(component_type)
+            return ArrayColumn(component_type)
+        return []
+
+    def determine_types(self, archetype: Archetype) -> set[type[Component]]:
+        """The component types of an archetype, as a new set.
+
+        Read straight from its :py:class:`ArchetypeInfo`. Masks which were
+        never created as an archetype are decoded bit by bit instead.
+        """
+
+        info = self.archetypes.get(archetype)
+        if info is not None:
+            return set(info.types)
+
+        types: set[type[Component]] = set()
+        while archetype:
+            low_bit = archetype & -archetype
+            types.add(self.types[low_bit.bit_length() - 1])
+            archetype ^= low_bit
+
+        return types
+
+    @staticmethod
+    def component_types(
+        components: list[Component],
+    ) -> frozenset[type[Component]]:
+        return frozenset(type(component) for component in components)
+
+    def set_components(
+        self, entity: Entity, components: list[Component]
+    ) -> None:
+        """Replace all of an entity's components, sparse ones included."""
+
+        types = self.component_types(components)
+        if self.hooks:
+            self._run_remove_hooks(entity, self._entity_types(entity) - types)
+
+        sparse = [
+            c for c in components if c.storage == COMPONENT_STORAGE_SPARSE
+        ]
+        if sparse:
+            components = [
+                c for c in components if c.storage != COMPONENT_STORAGE_SPARSE
+            ]
+
+        self._set_table_components(entity, components)
+
+        kept = {type(component) for component in sparse}
+        for component_type, sparse_set in self.sparse.items():
+            if component_type not in kept:
+                _ = sparse_set.discard(entity)
+        for component in sparse:
+            self.sparse_set(type(component)).insert(
+                entity, component, self.change_tick
+            )
+
+        if self.hooks:
+            self._run_add_hooks([entity], types)
+
+    def _set_table_components(
+        self, entity: Entity, components: list[Component]
+    ) -> None:
+        if not components:
+            self._remove_components(entity)
+            empty_archetype = self.determine_archetype(frozenset())
+            row = len(self.entity_rows[empty_archetype])
+            self.entities[entity] = (empty_archetype, row)
+            self.entity_rows[empty_archetype].append(entity)
+            self.generations[empty_archetype] += 1
+            return
+
+        types = self.component_types(components)
+        archetype = self.determine_archetype(types)
+
+        self._remove_components(entity)
+
+        columns = self.components[archetype]
+        ticks = self.ticks[archetype]
+        for component in components:
+            columns[type(component)].append(component)
+            ticks[type(component)].push(self.change_tick, self.change_tick)
+
+        first_type = type(components[0])
+        row: RowIndex = len(self.components[archetype][first_type]) - 1
+
+        self.entities[entity] = (archetype, row)
+        self.entity_rows[archetype].append(entity)
+        self.generations[archetype] += 1
+
+    def set_components_batch(
+        self,
+        entities: Sequence[Entity],
+        components_by_type: Mapping[type[Component], ComponentBatch],
+    ) -> None:
+        """Replace the components of many entities with the same types.
+
+        See :py:meth:`spawn_batch` for the layout of `components_by_type`.
+        """
+
+        self._check_batch(len(entities), components_by_type)
+        table, sparse = self._split_sparse(components_by_type)
+        archetype = self.determine_archetype(frozenset(table))
+
+        for entity in entities:
+            if self.hooks:
+                self._run_remove_hooks(
+                    entity,
+                    self._entity_types(entity) - components_by_type.keys(),
+                )
+            self._remove_components(entity)
+            for component_type, sparse_set in self.sparse.items():
+                if component_type not in sparse:
+                    _ = sparse_set.discard(entity)
+
+        self._extend_rows(archetype, list(entities), table)
+        self._insert_sparse(entities, sparse)
+        if self.hooks:
+            self._run_add_hooks(entities, components_by_type)
+
+    def add_hooks(
+        self,
+        component_type: type[Component],
+        on_add: ComponentHook | None = None,
+        on_remove: ComponentHook | None = None,
+    ) -> None:
+        """Register immediate hooks for a component type.
+
+        See :py:class:`src.engine.ecs.hooks.ComponentHooks` for when they
+        run. Moving an entity between archetypes, or writing to a component
+        in place, doesn't run any hooks.
+        """
+
+        hooks = self.hooks.setdefault(component_type, ComponentHooks())
+        if on_add is not None:
+            hooks.on_add.append(on_add)
+        if on_remove is not None:
+            hooks.on_remove.append(on_remove)
+
+    def remove_hooks(
+        self,
+        component_type: type[Component],
+        on_add: ComponentHook | None = None,
+        on_remove: ComponentHook | None = None,
+    ) -> None:
+        hooks = self.hooks.get(component_type)
+        if hooks is None:
+            return
+
+        if on_add is not None and on_add in hooks.on_add:
+            hooks.on_add.remove(on_add)
+        if on_remove is not None and on_remove in hooks.on_remove:
+            hooks.on_remove.remove(on_remove)
+        if not hooks.on_add and not hooks.on_remove:
+            del self.hooks[component_type]
+
+    def observe(self, event: ObserverEvent, observer: Observer) -> None:
+        """Register a batched observer, like `observe(OnAdd[T], callback)`.
+
+        Observers are called with every entity the event happened to since
+        the last flush, which happens when `commands` are applied. See
+        :py:mod:`src.engine.ecs.observers`.
+        """
+
+        self.observers.add(event, observer)
+
+    def unobserve(self, event: ObserverEvent, observer: Observer) -> None:
+        self.observers.remove(event, observer)
+
+    def _entity_types(self, entity: Entity) -> set[type[Component]]:
+        """Every component type an entity has, sparse ones included."""
+
+        archetype, _ = self.entities[entity]
+        types = set(self.archetypes[archetype].types)
+        for component_type, sparse_set in self.sparse.items():
+            if entity in sparse_set:
+                types.add(component_type)
+        return types
+
+    def _run_add_hooks(
+        self,
+        entities: Sequence[Entity],
+        component_types: Iterable[type[Component]],
+    ) -> None:
+        for component_type in component_types:
+            hooks = self.hooks.get(component_type)
+            if hooks is None:
+                continue
+            for hook in hooks.on_add:
+                for entity in entities:
+                    hook(entity)
+
+    def _run_remove_hooks(
+        self, entity: Entity, component_types: Iterable[type[Component]]
+    ) -> None:
+        for component_type in component_types:
+            hooks = self.hooks.get(component_type)
+            if hooks is None:
+                continue
+            for hook in hooks.on_remove:
+                hook(entity)
+
+    @staticmethod
+    def _check_batch(
+        n: int, components_by_type: Mapping[type[Component], ComponentBatch]
+    ) -> None:
+        for component_type, values in components_by_type.items():
+            if len(values) != n:
+                raise ValueError(
+                    f"Expected {n} {component_type.__name__} components,"
+                    + f" got {len(values)}"
+                )
+
+    @staticmethod
+    def _split_sparse(
+        components_by_type: Mapping[type[Component], ComponentBatch],
+    ) -> tuple[
+        dict[type[Component], ComponentBatch],
+        dict[type[Component], ComponentBatch],
+    ]:
+        table: dict[type[Component], ComponentBatch] = {}
+        sparse: dict[type[Component], ComponentBatch] = {}
+        for component_type, values in components_by_type.items():
+            if component_type.storage == COMPONENT_STORAGE_SPARSE:
+                sparse[component_type] = values
+            else:
+                table[component_type] = values
+        return table, sparse
+
+    def _insert_sparse(
+        self,
+        entities: Sequence[Entity],
+        components_by_type: Mapping[type[Component], ComponentBatch],
+    ) -> None:
+        for component_type, values in components_by_type.items():
+            sparse_set = self.sparse_set(component_type)
+            for entity, value in zip(
+                entities, cast(Sequence[Component], values)
+            ):
+                sparse_set.insert(entity, value, self.change_tick)
+
+    def _discard_sparse(self, entity: Entity) -> None:
+        for sparse_set in self.sparse.values():
+            _ = sparse_set.discard(entity)
+
+    def _extend_rows(
+        self,
+        archetype: Archetype,
+        entities: list[Entity],
+        components_by_type: Mapping[type[Component], ComponentBatch],
+    ) -> None:
+        rows = self.entity_rows[archetype]
+        start: RowIndex = len(rows)
+
+        columns = self.components[archetype]
+        ticks = self.ticks[archetype]
+        for component_type, values in components_by_type.items():
+            column = columns[component_type]
+            if isinstance(column, ArrayColumn):
+                column.extend(values)
+            else:
+                column.extend(cast(Sequence[Component], values))
+            ticks[component_type].extend(self.change_tick, len(values))
+
+        rows.extend(entities)
+        self.entities.place(entities, archetype, start)
+        self.generations[archetype] += 1
+
+    def add_component(self, entity: Entity, component: Component) -> None:
+        """Add a single component to an entity, or replace it if present.
+
+        Only this entity's row moves, to the neighbouring archetype. The
+        transition is cached per archetype and component type, so repeated
+        additions of the same type skip resolving the target archetype.
+        Sparse components don't move any rows at all.
+        """
+
+        component_type = type(component)
+        source, row = self.entities[entity]
+
+        if component_type.storage == COMPONENT_STORAGE_SPARSE:
+            self.sparse_set(component_type).insert(
+                entity, component, self.change_tick
+            )
+        else:
+            edges = self._add_edges.setdefault(source, {})
+            target = edges.get(component_type)
+            if target is None:
+                types = self.archetypes[source].type_set | {component_type}
+                target = self.determine_archetype(types)
+                edges[component_type] = target
+
+            if target == source:
+                self.components[source][component_type][row] = component
+                ticks = self.ticks[source][component_type]
+                ticks.changed[row] = self.change_tick
+                # cached query results still hold the replaced instance.
+                self.generations[source] += 1
+            else:
+                self._move_row(entity, source, row, target, component)
+
+        if component_type in self.hooks:
+            self._run_add_hooks([entity], (component_type,))
+
+    def remove_component(
+        self, entity: Entity, component_type: type[Component]
+    ) -> None:
+        """Remove a single component from an entity, if it has one.
+
+        The counterpart of :py:meth:`add_component`, with the same caching.
+        """
+
+        source, row = self.entities[entity]
+
+        if component_type.storage == COMPONENT_STORAGE_SPARSE:
+            sparse_set = self.sparse.get(component_type)
+            if sparse_set is not None and entity in sparse_set:
+                if component_type in self.hooks:
+                    self._run_remove_hooks(entity, (component_type,))
+                _ = sparse_set.discard(entity)
+            return
+
+        edges = self._remove_edges.setdefault(source, {})
+        target = edges.get(component_type)
+        if target is None:
+            types = self.archetypes[source].type_set - {component_type}
+            target = self.determine_archetype(types)
+            edges[component_type] = target
+
+        if target == source:
+            return
+
+        if component_type in self.hooks:
+            self._run_remove_hooks(entity, (component_type,))
+        self._move_row(entity, source, row, target, None)
+
+    def _move_row(
+        self,
+        entity: Entity,
+        source: Archetype,
+        row: RowIndex,
+        target: Archetype,
+        added: Component | None,
+    ) -> None:
+        source_columns = self.components[source]
+        source_ticks = self.ticks[source]
+        target_ticks = self.ticks[target]
+        for component_type, column in self.components[target].items():
+            if added is not None and component_type is type(added):
+                column.append(added)
+                target_ticks[component_type].push(
+                    self.change_tick, self.change_tick
+                )
+                continue
+
+            source_column = source_columns[component_type]
+            if isinstance(column, ArrayColumn) and isinstance(
+                source_column, ArrayColumn
+            ):
+                column.extend(source_column.data[row : row + 1])
+            else:
+                column.append(source_column[row])
+
+            ticks = source_ticks[component_type]
+            target_ticks[component_type].push(
+                ticks.added[row], ticks.changed[row]
+            )
+
+        target_rows = self.entity_rows[target]
+        self.entities[entity] = (target, len(target_rows))
+        target_rows.append(entity)
+        self.generations[target] += 1
+
+        self._remove_row(source, row)
+
+    def _remove_components(self, entity: Entity) -> None:
+        archetype, row = self.entities[entity]
+        self._remove_row(archetype, row)
+
+    def _remove_row(self, archetype: Archetype, row: RowIndex) -> None:
+        """Swap-remove a row, moving the archetype's last row into its place."""
+
+        self.generations[archetype] += 1
+
+        for column in self.components[archetype].values():
+            swap_remove(column, row)
+        for ticks in self.ticks[archetype].values():
+            ticks.swap_remove(row)
+
+        rows = self.entity_rows[archetype]
+        last_entity = rows.pop()
+        if row < len(rows):
+            rows[row] = last_entity
+            self.entities[last_entity] = (archetype, row)
+
+    def advance_tick(self) -> int:
+        """Start a new change tick.
+
+        Incremental consumers call this after they're done looking at changes
+        and pass the returned tick as `since` next time around. Every change
+        made afterwards is stamped with a later tick.
+
+        Returns:
+            The tick which just ended.
+        """
+
+        tick = self.change_tick
+        self.change_tick += 1
+        return tick
+
+    def mark_changed(
+        self, entity: Entity, component_type: type[Component]
+    ) -> None:
+        """Flag an entity's component as changed in the current tick."""
+
+        archetype, row = self.entities[entity]
+        if component_type.storage == COMPONENT_STORAGE_SPARSE:
+            sparse_set = self.sparse_set(component_type)
+            index = sparse_set.dense_index(entity)
+            if index < 0:
+                raise KeyError(entity)
+            sparse_set.ticks.changed[index] = self.change_tick
+            return
+
+        self.ticks[archetype][component_type].changed[row] = self.change_tick
+
+    def get(self, entity: Entity, component_type: type[C]) -> C:
+        """One entity's component.
+
+        Columnar components are materialized as a new instance, so changing
+        it doesn't write back. Use :py:meth:`set_many` for that.
+
+        Raises:
+            KeyError: if the entity isn't alive or doesn't have the type.
+        """
+
+        if component_type.storage == COMPONENT_STORAGE_SPARSE:
+            return self.sparse_set(component_type).get(entity)
+
+        archetype, row = self.entities[entity]
+        column = self.components[archetype].get(component_type)
+        if column is None:
+            raise KeyError(entity)
+        return cast(C, column[row])
+
+    def get_many(
+        self,
+        entities: Sequence[Entity] | npt.NDArray[Any],
+        component_type: type[C],
+    ) -> list[C] | npt.NDArray[Any]:
+        """Gather many entities' components at once, in the given order.
+
+        Entities are located straight from the entity table and grouped by
+        archetype, and each group is gathered with a single fancy index for
+        columnar types.
+
+        Returns:
+            A list of components, or for columnar types an `(n, fields)`
+            array copy of their rows.
+
+        Raises:
+            KeyError: if an entity isn't alive or doesn't have the type.
+        """
+
+        if component_type.storage == COMPONENT_STORAGE_SPARSE:
+            sparse_set = self.sparse_set(component_type)
+            return [sparse_set.get(entity) for entity in entities]
+
+        groups = self._group_locations(entities, component_type)
+        if component_type.storage == COMPONENT_STORAGE_COLUMNAR:
+            if len(groups) == 1:
+                _, _, column, rows = groups[0]
+                return cast(ArrayColumn[C], column).data[rows]
+
+            gathered = np.empty(
+                (len(entities), len(field_dtypes(component_type))),
+                dtype=column_dtype(component_type),
+            )
+            for positions, _, column, rows in groups:
+                gathered[positions] = cast(ArrayColumn[C], column).data[rows]
+            return gathered
+
+        if len(groups) == 1:
+            _, _, column, rows = groups[0]
+            return [cast(C, column[row]) for row in rows.tolist()]
+
+        components = np.empty(len(entities), dtype=object)
+        for positions, _, column, rows in groups:
+            # fill element by element, instances mustn't be unpacked.
+            for position, row in zip(positions.tolist(), rows.tolist()):
+                components[position] = column[row]
+        return components.tolist()
+
+    def set_many(
+        self,
+        entities: Sequence[Entity] | npt.NDArray[Any],
+        component_type: type[C],
+        components: ComponentBatch,
+    ) -> None:
+        """Overwrite many entities' existing components in place.
+
+        The counterpart of :py:meth:`get_many`. Rows are scattered per
+        archetype and flagged as changed. No rows move, so no hooks run, but
+        cached queries over the written archetypes are rebuilt.
+
+        Args:
+            entities: The entities to write to.
+            component_type: The type to write.
+            components: One component per entity, or for columnar types an
+                `(n, fields)` array.
+
+        Raises:
+            KeyError: if an entity isn't alive or doesn't have the type.
+        """
+
+        self._check_batch(len(entities), {component_type: components})
+
+        if component_type.storage == COMPONENT_STORAGE_SPARSE:
+            sparse_set = self.sparse_set(component_type)
+            for entity, component in zip(entities, components):
+                index = sparse_set.dense_index(entity)
+                if index < 0:
+                    raise KeyError(entity)
+                sparse_set.values[index] = cast(C, component)
+                sparse_set.ticks.changed[index] = self.change_tick
+            return
+
+        groups = self._group_locations(entities, component_type)
+        values: npt.NDArray[Any] | None = None
+        for positions, archetype, column, rows in groups:
+            if isinstance(column, ArrayColumn):
+                if values is None:
+                    values = column.to_rows(cast(Sequence[C], components))
+                column.data[rows] = values[positions]
+            else:
+                for position, row in zip(positions.tolist(), rows.tolist()):
+                    column[row] = cast(Component, components[position])
+            self.ticks[archetype][component_type].mark(self.change_tick, rows)
+            # cached query results may hold the replaced values.
+            self.generations[archetype] += 1
+
+    def _group_locations(
+        self,
+        entities: Sequence[Entity] | npt.NDArray[Any],
+        component_type: type[Component],
+    ) -> list[
+        tuple[npt.NDArray[np.intp], Archetype, Column, npt.NDArray[np.intp]]
+    ]:
+        """Locate entities and group them by archetype.
+
+        Returns:
+            Per archetype: the positions of its entities in `entities`, the
+            archetype, its column of `component_type` and their rows in it.
+        """
+
+        archetype_ids, rows = self.entities.locate_many(entities)
+        if not len(archetype_ids):
+            return []
+
+        if (archetype_ids == archetype_ids[0]).all():
+            splits = [np.arange(len(archetype_ids))]
+        else:
+            order = np.argsort(archetype_ids, kind="stable")
+            sorted_ids = archetype_ids[order]
+            bounds = np.flatnonzero(sorted_ids[1:] != sorted_ids[:-1]) + 1
+            splits = np.split(order, bounds)
+
+        groups: list[
+            tuple[npt.NDArray[np.intp], Archetype, Column, npt.NDArray[np.intp]]
+        ] = []
+        for positions in splits:
+            archetype_id = int(archetype_ids[positions[0]])
+            archetype = self.entities.archetype_mask(archetype_id)
+            column = self.components[archetype].get(component_type)
+            if column is None:
+                raise KeyError(entities[int(positions[0])])
+            groups.append(
+                (positions, archetype, column, rows[positions].astype(np.intp))
+            )
+        return groups
+
+    def query(
+        self,
+        component_types: Collection[type[C]],
+        filters: Collection[QueryFilter] = (),
+        since: int = 0,
+        mutable: Collection[type[C]] = (),
+        with_: Collection[type[Component]] = (),
+        without: Collection[type[Component]] = (),
+    ) -> tuple[list[Entity], dict[type[C], list[C] | npt.NDArray[Any]]]:
+        """Find every entity which has all of `component_types`.
+
+        Results are cached per list of types and only rebuilt after a
+        structural change to a matching archetype, so the returned lists are
+        shared between calls and must be treated as read-only.
+
+        Args:
+            component_types: The component types to fetch.
+            filters: `Added[T]`/`Changed[T]` filters. Only rows whose `T` was
+                added/changed after `since` are returned. Filtered results
+                are never cached, and columnar ones are copies.
+            since: The tick to compare change filters against, usually what
+                :py:meth:`advance_tick` returned after the previous run.
+            mutable: Component types the caller is going to write to. Every
+                returned row of these is flagged as changed.
+            with_: Component types entities must also have, without fetching
+                them.
+            without: Component types entities must not have. Both are
+                matched against archetype bitmasks only, so excluded
+                archetypes cost nothing per entity.
+
+        Sparse component types may appear anywhere above. They're joined
+        per entity, so those results are never cached.
+
+        Returns:
+            The matching entities and, per requested type, their components
+            in the same order. Columnar components come back as an array
+            with one row per entity: a writable view of the archetype's
+            storage if a single archetype matched, else a concatenated copy.
+        """
+
+        required = list(component_types)
+        if not required:
+            return [], {}
+
+        query = self._cached_query(required, filters, with_, without)
+        return query.fetch(since, mutable)
+
+    def query_chunks(
+        self,
+        *component_types: type[C],
+        filters: Collection[QueryFilter] = (),
+        since: int = 0,
+        mutable: Collection[type[C]] = (),
+        with_: Collection[type[Component]] = (),
+        without: Collection[type[Component]] = (),
+    ) -> Iterator[tuple[list[Entity], tuple[list[C] | npt.NDArray[Any], ...]]]:
+        """Iterate matching archetypes without flattening them.
+
+        Yields one `(entities, columns)` batch per matching archetype, backed
+        directly by its storage. See :py:meth:`Query.chunks`, and
+        :py:meth:`query` for the keyword arguments.
+        """
+
+        if not component_types:
+            return iter(())
+        query = self._cached_query(component_types, filters, with_, without)
+        return query.chunks(since, mutable)
+
+    def iter(
+        self,
+        *component_types: type[C],
+        filters: Collection[QueryFilter] = (),
+        since: int = 0,
+        mutable: Collection[type[C]] = (),
+        with_: Collection[type[Component]] = (),
+        without: Collection[type[Component]] = (),
+    ) -> Iterator[tuple[Entity, tuple[C | npt.NDArray[Any], ...]]]:
+        """Iterate matching entities one by one.
+
+        Example:
+
+            for entity, (position, velocity) in ecs.iter(Position, Velocity):
+                position.x += velocity.dx
+
+        Columnar components are yielded as writable one dimensional row views.
+        """
+
+        for entities, columns in self.query_chunks(
+            *component_types,
+            filters=filters,
+            since=since,
+            mutable=mutable,
+            with_=with_,
+            without=without,
+        ):
+            yield from zip(entities, zip(*columns))
+
+    def _cached_query(
+        self,
+        component_types: Collection[type[C]],
+        filters: Collection[QueryFilter] = (),
+        with_: Collection[type[Component]] = (),
+        without: Collection[type[Component]] = (),
+    ) -> Query[C]:
+        key = (
+            tuple(component_types),
+            tuple(filters),
+            tuple(with_),
+            tuple(without),
+        )
+        query = self._queries.get(key)
+        if query is None:
+            query = Query(self, component_types, filters, with_, without)
+            self._queries[key] = query
+
+        return cast(Query[C], query)
@@ -0,0 +1,277 @@
+"""Generational entity ids and their location table.
+
+An entity id packs a slot index into its low bits and a generation counter
+into the high bits (see :py:data:`src.engine.constants.ENTITY_INDEX_BITS`).
+When an entity is removed its slot goes onto a free list and the slot's
+generation is bumped, so the slot can be recycled while stale handles to the
+old entity are still detected.
+
+Locations live in compact parallel arrays indexed by slot, instead of a dict
+of `(archetype, row)` tuples.
+"""
+
+from array import array
+from collections.abc import (
+    Buffer,
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    Sequence,
+)
+from typing import Any, override
+
+import numpy as np
+import numpy.typing as npt
+
+from src.engine.constants import ENTITY_INDEX_BITS
+from src.engine.types import Archetype, Entity, RowIndex
+
+INDEX_MASK: int = (1 << ENTITY_INDEX_BITS) - 1
+GENERATION_MASK: int = (1 << 32) - 1
+DEAD: int = -1
+
+
+def entity_index(entity: Entity) -> int:
+    return entity & INDEX_MASK
+
+
+def entity_generation(entity: Entity) -> int:
+    return entity >> ENTITY_INDEX_BITS
+
+
+class EntityTable(MutableMapping[Entity, tuple[Archetype, RowIndex]]):
+    """Maps live entities to their `(archetype, row)` location.
+
+    Behaves like the `dict` it replaces, but stores one generation, archetype
+    id and row per slot in typed arrays. Archetype bitmasks are interned into
+    small integer ids, since they can grow past 64 bits.
+    """
+
+    _generations: array[int]
+    _archetypes: array[int]
+    _rows: array[int]
+    _free: list[int]
+    _alive: int
+
+    _archetype_ids: dict[Archetype, int]
+    _archetype_masks: list[Archetype]
+
+    def __init__(self) -> None:
+        self._generations = array("I")
+        self._archetypes = array("i")
+        self._rows = array("i")
+        self._free = []
+        self._alive = 0
+
+        self._archetype_ids = {}
+        self._archetype_masks = []
+
+    @classmethod
+    def from_buffers(
+        cls,
+        buffers: Mapping[str, Buffer],
+        archetype_masks: Sequence[Archetype],
+    ) -> "EntityTable":
+        """Restore a table from what :py:meth:`buffers` returned."""
+
+        table = cls()
+        table._generations.frombytes(buffers["generations"])
+        table._archetypes.frombytes(buffers["archetypes"])
+        table._rows.frombytes(buffers["rows"])
+
+        free = array("I")
+        free.frombytes(buffers["free"])
+        table._free = free.tolist()
+        table._alive = len(table._archetypes) - table._archetypes.count(DEAD)
+
+        for archetype in archetype_masks:
+            _ = table._intern(archetype)
+        return table
+
+    def buffers(self) -> dict[str, array[int]]:
+        """The raw slot arrays and free list, for snapshots."""
+
+        return {
+            "generations": self._generations,
+            "archetypes": self._archetypes,
+            "rows": self._rows,
+            "free": array("I", self._free),
+        }
+
+    @property
+    def archetype_masks(self) -> list[Archetype]:
+        """The archetype bitmask behind every interned archetype id."""
+
+        return list(self._archetype_masks)
+
+    def allocate(self) -> Entity:
+        """Reserve an id, recycling a free slot if there is one.
+
+        The entity only counts as alive once it has been given a location.
+        """
+
+        if self._free:
+            index = self._free.pop()
+        else:
+            index = len(self._generations)
+            self._generations.append(0)
+            self._archetypes.append(DEAD)
+            self._rows.append(0)
+
+        return (self._generations[index] << ENTITY_INDEX_BITS) | index
+
+    def allocate_many(self, n: int) -> list[Entity]:
+        """Reserve `n` ids, recycling free slots first."""
+
+        recycled = self._free[-n:] if n else []
+        del self._free[len(self._free) - len(recycled) :]
+        recycled.reverse()
+
+        generations = self._generations
+        entities = [
+            (generations[index] << ENTITY_INDEX_BITS) | index
+            for index in recycled
+        ]
+
+        fresh = n - len(recycled)
+        start = len(generations)
+        generations.extend(array("I", [0]) * fresh)
+        self._archetypes.extend(array("i", [DEAD]) * fresh)
+        self._rows.extend(array("i", [0]) * fresh)
+        entities.extend(range(start, start + fresh))
+
+        return entities
+
+    def place(
+        self, entities: Iterable[Entity], archetype: Archetype, start: RowIndex
+    ) -> None:
+        """Locate consecutive rows of `archetype`, starting at `start`."""
+
+        archetype_id = self._intern(archetype)
+        archetypes = self._archetypes
+        rows = self._rows
+        for row, entity in enumerate(entities, start):
+            index = entity & INDEX_MASK
+            if archetypes[index] == DEAD:
+                self._alive += 1
+            archetypes[index] = archetype_id
+            rows[index] = row
+
+    def is_alive(self, entity: Entity) -> bool:
+        index = entity & INDEX_MASK
+        return (
+            index < len(self._generations)
+            and self._archetypes[index] != DEAD
+            and self._generations[index] == entity >> ENTITY_INDEX_BITS
+        )
+
+    def locate_many(
+        self, entities: Sequence[Entity] | npt.NDArray[Any]
+    ) -> tuple[npt.NDArray[np.int32], npt.NDArray[np.int32]]:
+        """Look many entities up at once, straight from the arrays.
+
+        Returns:
+            Per entity, its interned archetype id (see
+            :py:meth:`archetype_mask`) and its row.
+
+        Raises:
+            KeyError: if any of the entities isn't alive.
+        """
+
+        ids = np.asarray(entities, dtype=np.uint64)
+        if len(ids) and not len(self._generations):
+            raise KeyError(int(ids[0]))
+        indices = (ids & INDEX_MASK).astype(np.intp)
+        generations = np.frombuffer(self._generations, dtype=np.uint32)
+        archetypes = np.frombuffer(self._archetypes, dtype=np.int32)
+        rows = np.frombuffer(self._rows, dtype=np.int32)
+
+        in_range = indices < len(generations)
+        indices = np.where(in_range, indices, 0)
+        alive = (
+            in_range
+            & (archetypes[indices] != DEAD)
+            & (generations[indices] == ids >> ENTITY_INDEX_BITS)
+        )
+        if not alive.all():
+            raise KeyError(int(ids[np.argmin(alive)]))
+        return archetypes[indices], rows[indices]
+
+    def archetype_mask(self, archetype_id: int) -> Archetype:
+        """The archetype bitmask behind an interned archetype id."""
+
+        return self._archetype_masks[archetype_id]
+
+    @override
+    def __getitem__(self, entity: Entity) -> tuple[Archetype, RowIndex]:
+        if not self.is_alive(entity):
+            raise KeyError(entity)
+
+        index = entity & INDEX_MASK
+        archetype = self._archetype_masks[self._archetypes[index]]
+        return archetype, self._rows[index]
+
+    @override
+    def __setitem__(
+        self, entity: Entity, location: tuple[Archetype, RowIndex]
+    ) -> None:
+        index = entity & INDEX_MASK
+        if self._generations[index] != entity >> ENTITY_INDEX_BITS:
+            raise KeyError(entity)
+
+        if self._archetypes[index] == DEAD:
+            self._alive += 1
+        archetype, row = location
+        self._archetypes[index] = self._intern(archetype)
+        self._rows[index] = row
+
+    @override
+    def __delitem__(self, entity: Entity) -> None:
+        if not self.is_alive(entity):
+            raise KeyError(entity)
+
+        index = entity & INDEX_MASK
+        self._archetypes[index] = DEAD
+        self._generations[index] = (self._generations[index] + 1) & (
+            GENERATION_MASK
+        )
+        self._free.append(index)
+        self._alive -= 1
+
+    @override
+    def __contains__(self, entity: object) -> bool:
+        return isinstance(entity, int) and self.is_alive(entity)
+
+    @override
+    def __iter__(self) -> Iterator[Entity]:
+        generations = self._generations
+        for index, archetype_id in enumerate(self._archetypes):
+            if archetype_id != DEAD:
+                yield (generations[index] << ENTITY_INDEX_BITS) | index
+
+    @override
+    def __len__(self) -> int:
+        return self._alive
+
+    @property
+    def capacity(self) -> int:
+        """The number of slots, alive or free."""
+
+        return len(self._generations)
+
+    def nbytes(self) -> int:
+        """Memory used by the location arrays and the free list, in bytes."""
+
+        return sum(
+            arr.itemsize * len(arr)
+            for arr in (self._generations, self._archetypes, self._rows)
+        ) + 8 * len(self._free)
+
+    def _intern(self, archetype: Archetype) -> int:
+        archetype_id = self._archetype_ids.get(archetype)
+        if archetype_id is None:
+            archetype_id = len(self._archetype_masks)
+            self._archetype_ids[archetype] = archetype_id
+            self._archetype_masks.append(archetype)
+        return archetype_id
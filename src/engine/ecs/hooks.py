@@ -0,0 +1,28 @@
+"""Immediate per-component-type hooks.
+
+Hooks run synchronously, inside the ECS call which adds or removes the
+component, so they suit bookkeeping which must never go stale, like indices
+keyed by entity. They must not make structural changes themselves.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from src.engine.types import Entity
+
+type ComponentHook = Callable[[Entity], None]
+
+
+@dataclass
+class ComponentHooks:
+    """The hooks registered for one component type.
+
+    Attributes:
+        on_add: Run right after a component of the type is inserted into an
+            entity, or replaces the one it had.
+        on_remove: Run right before a component of the type is taken away
+            from an entity, including when the entity itself is removed.
+    """
+
+    on_add: list[ComponentHook] = field(default_factory=list)
+    on_remove: list[ComponentHook] = field(default_factory=list)
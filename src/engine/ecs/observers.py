@@ -0,0 +1,201 @@
+"""Batched observers of component changes.
+
+Unlike :py:mod:`src.engine.ecs.hooks`, observers don't run inside the ECS
+call making the change. Adds and removals are collected as they happen and
+handed to the observers in one batch per component type when the ECS is
+flushed, which :py:meth:`src.engine.ecs.commands.Commands.apply` does after
+applying its commands, so once per scheduler stage. Derived structures like
+indices can then be updated at a cost proportional to what changed.
+
+Within a flush, changes are coalesced per entity: an entity shows up at most
+once per event, and removing a component after adding it (or the reverse)
+only reports the last of the two.
+"""
+
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Self
+
+from src.engine.types import Component, Entity
+
+from .query import Changed
+
+if TYPE_CHECKING:
+    from .ecs import ECS
+
+type Observer = Callable[[Sequence[Entity]], None]
+
+
+@dataclass(frozen=True)
+class OnAdd:
+    """Entities which gained a `component_type`, or had theirs replaced.
+
+    Can be spelled either `OnAdd(Position)` or `OnAdd[Position]`.
+    """
+
+    component_type: type[Component]
+
+    def __class_getitem__(cls, component_type: type[Component]) -> Self:
+        return cls(component_type)
+
+
+@dataclass(frozen=True)
+class OnRemove:
+    """Entities which lost their `component_type`, removal included.
+
+    The entities may already be gone by the time observers see them.
+
+    Can be spelled either `OnRemove(Position)` or `OnRemove[Position]`.
+    """
+
+    component_type: type[Component]
+
+    def __class_getitem__(cls, component_type: type[Component]) -> Self:
+        return cls(component_type)
+
+
+@dataclass(frozen=True)
+class OnChange:
+    """Entities whose `component_type` was written to in place.
+
+    Writes are found through the change ticks, so they need to be flagged
+    with `mutable=` or `ECS.mark_changed`. Entities reported by `OnAdd` in
+    the same flush aren't reported again.
+
+    Can be spelled either `OnChange(Position)` or `OnChange[Position]`.
+    """
+
+    component_type: type[Component]
+
+    def __class_getitem__(cls, component_type: type[Component]) -> Self:
+        return cls(component_type)
+
+
+type ObserverEvent = OnAdd | OnRemove | OnChange
+
+
+@dataclass
+class ObservedType:
+    """The observers of one component type and its pending changes.
+
+    Attributes:
+        on_add: Observers of :py:class:`OnAdd`.
+        on_remove: Observers of :py:class:`OnRemove`.
+        on_change: Observers of :py:class:`OnChange`.
+        added: Entities added since the last flush, in order.
+        removed: Entities removed since the last flush, in order.
+        since: The tick of the last flush, to find changes after.
+    """
+
+    on_add: list[Observer] = field(default_factory=list)
+    on_remove: list[Observer] = field(default_factory=list)
+    on_change: list[Observer] = field(default_factory=list)
+    added: dict[Entity, None] = field(default_factory=dict)
+    removed: dict[Entity, None] = field(default_factory=dict)
+    since: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.on_add or self.on_remove or self.on_change)
+
+    def record_add(self, entity: Entity) -> None:
+        _ = self.removed.pop(entity, None)
+        self.added[entity] = None
+
+    def record_remove(self, entity: Entity) -> None:
+        _ = self.added.pop(entity, None)
+        self.removed[entity] = None
+
+    def observers(self, event: ObserverEvent) -> list[Observer]:
+        match event:
+            case OnAdd():
+                return self.on_add
+            case OnRemove():
+                return self.on_remove
+            case OnChange():
+                return self.on_change
+
+
+class Observers:
+    """Every observer registered with an ECS.
+
+    Attributes:
+        ecs: The observed ECS.
+        observed: The observers and pending changes per component type.
+    """
+
+    ecs: "ECS"
+    observed: dict[type[Component], ObservedType]
+
+    def __init__(self, ecs: "ECS") -> None:
+        self.ecs = ecs
+        self.observed = {}
+
+    def add(self, event: ObserverEvent, observer: Observer) -> None:
+        component_type = event.component_type
+        observed = self.observed.get(component_type)
+        if observed is None:
+            observed = self.observed[component_type] = ObservedType()
+            # only changes from here on.
+            observed.since = self.ecs.advance_tick()
+            self.ecs.add_hooks(
+                component_type,
+                on_add=observed.record_add,
+                on_remove=observed.record_remove,
+            )
+
+        observed.observers(event).append(observer)
+
+    def remove(self, event: ObserverEvent, observer: Observer) -> None:
+        component_type = event.component_type
+        observed = self.observed.get(component_type)
+        if observed is None:
+            return
+
+        observers = observed.observers(event)
+        if observer in observers:
+            observers.remove(observer)
+        if not observed:
+            del self.observed[component_type]
+            self.ecs.remove_hooks(
+                component_type,
+                on_add=observed.record_add,
+                on_remove=observed.record_remove,
+            )
+
+    def flush(self) -> None:
+        """Hand every pending change to the observers.
+
+        Observers may make structural changes, which are reported on the
+        next flush.
+        """
+
+        if not self.observed:
+            return
+
+        ecs = self.ecs
+        tick = ecs.advance_tick()
+        for component_type, observed in list(self.observed.items()):
+            added, observed.added = observed.added, {}
+            removed, observed.removed = observed.removed, {}
+            since, observed.since = observed.since, tick
+
+            changed: list[Entity] = []
+            if observed.on_change:
+                for entities, _ in ecs.query_chunks(
+                    component_type,
+                    filters=[Changed(component_type)],
+                    since=since,
+                ):
+                    changed.extend(e for e in entities if e not in added)
+
+            if removed:
+                batch = list(removed)
+                for observer in observed.on_remove:
+                    observer(batch)
+            if added:
+                batch = list(added)
+                for observer in observed.on_add:
+                    observer(batch)
+            if changed:
+                for observer in observed.on_change:
+                    observer(changed)
@@ -0,0 +1,190 @@
+"""Process-pool system execution over shared-memory columns.
+
+Pure-Python systems don't scale across threads on a standard CPython build.
+An ECS created with `shared_columns=True` allocates its columnar components
+as :py:class:`src.engine.ecs.storage.SharedArrayColumn` instead, and a
+:py:class:`ProcessPool` can then run a system over disjoint row ranges of
+those columns in worker processes. Workers attach to the blocks by name, so
+no component data is ever pickled.
+
+Systems run this way are plain functions taking the column views of one row
+range and `dt`. They must be picklable, meaning defined at module level, and
+write their results into the views in place.
+"""
+
+import os
+import sys
+from collections.abc import Callable, Collection, Mapping
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from contextlib import suppress
+from itertools import pairwise
+from multiprocessing.context import BaseContext
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+
+from src.engine.default_config import (
+    ECS_PROCESS_MIN_ROWS as DEFAULT_MIN_ROWS,
+)
+from src.engine.types import Component
+
+from .ecs import ECS
+from .storage import SharedArrayColumn, SharedColumnHandle
+
+C = TypeVar("C", bound=Component)
+
+type RangeKernel = Callable[
+    [dict[type[Component], npt.NDArray[Any]], float], None
+]
+"""A system run over one row range: `kernel(columns, dt)`."""
+
+MAX_ATTACHED_BLOCKS: int = 64
+
+# blocks attached by this (worker) process, by name.
+_attached: dict[str, tuple[SharedMemory, npt.NDArray[Any]]] = {}
+
+
+class ProcessPool:
+    """Runs systems over shared columns in a pool of worker processes.
+
+    Attributes:
+        ecs: The ECS whose shared columns are processed. It has to be created
+            with `shared_columns=True`.
+        max_workers: The number of worker processes.
+    """
+
+    ecs: ECS
+    max_workers: int
+    _executor: ProcessPoolExecutor
+
+    def __init__(
+        self,
+        ecs: ECS,
+        max_workers: int | None = None,
+        mp_context: BaseContext | None = None,
+    ) -> None:
+        self.ecs = ecs
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=mp_context
+        )
+
+    def run(
+        self,
+        kernel: RangeKernel,
+        component_types: Collection[type[Component]],
+        dt: float = 0.0,
+        mutable: Collection[type[Component]] = (),
+        without: Collection[type[Component]] = (),
+        min_rows: int = DEFAULT_MIN_ROWS,
+    ) -> None:
+        """Run `kernel` over every archetype matching `component_types`.
+
+        Each archetype is split into up to :py:attr:`max_workers` row ranges
+        of at least `min_rows` rows, and every range is handed to a worker.
+        Blocks until all of them are done.
+
+        Args:
+            kernel: A module-level function, called with a dict of column
+                views (one `(rows, fields)` array per type) and `dt`.
+            component_types: The columnar component types to hand out.
+            dt: Passed on to the kernel.
+            mutable: Types the kernel writes, flagged as changed.
+            without: Component types matching archetypes must not have.
+            min_rows: The smallest range worth sending to a worker.
+
+        Raises:
+            TypeError: if a column isn't a :py:class:`SharedArrayColumn`.
+        """
+
+        ecs = self.ecs
+        futures: list[Future[None]] = []
+        for archetype in ecs.find_archetypes(component_types, without):
+            n = len(ecs.entity_rows[archetype])
+            if not n:
+                continue
+
+            handles: dict[type[Component], SharedColumnHandle] = {}
+            for component_type in component_types:
+                column = ecs.components[archetype][component_type]
+                if not isinstance(column, SharedArrayColumn):
+                    raise TypeError(
+                        f"{component_type.__name__} isn't stored in shared"
+                        + " memory, create the ECS with shared_columns=True"
+                    )
+                handles[component_type] = column.handle()
+
+            for start, stop in split_rows(n, self.max_workers, min_rows):
+                futures.append(
+                    self._executor.submit(
+                        _run_range, kernel, handles, start, stop, dt
+                    )
+                )
+
+            for component_type in mutable:
+                ecs.ticks[archetype][component_type].mark(ecs.change_tick)
+
+        _ = wait(futures)
+        for future in futures:
+            future.result()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def split_rows(n: int, parts: int, min_rows: int) -> list[tuple[int, int]]:
+    """Split `range(n)` into at most `parts` near-equal `(start, stop)`
+    ranges, none shorter than `min_rows` unless there's only one.
+    """
+
+    parts = max(1, min(parts, n // max(min_rows, 1)))
+    bounds = [n * i // parts for i in range(parts + 1)]
+    return list(pairwise(bounds))
+
+
+def attach_block(name: str) -> SharedMemory:
+    """Attach to an existing shared memory block without taking ownership
+    of it, so detaching never unlinks it.
+    """
+
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    # attaching registers the block again, but pool workers share the
+    # owner's resource tracker, which keeps a set of names. The owner's
+    # unlink unregisters it once, so it mustn't be unregistered here as well.
+    return SharedMemory(name=name)
+
+
+def _attach(handle: SharedColumnHandle) -> npt.NDArray[Any]:
+    attached = _attached.get(handle.name)
+    if attached is None:
+        if len(_attached) >= MAX_ATTACHED_BLOCKS:
+            _detach_all()
+
+        block = attach_block(handle.name)
+        data: npt.NDArray[Any] = np.ndarray(
+            handle.shape, dtype=np.dtype(handle.dtype), buffer=block.buf
+        )
+        attached = _attached[handle.name] = (block, data)
+    return attached[1]
+
+
+def _detach_all() -> None:
+    blocks = [block for block, _ in _attached.values()]
+    _attached.clear()
+    for block in blocks:
+        with suppress(BufferError):
+            block.close()
+
+
+def _run_range(
+    kernel: RangeKernel,
+    handles: Mapping[type[Component], SharedColumnHandle],
+    start: int,
+    stop: int,
+    dt: float,
+) -> None:
+    columns = {t: _attach(handle)[start:stop] for t, handle in handles.items()}
+    kernel(columns, dt)
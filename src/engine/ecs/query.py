@@ -0,0 +1,427 @@
+"""Persistent, cached ECS queries and their filters."""
+
+from collections.abc import Collection, Iterator
+from dataclasses import dataclass
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Self, cast
+
+import numpy as np
+import numpy.typing as npt
+
+from src.engine.constants import (
+    COMPONENT_STORAGE_COLUMNAR,
+    COMPONENT_STORAGE_SPARSE,
+)
+from src.engine.types import Archetype, Component, Entity, RowIndex
+
+from .storage import ArrayColumn, Column, SparseSet
+
+if TYPE_CHECKING:
+    from .ecs import ECS
+
+
+@dataclass(frozen=True)
+class Added:
+    """Only match rows whose `component_type` was added after `since`.
+
+    Can be spelled either `Added(Position)` or `Added[Position]`.
+    """
+
+    component_type: type[Component]
+
+    def __class_getitem__(cls, component_type: type[Component]) -> Self:
+        return cls(component_type)
+
+
+@dataclass(frozen=True)
+class Changed:
+    """Only match rows whose `component_type` was added or written after
+    `since`.
+
+    Can be spelled either `Changed(Position)` or `Changed[Position]`.
+    """
+
+    component_type: type[Component]
+
+    def __class_getitem__(cls, component_type: type[Component]) -> Self:
+        return cls(component_type)
+
+
+type QueryFilter = Added | Changed
+
+
+class Query[C: Component]:
+    """A query which remembers its matching archetypes and results.
+
+    The matching archetypes are only searched for again once the ECS creates
+    a new archetype, and the flattened results are only rebuilt once one of
+    those archetypes changes structurally (an entity is spawned into, moved
+    into or removed from it). Otherwise :py:meth:`fetch` returns the previous
+    lists as they are.
+
+    Queries with change filters can't reuse results, since those depend on
+    `since`, but still reuse the matching archetypes. The same goes for
+    queries involving sparse component types, which are joined per entity.
+
+    Attributes:
+        ecs: The ECS this query runs against.
+        component_types: The component types to fetch.
+        filters: Row filters, their types are required to match as well.
+        with_: Types matching archetypes must have, without fetching them.
+        without: Types matching archetypes must not have.
+        archetypes: The matching archetypes, as of the last fetch.
+    """
+
+    ecs: "ECS"
+    component_types: tuple[type[C], ...]
+    filters: tuple[QueryFilter, ...]
+    with_: tuple[type[Component], ...]
+    without: tuple[type[Component], ...]
+    archetypes: list[Archetype]
+
+    _sparse_types: tuple[type[Component], ...]
+    _sparse_without: tuple[type[Component], ...]
+    _lock: Lock
+    _archetype_generation: int
+    _generations: list[int] | None
+    _entities: list[Entity]
+    _lists: dict[type[C], list[C]]
+    _views: dict[type[C], list[npt.NDArray[Any]]]
+
+    def __init__(
+        self,
+        ecs: "ECS",
+        component_types: Collection[type[C]],
+        filters: Collection[QueryFilter] = (),
+        with_: Collection[type[Component]] = (),
+        without: Collection[type[Component]] = (),
+    ):
+        self.ecs = ecs
+        self.component_types = tuple(component_types)
+        self.filters = tuple(filters)
+        self.with_ = tuple(with_)
+        self.without = tuple(without)
+
+        self._sparse_types = tuple(
+            t
+            for t in dict.fromkeys(
+                (
+                    *self.component_types,
+                    *self.with_,
+                    *(query_filter.component_type for query_filter in filters),
+                )
+            )
+            if t.storage == COMPONENT_STORAGE_SPARSE
+        )
+        self._sparse_without = tuple(
+            t for t in self.without if t.storage == COMPONENT_STORAGE_SPARSE
+        )
+        self.archetypes = []
+
+        # parallel systems may fetch the same cached query concurrently.
+        self._lock = Lock()
+        self._archetype_generation = -1
+        self._generations = None
+        self._entities = []
+        self._lists = {}
+        self._views = {}
+
+    def fetch(
+        self, since: int = 0, mutable: Collection[type[C]] = ()
+    ) -> tuple[list[Entity], dict[type[C], list[C] | npt.NDArray[Any]]]:
+        """Return the matching entities and components, see
+        :py:meth:`src.engine.ecs.ecs.ECS.query`.
+        """
+
+        if self.filters or self._sparse_types or self._sparse_without:
+            return self._fetch_filtered(since, mutable)
+
+        ecs = self.ecs
+        with self._lock:
+            self._refresh_archetypes()
+
+            generations = [ecs.generations[a] for a in self.archetypes]
+            if generations != self._generations:
+                self._rebuild()
+                self._generations = generations
+            entities, lists, views = self._entities, self._lists, self._views
+
+        for component_type in mutable:
+            for archetype in self.archetypes:
+                ticks = ecs.ticks[archetype][component_type]
+                ticks.mark(ecs.change_tick)
+
+        result: dict[type[C], list[C] | npt.NDArray[Any]] = {}
+        for t in self.component_types:
+            if t in lists:
+                result[t] = lists[t]
+            elif len(views[t]) == 1:
+                result[t] = views[t][0]
+            else:
+                # copies can't be cached, the values may change in between.
+                result[t] = self._concatenate(t, views[t])
+
+        return entities, result
+
+    def chunks(
+        self, since: int = 0, mutable: Collection[type[C]] = ()
+    ) -> Iterator[tuple[list[Entity], tuple[list[C] | npt.NDArray[Any], ...]]]:
+        """Yield one `(entities, columns)` batch per non-empty archetype.
+
+        Nothing is copied: `entities` is the archetype's own row list and each
+        column is either the archetype's component list or a view over its
+        array, in the order of :py:attr:`component_types`. Don't spawn, remove
+        or set components while iterating, since that moves rows around.
+
+        With filters, archetypes where only some rows pass yield copies of
+        just those rows instead. Sparse components are always gathered into
+        new lists.
+        """
+
+        self._refresh_archetypes()
+        candidates = self._sparse_candidates()
+        for archetype in self.archetypes:
+            entities = self.ecs.entity_rows[archetype]
+            if not entities:
+                continue
+
+            rows: npt.NDArray[np.intp] | None = None
+            if candidates is not None:
+                rows = candidates.get(archetype)
+                if rows is None:
+                    continue
+
+            rows = self._filter_rows(archetype, entities, rows, since)
+            if rows is not None and not len(rows):
+                continue
+
+            if rows is not None:
+                entities = [entities[row] for row in rows.tolist()]
+
+            self._mark_mutable(archetype, entities, rows, mutable)
+
+            component_data = self.ecs.components[archetype]
+            columns = tuple(
+                self._sparse_column(t, entities)
+                if t.storage == COMPONENT_STORAGE_SPARSE
+                else self._column(component_data[t], rows)
+                for t in self.component_types
+            )
+            yield entities, columns
+
+    def _fetch_filtered(
+        self, since: int, mutable: Collection[type[C]]
+    ) -> tuple[list[Entity], dict[type[C], list[C] | npt.NDArray[Any]]]:
+        entities: list[Entity] = []
+        lists: dict[type[C], list[C]] = {}
+        views: dict[type[C], list[npt.NDArray[Any]]] = {}
+        for t in self.component_types:
+            if t.storage == COMPONENT_STORAGE_COLUMNAR:
+                views[t] = []
+            else:
+                lists[t] = []
+
+        for chunk_entities, columns in self.chunks(since, mutable):
+            entities.extend(chunk_entities)
+            for t, column in zip(self.component_types, columns):
+                if t in lists:
+                    lists[t].extend(cast(list[C], column))
+                else:
+                    views[t].append(cast(npt.NDArray[Any], column))
+
+        result: dict[type[C], list[C] | npt.NDArray[Any]] = {}
+        for t in self.component_types:
+            if t in lists:
+                result[t] = lists[t]
+            else:
+                result[t] = self._concatenate(t, views[t])
+
+        return entities, result
+
+    def _sparse_candidates(
+        self,
+    ) -> dict[Archetype, npt.NDArray[np.intp]] | None:
+        """Find the rows of entities having every required sparse type.
+
+        Driven by the smallest sparse set, so a query for a rare tag only
+        looks at the entities carrying it.
+
+        Returns:
+            The sorted candidate rows per matching archetype, or `None` if no
+            sparse types are required.
+        """
+
+        if not self._sparse_types:
+            return None
+
+        sparse_sets: list[SparseSet[Component]] = []
+        for component_type in self._sparse_types:
+            sparse_set = self.ecs.sparse.get(component_type)
+            if not sparse_set:
+                return {}
+            sparse_sets.append(sparse_set)
+
+        sparse_sets.sort(key=len)
+        smallest, others = sparse_sets[0], sparse_sets[1:]
+        matching = set(self.archetypes)
+        locations = self.ecs.entities
+
+        rows_by_archetype: dict[Archetype, list[RowIndex]] = {}
+        for entity in smallest.entities:
+            if others and not all(entity in other for other in others):
+                continue
+            archetype, row = locations[entity]
+            if archetype in matching:
+                rows_by_archetype.setdefault(archetype, []).append(row)
+
+        return {
+            archetype: np.sort(np.array(rows, dtype=np.intp))
+            for archetype, rows in rows_by_archetype.items()
+        }
+
+    def _filter_rows(
+        self,
+        archetype: Archetype,
+        entities: list[Entity],
+        rows: npt.NDArray[np.intp] | None,
+        since: int,
+    ) -> npt.NDArray[np.intp] | None:
+        """Narrow `rows` down to those passing every filter and sparse
+        exclusion, `None` meaning all of the archetype's rows.
+        """
+
+        if not self.filters and not self._sparse_without:
+            return rows
+
+        ecs = self.ecs
+        selected = (
+            entities if rows is None else [entities[r] for r in rows.tolist()]
+        )
+        passed = np.ones(len(selected), dtype=np.bool_)
+
+        for component_type in self._sparse_without:
+            sparse_set = ecs.sparse.get(component_type)
+            if sparse_set:
+                passed &= np.fromiter(
+                    (entity not in sparse_set for entity in selected),
+                    dtype=np.bool_,
+                    count=len(selected),
+                )
+
+        ticks = ecs.ticks[archetype]
+        for query_filter in self.filters:
+            component_type = query_filter.component_type
+            added = isinstance(query_filter, Added)
+            if component_type.storage == COMPONENT_STORAGE_SPARSE:
+                sparse_set = ecs.sparse[component_type]
+                mask = sparse_set.ticks.since(since, added)
+                passed &= mask[self._dense_rows(sparse_set, selected)]
+            else:
+                mask = ticks[component_type].since(since, added)
+                passed &= mask if rows is None else mask[rows]
+
+        if passed.all():
+            return rows
+        indices = np.flatnonzero(passed)
+        return indices if rows is None else rows[indices]
+
+    def _mark_mutable(
+        self,
+        archetype: Archetype,
+        entities: list[Entity],
+        rows: npt.NDArray[np.intp] | None,
+        mutable: Collection[type[C]],
+    ) -> None:
+        ecs = self.ecs
+        ticks = ecs.ticks[archetype]
+        for component_type in mutable:
+            if component_type.storage == COMPONENT_STORAGE_SPARSE:
+                sparse_set = ecs.sparse[component_type]
+                sparse_set.ticks.mark(
+                    ecs.change_tick, self._dense_rows(sparse_set, entities)
+                )
+            else:
+                ticks[component_type].mark(ecs.change_tick, rows)
+
+    def _sparse_column(
+        self, component_type: type[C], entities: list[Entity]
+    ) -> list[C]:
+        sparse_set = cast(SparseSet[C], self.ecs.sparse[component_type])
+        values = sparse_set.values
+        return [values[sparse_set.dense_index(entity)] for entity in entities]
+
+    @staticmethod
+    def _dense_rows(
+        sparse_set: SparseSet[Component], entities: list[Entity]
+    ) -> npt.NDArray[np.intp]:
+        return np.fromiter(
+            (sparse_set.dense_index(entity) for entity in entities),
+            dtype=np.intp,
+            count=len(entities),
+        )
+
+    @staticmethod
+    def _column(
+        column: Column, rows: npt.NDArray[np.intp] | None
+    ) -> list[C] | npt.NDArray[Any]:
+        if isinstance(column, ArrayColumn):
+            if rows is None:
+                return column.view()
+            return column.view()[rows]
+
+        if rows is None:
+            return cast(list[C], column)
+        return [cast(C, column[row]) for row in rows.tolist()]
+
+    def _refresh_archetypes(self) -> None:
+        ecs = self.ecs
+        if self._archetype_generation == ecs.archetype_generation:
+            return
+
+        required: list[type[Component]] = list(self.component_types)
+        for component_type in (
+            *self.with_,
+            *(query_filter.component_type for query_filter in self.filters),
+        ):
+            if component_type not in required:
+                required.append(component_type)
+
+        # sparse types aren't part of any archetype, chunks() joins them.
+        archetypes = ecs.find_archetypes(
+            [t for t in required if t not in self._sparse_types],
+            [t for t in self.without if t not in self._sparse_without],
+        )
+        if archetypes != self.archetypes:
+            self.archetypes = archetypes
+            self._generations = None
+        self._archetype_generation = ecs.archetype_generation
+
+    def _rebuild(self) -> None:
+        self._entities = []
+        self._lists = {}
+        self._views = {}
+        for t in self.component_types:
+            if t.storage == COMPONENT_STORAGE_COLUMNAR:
+                self._views[t] = []
+            else:
+                self._lists[t] = []
+
+        # this is still a little slow, but "good enough" for now.
+        # it only runs after structural changes though.
+        for archetype in self.archetypes:
+            component_data = self.ecs.components[archetype]
+
+            self._entities.extend(self.ecs.entity_rows[archetype])
+
+            for t, values in self._lists.items():
+                values.extend(cast(list[C], component_data[t]))
+            for t, views in self._views.items():
+                views.append(cast(ArrayColumn[C], component_data[t]).view())
+
+    @staticmethod
+    def _concatenate(
+        component_type: type[Component], views: list[npt.NDArray[Any]]
+    ) -> npt.NDArray[Any]:
+        if views:
+            return np.concatenate(views)
+        return ArrayColumn(component_type, capacity=1).view()
@@ -0,0 +1,177 @@
+"""Parallel ECS system scheduler.
+
+Systems declare which component types they read and which they write. Two
+systems conflict if either writes a type the other one touches. Within a
+stage, systems are packed into batches of mutually non-conflicting systems,
+and every batch runs concurrently on a worker pool. Batches and stages are
+separated by barriers, so a system always sees the writes of earlier batches.
+Structural changes recorded into `ecs.commands` are applied after every stage.
+
+On a regular CPython build the workers still share the GIL, so only systems
+which release it (NumPy on columnar storage, mostly) actually overlap. On a
+free-threaded build (3.14t) pure-Python systems scale as well.
+"""
+
+import os
+from collections.abc import Callable, Collection
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from src.engine.event_manager import EventManager
+from src.engine.events import UpdateTick
+from src.engine.stages import Stage, StagedRunner, Task
+from src.engine.types import Component
+
+from .ecs import ECS
+
+type SystemCallback = Callable[[ECS, float], None]
+
+DEFAULT_STAGE: str = "update"
+
+
+@dataclass
+class System(Task):
+    """A registered system, see :py:class:`src.engine.stages.Task` for its
+    name, stage and timings.
+
+    Attributes:
+        callback: Called with the ECS and the tick's `dt`.
+        reads: Component types the system only reads.
+        writes: Component types the system writes.
+    """
+
+    callback: SystemCallback
+    reads: frozenset[type[Component]]
+    writes: frozenset[type[Component]]
+
+    def conflicts_with(self, other: "System") -> bool:
+        """Whether the two systems can't safely run at the same time."""
+
+        return bool(
+            self.writes & (other.reads | other.writes)
+            or other.writes & self.reads
+        )
+
+
+class Scheduler(StagedRunner[System]):
+    """Runs registered systems in stages, in parallel where possible.
+
+    Attributes:
+        ecs: The ECS handed to every system.
+    """
+
+    ecs: ECS
+
+    def __init__(
+        self,
+        ecs: ECS,
+        stages: Collection[str] = (DEFAULT_STAGE,),
+        max_workers: int | None = None,
+        executor: ThreadPoolExecutor | None = None,
+    ) -> None:
+        """Create the stages.
+
+        Args:
+            ecs: The ECS handed to every system.
+            stages: The stage names, in execution order.
+            max_workers: The size of the worker pool, the CPU count by
+                default.
+            executor: A worker pool to share instead of creating one.
+        """
+
+        super().__init__(
+            stages,
+            max_workers or os.cpu_count() or 1,
+            "ecs-system",
+            executor,
+        )
+        self.ecs = ecs
+
+    def add_system(
+        self,
+        callback: SystemCallback,
+        reads: Collection[type[Component]] = (),
+        writes: Collection[type[Component]] = (),
+        stage: str = DEFAULT_STAGE,
+        name: str | None = None,
+    ) -> System:
+        """Register a system.
+
+        Raises:
+            KeyError: if the stage doesn't exist.
+            ValueError: if a system with the same name is already registered.
+        """
+
+        return self._add(
+            System(
+                name=name or callback.__qualname__,
+                callback=callback,
+                reads=frozenset(reads),
+                writes=frozenset(writes),
+                stage=stage,
+                threadsafe=True,
+            )
+        )
+
+    def system(
+        self,
+        reads: Collection[type[Component]] = (),
+        writes: Collection[type[Component]] = (),
+        stage: str = DEFAULT_STAGE,
+    ) -> Callable[[SystemCallback], SystemCallback]:
+        """Decorator version of :py:meth:`add_system`."""
+
+        def register(callback: SystemCallback) -> SystemCallback:
+            _ = self.add_system(callback, reads, writes, stage)
+            return callback
+
+        return register
+
+    def remove_system(self, name: str) -> None:
+        self._remove(name)
+
+    @property
+    def systems(self) -> dict[str, System]:
+        return self.tasks
+
+    def listen(self, event_manager: EventManager) -> None:
+        """Run every stage on each `UpdateTick`."""
+
+        event_manager.listen(UpdateTick, self.on_update_tick)
+
+    def on_update_tick(self, event: UpdateTick) -> None:
+        self.run(event.dt)
+
+    def run(self, dt: float) -> None:
+        """Run every stage once, in order.
+
+        `ecs.commands` is applied at the end of each stage, which is the only
+        point where systems may see structural changes. Exceptions raised by
+        systems are re-raised once their batch is done.
+        """
+
+        ecs = self.ecs
+        self._run_stages(
+            lambda system: system.callback(ecs, dt), ecs.commands.apply
+        )
+
+    def _pack(self, stage: Stage[System]) -> list[list[System]]:
+        """Greedily colour the stage's conflict graph.
+
+        Every system goes into the earliest batch after the last one holding
+        a system it conflicts with, so conflicting systems keep their
+        registration order.
+        """
+
+        batches: list[list[System]] = []
+        for system in stage.tasks:
+            after = -1
+            for index, batch in enumerate(batches):
+                if any(system.conflicts_with(other) for other in batch):
+                    after = index
+
+            if after + 1 == len(batches):
+                batches.append([system])
+            else:
+                batches[after + 1].append(system)
+        return batches
@@ -0,0 +1,363 @@
+"""Compact binary snapshots of a whole ECS world.
+
+A snapshot file is laid out as::
+
+    magic | header length (u64, little endian) | JSON header | buffers
+
+The JSON header lists the component types by stable name (see
+:py:func:`component_name`) with their type ids, and describes every buffer
+by offset, dtype and shape. The buffers hold each archetype's columns as
+contiguous typed arrays, aligned to
+:py:data:`src.engine.constants.ECS_SNAPSHOT_ALIGNMENT` bytes: columnar
+components as their `(n, fields)` array, table and sparse components as one
+array per field.
+
+:py:func:`load` memory-maps the file copy-on-write. Columnar components keep
+using the mapped arrays directly, so they're paged in lazily and never turned
+into Python objects. Table and sparse components still have to be built into
+instances, one per entity.
+
+Only components whose fields are all `bool`, `int` or `float` (or which have
+no fields at all) can be saved. Pending `ecs.commands` are not saved.
+"""
+
+import json
+from collections.abc import Collection
+from operator import attrgetter
+from os import PathLike
+from typing import Any, cast
+
+import numpy as np
+import numpy.typing as npt
+
+from src.engine.constants import (
+    ECS_SNAPSHOT_ALIGNMENT,
+    ECS_SNAPSHOT_MAGIC,
+    ECS_SNAPSHOT_VERSION,
+)
+from src.engine.types import Component
+
+from .ecs import ECS
+from .entities import EntityTable
+from .storage import (
+    ArrayColumn,
+    Column,
+    ComponentTicks,
+    column_dtype,
+    field_dtypes,
+)
+
+type BufferSpec = dict[str, Any]
+"""Where a buffer lives in the file: its offset, dtype and shape."""
+
+HEADER_START: int = len(ECS_SNAPSHOT_MAGIC) + 8
+
+
+def component_name(component_type: type[Component]) -> str:
+    """The name a component type is saved under.
+
+    It doesn't depend on registration order, so snapshots stay loadable as
+    long as the component keeps its module, name and fields.
+    """
+
+    return f"{component_type.__module__}.{component_type.__qualname__}"
+
+
+def save(ecs: ECS, path: str | PathLike[str]) -> int:
+    """Write a snapshot of `ecs` to `path`.
+
+    Returns:
+        The size of the snapshot, in bytes.
+
+    Raises:
+        TypeError: if a component type has a non-numeric field. Nothing is
+            written in that case.
+    """
+
+    writer = _BufferWriter()
+    dtypes = {t: field_dtypes(t) for t in ecs.types.values()}
+    dtypes.update({t: field_dtypes(t) for t in ecs.sparse})
+
+    entity_buffers = ecs.entities.buffers()
+    header: dict[str, Any] = {
+        "version": ECS_SNAPSHOT_VERSION,
+        "change_tick": ecs.change_tick,
+        "types": [
+            {
+                "id": type_id,
+                "name": component_name(t),
+                "field_names": list(dtypes[t]),
+            }
+            for type_id, t in ecs.types.items()
+        ],
+        "entities": {
+            "archetype_masks": ecs.entities.archetype_masks,
+            **{
+                name: writer.add(np.frombuffer(buffer, buffer.typecode))
+                for name, buffer in entity_buffers.items()
+            },
+        },
+        "archetypes": [],
+        "sparse": [],
+    }
+
+    for archetype, info in ecs.archetypes.items():
+        columns: dict[str, dict[str, Any]] = {}
+        for t in info.types:
+            ticks = ecs.ticks[archetype][t]
+            columns[component_name(t)] = {
+                **_save_column(writer, ecs.components[archetype][t], dtypes[t]),
+                "added": writer.add(np.frombuffer(ticks.added, np.int64)),
+                "changed": writer.add(np.frombuffer(ticks.changed, np.int64)),
+            }
+
+        header["archetypes"].append(
+            {
+                "mask": archetype,
+                "entities": writer.add(
+                    np.array(ecs.entity_rows[archetype], dtype=np.int64)
+                ),
+                "columns": columns,
+            }
+        )
+
+    for t, sparse_set in ecs.sparse.items():
+        header["sparse"].append(
+            {
+                "name": component_name(t),
+                "field_names": list(dtypes[t]),
+                "entities": writer.add(
+                    np.array(sparse_set.entities, dtype=np.int64)
+                ),
+                **_save_column(writer, sparse_set.values, dtypes[t]),
+                "added": writer.add(
+                    np.frombuffer(sparse_set.ticks.added, np.int64)
+                ),
+                "changed": writer.add(
+                    np.frombuffer(sparse_set.ticks.changed, np.int64)
+                ),
+            }
+        )
+
+    encoded = json.dumps(header, separators=(",", ":")).encode()
+    data_start = _align(HEADER_START + len(encoded))
+    with open(path, "wb") as file:
+        _ = file.write(ECS_SNAPSHOT_MAGIC)
+        _ = file.write(len(encoded).to_bytes(8, "little"))
+        _ = file.write(encoded)
+        writer.write(file, data_start - HEADER_START - len(encoded))
+
+    return data_start + writer.size
+
+
+def load(
+    path: str | PathLike[str], component_types: Collection[type[Component]]
+) -> ECS:
+    """Restore an ECS from a snapshot written by :py:func:`save`.
+
+    Args:
+        path: The snapshot file.
+        component_types: Every component type the snapshot may contain. They
+            are matched up by :py:func:`component_name`.
+
+    Raises:
+        ValueError: if the file isn't a snapshot of a supported version, or a
+            component's fields changed since it was saved.
+        KeyError: if the snapshot contains an unknown component type.
+    """
+
+    mapped = np.memmap(path, dtype=np.uint8, mode="c")
+    if bytes(mapped[: len(ECS_SNAPSHOT_MAGIC)]) != ECS_SNAPSHOT_MAGIC:
+        raise ValueError(f"{path} is not an ECS snapshot")
+
+    header_length = int.from_bytes(
+        bytes(mapped[len(ECS_SNAPSHOT_MAGIC) : HEADER_START]), "little"
+    )
+    header = json.loads(
+        bytes(mapped[HEADER_START : HEADER_START + header_length])
+    )
+    if header["version"] != ECS_SNAPSHOT_VERSION:
+        raise ValueError(
+            f"Unsupported ECS snapshot version {header['version']}"
+        )
+
+    reader = _BufferReader(mapped, _align(HEADER_START + header_length))
+    registry = {component_name(t): t for t in component_types}
+
+    ecs = ECS()
+    ecs.change_tick = header["change_tick"]
+    for saved in header["types"]:
+        component_type = _resolve(registry, saved["name"], saved["field_names"])
+        ecs.register_type(component_type, saved["id"])
+
+    for saved in header["archetypes"]:
+        types = frozenset(
+            _resolve(registry, name, None) for name in saved["columns"]
+        )
+        archetype = ecs.determine_archetype(types)
+        if archetype != saved["mask"]:
+            raise ValueError("Snapshot archetype doesn't match its types")
+
+        ecs.entity_rows[archetype] = reader.read(saved["entities"]).tolist()
+        for name, column in saved["columns"].items():
+            component_type = registry[name]
+            ecs.components[archetype][component_type] = _load_column(
+                reader,
+                component_type,
+                column,
+                len(ecs.entity_rows[archetype]),
+                as_array=isinstance(
+                    ecs.components[archetype][component_type], ArrayColumn
+                ),
+            )
+            ecs.ticks[archetype][component_type] = ComponentTicks.from_buffers(
+                reader.raw(column["added"]), reader.raw(column["changed"])
+            )
+
+    entities = header["entities"]
+    ecs.entities = EntityTable.from_buffers(
+        {
+            name: reader.raw(entities[name])
+            for name in ("generations", "archetypes", "rows", "free")
+        },
+        entities["archetype_masks"],
+    )
+
+    for saved in header["sparse"]:
+        component_type = _resolve(registry, saved["name"], saved["field_names"])
+        sparse_set = ecs.sparse_set(component_type)
+        owners = reader.read(saved["entities"]).tolist()
+        values = cast(
+            list[Component],
+            _load_column(reader, component_type, saved, len(owners)),
+        )
+        for entity, value in zip(owners, values):
+            sparse_set.insert(entity, value, ecs.change_tick)
+        sparse_set.ticks = ComponentTicks.from_buffers(
+            reader.raw(saved["added"]), reader.raw(saved["changed"])
+        )
+
+    return ecs
+
+
+def _resolve(
+    registry: dict[str, type[Component]],
+    name: str,
+    saved_fields: list[str] | None,
+) -> type[Component]:
+    component_type = registry.get(name)
+    if component_type is None:
+        raise KeyError(f"Snapshot component '{name}' is not registered")
+
+    if saved_fields is not None:
+        current = list(field_dtypes(component_type))
+        if current != saved_fields:
+            raise ValueError(
+                f"Fields of {name} changed since the snapshot was saved:"
+                + f" {saved_fields} -> {current}"
+            )
+    return component_type
+
+
+def _save_column(
+    writer: "_BufferWriter",
+    column: Column,
+    dtypes: dict[str, np.dtype[Any]],
+) -> dict[str, Any]:
+    if isinstance(column, ArrayColumn):
+        return {"data": writer.add(column.view())}
+
+    n = len(column)
+    return {
+        "fields": [
+            writer.add(
+                np.fromiter(map(attrgetter(name), column), dtype, count=n)
+            )
+            for name, dtype in dtypes.items()
+        ]
+    }
+
+
+def _load_column(
+    reader: "_BufferReader",
+    component_type: type[Component],
+    saved: dict[str, Any],
+    n: int,
+    as_array: bool = False,
+) -> Column:
+    # the storage of a type may have been switched since it was saved.
+    if as_array:
+        if "data" in saved:
+            data = reader.read(saved["data"])
+        else:
+            data = np.column_stack(
+                [reader.read(spec) for spec in saved["fields"]]
+            ).astype(column_dtype(component_type))
+        return ArrayColumn.from_array(component_type, data)
+
+    if "data" in saved:
+        rows = reader.read(saved["data"])
+        field_values = [rows[:, i].tolist() for i in range(rows.shape[1])]
+    else:
+        field_values = [reader.read(spec).tolist() for spec in saved["fields"]]
+
+    if not field_values:
+        return [component_type() for _ in range(n)]
+    return list(map(component_type, *field_values))
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ECS_SNAPSHOT_ALIGNMENT) * ECS_SNAPSHOT_ALIGNMENT
+
+
+class _BufferWriter:
+    """Lays out buffers back to back, aligned, and writes them out."""
+
+    size: int
+    _buffers: list[tuple[int, npt.NDArray[Any]]]
+
+    def __init__(self) -> None:
+        self.size = 0
+        self._buffers = []
+
+    def add(self, data: npt.NDArray[Any]) -> BufferSpec:
+        data = np.ascontiguousarray(data)
+        offset = _align(self.size)
+        self._buffers.append((offset, data))
+        self.size = offset + data.nbytes
+        return {
+            "offset": offset,
+            "dtype": data.dtype.str,
+            "shape": list(data.shape),
+        }
+
+    def write(self, file: Any, padding: int) -> None:
+        _ = file.write(bytes(padding))
+        position = 0
+        for offset, data in self._buffers:
+            _ = file.write(bytes(offset - position))
+            _ = file.write(data.reshape(-1).view(np.uint8))
+            position = offset + data.nbytes
+
+
+class _BufferReader:
+    """Hands out typed views into the mapped snapshot."""
+
+    _mapped: npt.NDArray[np.uint8]
+    _data_start: int
+
+    def __init__(self, mapped: npt.NDArray[np.uint8], data_start: int) -> None:
+        self._mapped = mapped
+        self._data_start = data_start
+
+    def read(self, spec: BufferSpec) -> npt.NDArray[Any]:
+        dtype = np.dtype(spec["dtype"])
+        return self.raw(spec).view(dtype).reshape(tuple(spec["shape"]))
+
+    def raw(self, spec: BufferSpec) -> npt.NDArray[np.uint8]:
+        """The buffer's bytes, for `array.frombytes`."""
+
+        itemsize = np.dtype(spec["dtype"]).itemsize
+        start = self._data_start + spec["offset"]
+        end = start + int(np.prod(spec["shape"], dtype=np.int64)) * itemsize
+        return np.asarray(self._mapped[start:end])
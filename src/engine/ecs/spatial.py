@@ -0,0 +1,311 @@
+"""A uniform-grid spatial hash over a position component.
+
+Entities are bucketed into cubic cells of `cell_size`, so proximity queries
+only look at the handful of cells overlapping the query volume instead of
+every position in the world.
+
+The index follows the ECS in two ways. Removals (of the component or of the
+whole entity) are picked up immediately through component hooks. New and
+moved positions are picked up by :py:meth:`SpatialIndex.sync`, which
+re-buckets the rows whose position changed since the previous sync, based on
+the ECS change ticks. Writes to a position in place therefore have to be
+flagged, either with `mutable=` on the query or with `ECS.mark_changed`.
+"""
+
+from collections.abc import Iterator, Sequence
+from dataclasses import fields as dataclass_fields
+from itertools import product
+from operator import attrgetter
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from src.engine.default_config import (
+    ECS_SPATIAL_CELL_SIZE as DEFAULT_CELL_SIZE,
+)
+from src.engine.types import Component, Entity
+
+from .ecs import ECS
+from .query import Changed
+from .storage import field_dtypes
+
+type Cell = tuple[int, ...]
+
+
+class SpatialIndex:
+    """Uniform grid of the entities having a position component.
+
+    Attributes:
+        ecs: The indexed ECS.
+        component_type: The position component.
+        fields: The component's coordinate fields, one per dimension.
+        cell_size: Edge length of a grid cell. Queries are cheapest when it's
+            around the typical query radius.
+        cells: The entities in every occupied cell.
+    """
+
+    ecs: ECS
+    component_type: type[Component]
+    fields: tuple[str, ...]
+    cell_size: float
+    cells: dict[Cell, set[Entity]]
+
+    _entity_cells: dict[Entity, Cell]
+    _positions: dict[Entity, tuple[float, ...]]
+    _since: int
+
+    def __init__(
+        self,
+        ecs: ECS,
+        component_type: type[Component],
+        cell_size: float = DEFAULT_CELL_SIZE,
+        fields: Sequence[str] | None = None,
+    ) -> None:
+        """Initialize the index and hook it up to the ECS.
+
+        Args:
+            ecs: The ECS to index.
+            component_type: The position component.
+            cell_size: Edge length of a grid cell.
+            fields: The coordinate fields. Defaults to every field of the
+                component, in order.
+        """
+
+        if cell_size <= 0:
+            raise ValueError(f"cell_size must be positive, got {cell_size}")
+
+        self.ecs = ecs
+        self.component_type = component_type
+        self.fields = tuple(
+            fields or (field.name for field in dataclass_fields(component_type))
+        )
+        self.cell_size = cell_size
+        self.cells = {}
+
+        self._entity_cells = {}
+        self._positions = {}
+        self._since = 0
+
+        ecs.add_hooks(component_type, on_remove=self.forget)
+
+    def __len__(self) -> int:
+        return len(self._entity_cells)
+
+    def __contains__(self, entity: Entity) -> bool:
+        return entity in self._entity_cells
+
+    def close(self) -> None:
+        """Unhook the index from the ECS."""
+
+        self.ecs.remove_hooks(self.component_type, on_remove=self.forget)
+
+    def sync(self) -> int:
+        """Re-bucket every position added or changed since the last sync.
+
+        Returns:
+            How many entities were re-bucketed.
+        """
+
+        ecs = self.ecs
+        since = self._since
+        self._since = ecs.advance_tick()
+
+        synced = 0
+        for entities, (column,) in ecs.query_chunks(
+            self.component_type,
+            filters=[Changed(self.component_type)],
+            since=since,
+        ):
+            self._update(entities, self._coordinates(column))
+            synced += len(entities)
+        return synced
+
+    def forget(self, entity: Entity) -> None:
+        """Drop an entity from the index, if it's in there."""
+
+        cell = self._entity_cells.pop(entity, None)
+        if cell is None:
+            return
+
+        del self._positions[entity]
+        members = self.cells[cell]
+        members.discard(entity)
+        if not members:
+            del self.cells[cell]
+
+    def position(self, entity: Entity) -> tuple[float, ...]:
+        """The entity's position as of the last sync."""
+
+        return self._positions[entity]
+
+    def query_radius(
+        self, center: Sequence[float], radius: float
+    ) -> list[Entity]:
+        """Find the entities within `radius` of `center`, inclusive."""
+
+        center_array = np.asarray(center, dtype=np.float64)
+        entities, positions = self._candidates(
+            center_array - radius, center_array + radius
+        )
+        if not entities:
+            return []
+
+        distances = ((positions - center_array) ** 2).sum(axis=1)
+        return [entities[i] for i in np.flatnonzero(distances <= radius**2)]
+
+    def query_aabb(
+        self, minimum: Sequence[float], maximum: Sequence[float]
+    ) -> list[Entity]:
+        """Find the entities inside an axis-aligned box, bounds inclusive."""
+
+        low = np.asarray(minimum, dtype=np.float64)
+        high = np.asarray(maximum, dtype=np.float64)
+        entities, positions = self._candidates(low, high)
+        if not entities:
+            return []
+
+        inside = ((positions >= low) & (positions <= high)).all(axis=1)
+        return [entities[i] for i in np.flatnonzero(inside)]
+
+    def pairs(self, radius: float) -> npt.NDArray[np.int64]:
+        """Enumerate every pair of entities at most `radius` apart.
+
+        Entities are sorted by cell, then every neighbouring cell pair is
+        joined once, for all entities at a time, so the cost grows with the
+        number of candidate pairs rather than with the number of cells.
+
+        Returns:
+            An `(n, 2)` array of entity pairs, each pair listed once.
+        """
+
+        if len(self._positions) < 2:
+            return np.empty((0, 2), dtype=np.int64)
+
+        dimensions = len(self.fields)
+        reach = max(1, int(np.ceil(radius / self.cell_size)))
+        # half of the neighbourhood, so every cell pair comes up only once.
+        offsets = np.array(
+            [
+                offset
+                for offset in product(
+                    range(-reach, reach + 1), repeat=dimensions
+                )
+                if offset >= (0,) * dimensions
+            ],
+            dtype=np.int64,
+        )
+
+        entities = np.fromiter(self._positions, np.int64, len(self._positions))
+        positions = np.array(list(self._positions.values()), dtype=np.float64)
+        cells = np.floor(positions / self.cell_size).astype(np.int64)
+        cells -= cells.min(axis=0) - reach
+        extent = cells.max(axis=0) + reach + 1
+        strides = np.cumprod([1, *extent[:-1]], dtype=np.int64)
+
+        keys = cells @ strides
+        order = np.argsort(keys, kind="stable")
+        keys, entities, positions = (
+            keys[order],
+            entities[order],
+            positions[order],
+        )
+        occupied, starts, counts = np.unique(
+            keys, return_index=True, return_counts=True
+        )
+
+        found: list[npt.NDArray[np.int64]] = []
+        for offset in offsets:
+            targets = keys + offset @ strides
+            slots = np.searchsorted(occupied, targets).clip(
+                max=len(occupied) - 1
+            )
+            first = np.flatnonzero(occupied[slots] == targets)
+            begin = starts[slots[first]]
+            end = begin + counts[slots[first]]
+            if not offset.any():
+                # within a cell, only pair up with the entities after.
+                begin = first + 1
+            count = (end - begin).clip(min=0)
+
+            total = int(count.sum())
+            if not total:
+                continue
+            a = np.repeat(first, count)
+            b = np.repeat(begin - np.cumsum(count) + count, count)
+            b += np.arange(total)
+
+            distances = ((positions[a] - positions[b]) ** 2).sum(axis=1)
+            close = distances <= radius**2
+            found.append(np.stack([entities[a[close]], entities[b[close]]], 1))
+
+        if not found:
+            return np.empty((0, 2), dtype=np.int64)
+        return np.concatenate(found)
+
+    def cell_of(self, position: Sequence[float]) -> Cell:
+        """The grid cell a position falls into."""
+
+        return tuple(int(c // self.cell_size) for c in position)
+
+    def _cells_between(
+        self, low: npt.NDArray[Any], high: npt.NDArray[Any]
+    ) -> Iterator[Cell]:
+        first = np.floor(low / self.cell_size).astype(np.int64).tolist()
+        last = np.floor(high / self.cell_size).astype(np.int64).tolist()
+
+        # past a point, walking the occupied cells is cheaper.
+        volume = int(np.prod([b - a + 1 for a, b in zip(first, last)]))
+        if volume > len(self.cells):
+            for cell in self.cells:
+                if all(a <= c <= b for a, c, b in zip(first, cell, last)):
+                    yield cell
+            return
+
+        yield from product(
+            *(range(a, b + 1) for a, b in zip(first, last, strict=True))
+        )
+
+    def _candidates(
+        self, low: npt.NDArray[Any], high: npt.NDArray[Any]
+    ) -> tuple[list[Entity], npt.NDArray[Any]]:
+        entities: list[Entity] = []
+        for cell in self._cells_between(low, high):
+            members = self.cells.get(cell)
+            if members:
+                entities.extend(members)
+
+        positions = np.array([self._positions[e] for e in entities])
+        return entities, positions
+
+    def _coordinates(self, column: Any) -> npt.NDArray[np.float64]:
+        if isinstance(column, np.ndarray):
+            names = list(field_dtypes(self.component_type))
+            indices = [names.index(name) for name in self.fields]
+            return column[:, indices].astype(np.float64, copy=False)
+
+        getter = attrgetter(*self.fields)
+        rows = list(map(getter, column))
+        if len(self.fields) == 1:
+            return np.array(rows, dtype=np.float64).reshape(-1, 1)
+        return np.array(rows, dtype=np.float64).reshape(-1, len(self.fields))
+
+    def _update(
+        self, entities: Sequence[Entity], positions: npt.NDArray[np.float64]
+    ) -> None:
+        cells = np.floor(positions / self.cell_size).astype(np.int64).tolist()
+        entity_cells = self._entity_cells
+        for entity, cell_list, position in zip(
+            entities, cells, positions.tolist()
+        ):
+            cell = tuple(cell_list)
+            old = entity_cells.get(entity)
+            if old != cell:
+                if old is not None:
+                    members = self.cells[old]
+                    members.discard(entity)
+                    if not members:
+                        del self.cells[old]
+                self.cells.setdefault(cell, set()).add(entity)
+                entity_cells[entity] = cell
+            self._positions[entity] = tuple(position)
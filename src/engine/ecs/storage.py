@@ -0,0 +1,593 @@
+"""Column storage backends for archetype tables.
+
+By default every component lives in a plain `list` per archetype. Components
+that opt into columnar storage (see
+:py:data:`src.engine.constants.COMPONENT_STORAGE_COLUMNAR`) are instead packed
+into a growable two dimensional NumPy array, one row per entity and one column
+per dataclass field, so systems can update them with vectorized expressions.
+Their fields must therefore all be `bool`, all `int` or all `float`.
+
+Sparse components (:py:data:`src.engine.constants.COMPONENT_STORAGE_SPARSE`)
+skip the archetype tables entirely and live in one :py:class:`SparseSet` per
+component type.
+
+An ECS created with `shared_columns=True` puts its columnar arrays into
+:py:mod:`multiprocessing.shared_memory` as :py:class:`SharedArrayColumn`, so
+worker processes can map them, see :py:mod:`src.engine.ecs.processes`.
+"""
+
+from array import array
+from collections.abc import Buffer, Sequence
+from contextlib import suppress
+from dataclasses import dataclass, fields
+from multiprocessing.shared_memory import SharedMemory
+from sys import getsizeof
+from typing import Any, get_type_hints
+from weakref import finalize
+
+import numpy as np
+import numpy.typing as npt
+
+from src.engine.default_config import (
+    ECS_COLUMN_CAPACITY as DEFAULT_COLUMN_CAPACITY,
+)
+from src.engine.types import Component, Entity
+
+from .entities import INDEX_MASK
+
+EMPTY_LIST_SIZE: int = getsizeof([])
+EMPTY_TICKS_SIZE: int = getsizeof(array("q"))
+POINTER_SIZE: int = np.dtype(np.intp).itemsize
+
+NUMERIC_DTYPES: dict[type, np.dtype[Any]] = {
+    bool: np.dtype(np.bool_),
+    int: np.dtype(np.int64),
+    float: np.dtype(np.float64),
+}
+
+
+def field_dtypes(component_type: type[Component]) -> dict[str, np.dtype[Any]]:
+    """Resolve the dtype of every field of a plain-numeric component.
+
+    Returns:
+        The dtype per field name, in dataclass field order. Empty for tags.
+
+    Raises:
+        TypeError: if a field isn't annotated as `bool`, `int` or `float`.
+    """
+
+    hints = get_type_hints(component_type)
+    dtypes: dict[str, np.dtype[Any]] = {}
+    for field in fields(component_type):
+        hint = hints.get(field.name)
+        if hint not in NUMERIC_DTYPES:
+            raise TypeError(
+                f"Component {component_type.__name__} has a"
+                + f" non-numeric field '{field.name}: {hint}'"
+            )
+        dtypes[field.name] = NUMERIC_DTYPES[hint]
+
+    return dtypes
+
+
+def column_dtype(component_type: type[Component]) -> np.dtype[Any]:
+    """Resolve the array dtype for a plain-numeric component dataclass.
+
+    Every field shares the one array, so they must all have the same type.
+    Mixing them would round large ints and turn bools into floats.
+
+    Raises:
+        TypeError: if the component has no fields, a field which isn't
+            annotated as one of `bool`, `int` or `float`, or fields of
+            different types.
+    """
+
+    dtypes = field_dtypes(component_type)
+    if not dtypes:
+        raise TypeError(
+            f"Columnar component {component_type.__name__} has no fields"
+        )
+
+    dtype, *others = set(dtypes.values())
+    if others:
+        raise TypeError(
+            f"Columnar component {component_type.__name__} mixes field"
+            + f" types: {', '.join(f'{n}: {d}' for n, d in dtypes.items())}"
+        )
+    return dtype
+
+
+class ArrayColumn[C: Component]:
+    """A list-like column of components backed by a NumPy array.
+
+    Row `i` of :py:attr:`data` holds the fields of the `i`-th component, in
+    dataclass field order. The array grows geometrically, so appends are
+    amortized O(1). Indexing materializes a fresh component instance, so
+    mutating that instance does not write back; use :py:meth:`view` for that.
+
+    Attributes:
+        component_type: The component dataclass stored in this column.
+        fields: Field names, in the same order as the array columns.
+        data: The backing array. Only the first `len(column)` rows are live.
+    """
+
+    component_type: type[C]
+    fields: tuple[str, ...]
+    data: npt.NDArray[Any]
+    _length: int
+
+    def __init__(
+        self,
+        component_type: type[C],
+        capacity: int = DEFAULT_COLUMN_CAPACITY,
+    ) -> None:
+        self.component_type = component_type
+        self.fields = tuple(field.name for field in fields(component_type))
+        self.data = self._allocate(
+            max(capacity, 1), column_dtype(component_type)
+        )
+        self._length = 0
+
+    @classmethod
+    def from_array(
+        cls, component_type: type[C], data: npt.NDArray[Any]
+    ) -> "ArrayColumn[C]":
+        """Wrap an `(n, fields)` array as a full column, without copying.
+
+        The array becomes the column's storage until it has to grow, so it
+        may be a memory map.
+
+        Raises:
+            ValueError: if the array's shape or dtype doesn't fit the type.
+        """
+
+        column = cls(component_type, capacity=1)
+        if data.ndim != 2 or data.shape[1] != len(column.fields):
+            raise ValueError(
+                f"Expected an (n, {len(column.fields)}) array for"
+                + f" {component_type.__name__}, got {data.shape}"
+            )
+        if data.dtype != column.data.dtype:
+            raise ValueError(
+                f"Expected {column.data.dtype} data for"
+                + f" {component_type.__name__}, got {data.dtype}"
+            )
+
+        if len(data):
+            column.data = data
+            column._length = len(data)
+        return column
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, row: int) -> C:
+        if not -self._length <= row < self._length:
+            raise IndexError("column index out of range")
+        return self.component_type(*self.data[row % self._length].tolist())
+
+    def __setitem__(self, row: int, component: C) -> None:
+        if not -self._length <= row < self._length:
+            raise IndexError("column assignment index out of range")
+        self.data[row % self._length] = self._row(component)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.data)
+
+    def view(self) -> npt.NDArray[Any]:
+        """Return a writable view over the live rows.
+
+        The view is invalidated (it stops writing back) once the column grows
+        past its capacity and reallocates.
+        """
+
+        return self.data[: self._length]
+
+    def field(self, name: str) -> npt.NDArray[Any]:
+        """Return a writable view over a single field of the live rows."""
+
+        return self.data[: self._length, self.fields.index(name)]
+
+    def append(self, component: C) -> None:
+        if self._length == len(self.data):
+            self._grow(self._length + 1)
+        self.data[self._length] = self._row(component)
+        self._length += 1
+
+    def extend(self, components: Sequence[C] | npt.NDArray[Any]) -> None:
+        """Append many components at once.
+
+        Args:
+            components: Either component instances, or an array with one row
+                per component and one column per field.
+        """
+
+        rows = self.to_rows(components)
+        if not len(rows):
+            return
+
+        end = self._length + len(rows)
+        if end > len(self.data):
+            self._grow(end)
+        self.data[self._length : end] = rows
+        self._length = end
+
+    def reserve(self, capacity: int) -> None:
+        """Make room for at least `capacity` rows in one allocation."""
+
+        if capacity > len(self.data):
+            self._resize(capacity)
+
+    def shrink_to_fit(self) -> bool:
+        """Reallocate the array to the live rows, if it has spare ones.
+
+        Returns:
+            Whether the array was reallocated, invalidating views.
+        """
+
+        capacity = max(self._length, 1)
+        if len(self.data) == capacity:
+            return False
+        self._resize(capacity)
+        return True
+
+    def slack_bytes(self) -> int:
+        """The size of the allocated but unused rows."""
+
+        row_size = self.data.itemsize * len(self.fields)
+        return (len(self.data) - self._length) * row_size
+
+    def pop(self) -> C:
+        if not self._length:
+            raise IndexError("pop from empty column")
+        component = self[self._length - 1]
+        self._length -= 1
+        return component
+
+    def swap_remove(self, row: int) -> None:
+        """Remove a row by moving the last row into its place."""
+
+        last = self._length - 1
+        if row != last:
+            self.data[row] = self.data[last]
+        self._length = last
+
+    def to_rows(
+        self, components: Sequence[C] | npt.NDArray[Any]
+    ) -> npt.NDArray[Any]:
+        """Pack components into field rows, passing arrays through."""
+
+        if isinstance(components, np.ndarray):
+            return components
+        return np.array(
+            [self._row(component) for component in components],
+            dtype=self.data.dtype,
+        ).reshape(len(components), len(self.fields))
+
+    def _row(self, component: C) -> tuple[Any, ...]:
+        return tuple(getattr(component, name) for name in self.fields)
+
+    def _grow(self, min_capacity: int) -> None:
+        capacity = len(self.data)
+        while capacity < min_capacity:
+            capacity *= 2
+        self._resize(capacity)
+
+    def _resize(self, capacity: int) -> None:
+        data = self._allocate(capacity, self.data.dtype)
+        data[: self._length] = self.data[: self._length]
+        self.data = data
+
+    def _allocate(
+        self, capacity: int, dtype: np.dtype[Any]
+    ) -> npt.NDArray[Any]:
+        """Create a zeroed backing array. Subclasses may place it elsewhere."""
+
+        return np.zeros((capacity, len(self.fields)), dtype=dtype)
+
+
+@dataclass(frozen=True)
+class SharedColumnHandle:
+    """Everything a worker needs to map a shared column.
+
+    Attributes:
+        name: The shared memory block's name.
+        shape: The shape of the whole backing array, live rows or not.
+        dtype: The array's dtype, as a string.
+    """
+
+    name: str
+    shape: tuple[int, int]
+    dtype: str
+
+
+class SharedArrayColumn[C: Component](ArrayColumn[C]):
+    """An :py:class:`ArrayColumn` whose array lives in shared memory.
+
+    Growing allocates a new block and unlinks the old one, so handles must be
+    taken again after structural changes. Blocks are released once the
+    column is garbage collected, or by :py:meth:`release`.
+    """
+
+    _block: SharedMemory
+    _blocks: list[SharedMemory]
+    _finalizer: finalize
+
+    def __init__(
+        self,
+        component_type: type[C],
+        capacity: int = DEFAULT_COLUMN_CAPACITY,
+    ) -> None:
+        self._blocks = []
+        self._finalizer = finalize(self, _release_blocks, self._blocks)
+        super().__init__(component_type, capacity)
+
+    def handle(self) -> SharedColumnHandle:
+        rows, fields = self.data.shape
+        return SharedColumnHandle(
+            name=self._block.name,
+            shape=(rows, fields),
+            dtype=self.data.dtype.str,
+        )
+
+    def release(self) -> None:
+        """Unlink every block now. The column must not be used afterwards."""
+
+        self._finalizer()
+
+    def _allocate(
+        self, capacity: int, dtype: np.dtype[Any]
+    ) -> npt.NDArray[Any]:
+        shape = (capacity, len(self.fields))
+        size = max(capacity * len(self.fields) * dtype.itemsize, 1)
+        block = SharedMemory(create=True, size=size)
+
+        # the previous block stays mapped for views still pointing into it,
+        # but workers can't attach to it anymore.
+        if self._blocks:
+            with suppress(FileNotFoundError):
+                self._block.unlink()
+        self._blocks.append(block)
+        self._block = block
+
+        data: npt.NDArray[Any] = np.ndarray(
+            shape, dtype=dtype, buffer=block.buf
+        )
+        data.fill(0)
+        return data
+
+
+def _release_blocks(blocks: list[SharedMemory]) -> None:
+    for block in blocks:
+        with suppress(FileNotFoundError):
+            block.unlink()
+        # views of the array may outlive the column.
+        with suppress(BufferError):
+            block.close()
+    blocks.clear()
+
+
+class ComponentTicks:
+    """Per-row change ticks of one column.
+
+    Kept in parallel with the column: row `i` holds the tick at which the
+    `i`-th component was added, and the tick at which it was last changed.
+
+    Attributes:
+        added: Tick at which each row's component was inserted.
+        changed: Tick at which each row's component was last written.
+    """
+
+    added: array[int]
+    changed: array[int]
+
+    def __init__(self) -> None:
+        self.added = array("q")
+        self.changed = array("q")
+
+    @classmethod
+    def from_buffers(cls, added: Buffer, changed: Buffer) -> "ComponentTicks":
+        """Restore ticks from raw int64 buffers, as saved by snapshots."""
+
+        ticks = cls()
+        ticks.added.frombytes(added)
+        ticks.changed.frombytes(changed)
+        return ticks
+
+    def __len__(self) -> int:
+        return len(self.added)
+
+    def push(self, added: int, changed: int) -> None:
+        self.added.append(added)
+        self.changed.append(changed)
+
+    def extend(self, tick: int, n: int) -> None:
+        block = array("q", [tick]) * n
+        self.added.extend(block)
+        self.changed.extend(block)
+
+    def shrink_to_fit(self) -> bool:
+        """Copy the tick arrays into exactly sized ones, if they have slack.
+
+        `array.pop` never gives memory back, so they only ever grow.
+
+        Returns:
+            Whether the arrays were replaced.
+        """
+
+        if not self.slack_bytes():
+            return False
+        self.added = array("q", self.added)
+        self.changed = array("q", self.changed)
+        return True
+
+    def slack_bytes(self) -> int:
+        """The size of the allocated but unused ticks."""
+
+        return sum(
+            getsizeof(ticks) - EMPTY_TICKS_SIZE - ticks.itemsize * len(ticks)
+            for ticks in (self.added, self.changed)
+        )
+
+    def swap_remove(self, row: int) -> None:
+        last_added = self.added.pop()
+        last_changed = self.changed.pop()
+        if row < len(self.added):
+            self.added[row] = last_added
+            self.changed[row] = last_changed
+
+    def mark(self, tick: int, rows: npt.NDArray[np.intp] | None = None) -> None:
+        """Mark `rows` (or every row) as changed at `tick`."""
+
+        changed = np.frombuffer(self.changed, dtype=np.int64)
+        if rows is None:
+            changed[:] = tick
+        else:
+            changed[rows] = tick
+
+    def since(self, tick: int, added: bool = False) -> npt.NDArray[np.bool_]:
+        """Return which rows were changed (or added) after `tick`."""
+
+        ticks = np.frombuffer(self.added if added else self.changed, np.int64)
+        return ticks > tick
+
+
+class SparseSet[C: Component]:
+    """Components of one type, keyed by entity rather than archetype row.
+
+    A sparse array indexed by entity slot points into densely packed entity,
+    value and tick arrays. Insertion, lookup and removal are all O(1), and
+    removal swaps the last dense entry into the hole.
+
+    Attributes:
+        component_type: The component type stored.
+        entities: The entities which have the component, densely packed.
+        values: Their components, parallel to `entities`.
+        ticks: Their change ticks, parallel to `entities`.
+    """
+
+    component_type: type[C]
+    entities: list[Entity]
+    values: list[C]
+    ticks: ComponentTicks
+    _sparse: array[int]
+
+    def __init__(self, component_type: type[C]) -> None:
+        self.component_type = component_type
+        self.entities = []
+        self.values = []
+        self.ticks = ComponentTicks()
+        self._sparse = array("i")
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def __contains__(self, entity: Entity) -> bool:
+        return self.dense_index(entity) >= 0
+
+    def dense_index(self, entity: Entity) -> int:
+        """The entity's position in the dense arrays, or -1 if absent."""
+
+        slot = entity & INDEX_MASK
+        if slot >= len(self._sparse):
+            return -1
+        index = self._sparse[slot]
+        if index < 0 or self.entities[index] != entity:
+            return -1
+        return index
+
+    def get(self, entity: Entity) -> C:
+        """Return the entity's component.
+
+        Raises:
+            KeyError: if the entity doesn't have the component.
+        """
+
+        index = self.dense_index(entity)
+        if index < 0:
+            raise KeyError(entity)
+        return self.values[index]
+
+    def insert(self, entity: Entity, value: C, tick: int) -> None:
+        """Add or replace the entity's component, stamping it with `tick`."""
+
+        index = self.dense_index(entity)
+        if index >= 0:
+            self.values[index] = value
+            self.ticks.changed[index] = tick
+            return
+
+        slot = entity & INDEX_MASK
+        if slot >= len(self._sparse):
+            self._sparse.extend(
+                array("i", [-1]) * (slot + 1 - len(self._sparse))
+            )
+        self._sparse[slot] = len(self.entities)
+        self.entities.append(entity)
+        self.values.append(value)
+        self.ticks.push(tick, tick)
+
+    def discard(self, entity: Entity) -> bool:
+        """Remove the entity's component, if it has one.
+
+        Returns:
+            Whether there was a component to remove.
+        """
+
+        index = self.dense_index(entity)
+        if index < 0:
+            return False
+
+        self._sparse[entity & INDEX_MASK] = -1
+        last_entity = self.entities.pop()
+        last_value = self.values.pop()
+        self.ticks.swap_remove(index)
+        if index < len(self.entities):
+            self.entities[index] = last_entity
+            self.values[index] = last_value
+            self._sparse[last_entity & INDEX_MASK] = index
+        return True
+
+
+type Column = list[Component] | ArrayColumn[Component]
+"""Storage for one component type inside one archetype."""
+
+type ComponentBatch = Sequence[Component] | npt.NDArray[Any]
+"""Many components of one type, as instances or as an array of field rows."""
+
+
+def swap_remove(column: Column, row: int) -> None:
+    """Remove a row from any column in O(1), without keeping row order."""
+
+    if isinstance(column, ArrayColumn):
+        column.swap_remove(row)
+        return
+
+    last = column.pop()
+    if row < len(column):
+        column[row] = last
+
+
+def slack_bytes(column: Column) -> int:
+    """The size of a column's allocated but unused rows."""
+
+    if isinstance(column, ArrayColumn):
+        return column.slack_bytes()
+    # lists allocate one pointer per row.
+    return getsizeof(column) - EMPTY_LIST_SIZE - POINTER_SIZE * len(column)
+
+
+def shrink_to_fit(column: Column) -> Column | None:
+    """Give a column's unused rows back.
+
+    Returns:
+        The column to use from now on, or None if it was left untouched.
+        Lists are copied, array columns are reallocated in place.
+    """
+
+    if isinstance(column, ArrayColumn):
+        return column if column.shrink_to_fit() else None
+    if slack_bytes(column):
+        return list(column)
+    return None
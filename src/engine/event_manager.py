@@ -1,88 +1,378 @@
-import asyncio
-import os
+from copy import copy
 from dataclasses import dataclass
-from typing import Callable, TypeVar, cast
+from threading import Lock
+from time import perf_counter_ns
+from typing import Callable, NamedTuple, TypeVar, cast
+
+from src.engine.constants import EVENT_COALESCE_ALL, EVENT_QUEUE_BLOCK
+from src.engine.default_config import (
+    EVENT_DISPATCH_WORKERS as DEFAULT_WORKERS,
+)
+from src.engine.default_config import (
+    EVENT_LISTENER_BUDGET_MS as DEFAULT_BUDGET_MS,
+)
+from src.engine.default_config import EVENT_QUEUE_SIZE as DEFAULT_QUEUE_SIZE
+from src.engine.types import EventCoalescePolicy, EventQueuePolicy
+
+from .coalescing import CoalescingQueue
+from .dispatcher import Dispatcher, ListenerQueue
+from .event_stats import EventStats
 
 # TODO implement logging for this?
 
 
-@dataclass
+@dataclass(slots=True)
 class Event:
-    """Base event dataclass that stores nothing."""
+    """Base event dataclass that stores nothing.
+
+    Events in :py:mod:`src.engine.events` are slotted as well, so they're
+    small and quick to create. Subclasses don't have to be.
+    """
 
 
 E = TypeVar("E", bound=Event)
 
 
+class Listener(NamedTuple):
+    """A synchronous listener and its priority."""
+
+    callback: Callable[[Event], None]
+    priority: int
+
+
+class DispatchTable(NamedTuple):
+    """Everything listening to one concrete event type, in calling order.
+
+    Attributes:
+        queues: The queues of threadsafe listeners.
+        callbacks: The synchronous listeners.
+    """
+
+    queues: tuple[ListenerQueue, ...]
+    callbacks: tuple[Callable[[Event], None], ...]
+
+
 class EventManager:
-    """Centralized handler for `emitters` and `listeners`, pipes `Event`s."""
+    """Centralized handler for `emitters` and `listeners`, pipes `Event`s.
+
+    Regular listeners run synchronously inside :py:meth:`emit`, on the
+    emitting thread. Threadsafe listeners are handed to a persistent pool of
+    worker threads instead, through one bounded queue per listener, see
+    :py:mod:`src.engine.dispatcher`. Emitting never needs a running asyncio
+    loop, so any thread (like GLFW callbacks) may emit.
+
+    Listening to a class also receives its subclasses, so a listener of
+    `Event` sees every event. Rather than walking the class hierarchy on
+    every emit, the listeners of each concrete event type are flattened
+    into a :py:class:`DispatchTable` the first time it's emitted, and the
+    tables are thrown away whenever a listener is added.
+
+    High-rate event types can be queued with :py:meth:`queue`, to be merged
+    and dispatched once per frame, see :py:mod:`src.engine.coalescing`.
+
+    Events emitted every frame can be created once and updated in place,
+    see :py:meth:`reuse`.
 
-    listeners: dict[type[Event], list[Callable[[Event], None]]]
-    threadsafe_listeners: dict[type[Event], list[Callable[[Event], None]]]
-    _semaphore: asyncio.Semaphore
+    Event rates and listener latencies can be recorded with
+    :py:meth:`enable_stats`, see :py:mod:`src.engine.event_stats`.
 
-    def __init__(self) -> None:
+    Attributes:
+        listeners: Synchronous listeners per listened event type.
+        threadsafe_listeners: The queues of threadsafe listeners per
+            listened event type.
+        dispatcher: The worker pool running threadsafe listeners.
+        queued: The coalescing queue of each queued event type.
+        drains: The coalescing queues each frame event type dispatches.
+        stats: The recorded instrumentation, None while disabled.
+    """
+
+    listeners: dict[type[Event], list[Listener]]
+    threadsafe_listeners: dict[type[Event], list[ListenerQueue]]
+    dispatcher: Dispatcher
+    queued: dict[type[Event], CoalescingQueue]
+    drains: dict[type[Event], list[CoalescingQueue]]
+    stats: EventStats | None
+
+    _tables: dict[type[Event], DispatchTable]
+    _lock: Lock
+    _reused: dict[int, Event]
+
+    def __init__(self, workers: int = DEFAULT_WORKERS) -> None:
         self.listeners = {}
         self.threadsafe_listeners = {}
-        self._semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+        self.dispatcher = Dispatcher(workers)
+        self.queued = {}
+        self.drains = {}
+        self.stats = None
+        self._tables = {}
+        self._lock = Lock()
+        self._reused = {}
 
     def listen(
         self,
         event_type: type[E],
         callback: Callable[[E], None],
         threadsafe: bool = False,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        policy: EventQueuePolicy = EVENT_QUEUE_BLOCK,
+        priority: int = 0,
     ) -> None:
+        """Register an event listener with a callback.
+
+        Listeners with a higher priority are called first. Among equal
+        priorities, listeners of more derived event types go first, then
+        they're called in the order they were registered.
+
+        Args:
+            event_type: The event type to listen to, including subclasses.
+            callback: Called with every emitted event of that type.
+            threadsafe: Run the callback on the dispatcher's workers instead
+                of the emitting thread.
+            queue_size: How many events a threadsafe listener may fall
+                behind by before `policy` applies.
+            policy: What to do with events once a threadsafe listener's
+                queue is full.
+            priority: The listener's priority.
+        """
+
         if not threadsafe:
-            self._listen(event_type, callback)
+            self._listen(event_type, callback, priority)
             return
-        self._listen_threadsafe(event_type, callback)
+        self._listen_threadsafe(
+            event_type, callback, queue_size, policy, priority
+        )
 
     def _listen(
-        self, event_type: type[E], callback: Callable[[E], None]
+        self, event_type: type[E], callback: Callable[[E], None], priority: int
     ) -> None:
         """Register an event listener with a callback"""
-        if event_type not in self.listeners:
-            self.listeners[event_type] = []
-        self.listeners[event_type].append(
-            cast(Callable[[Event], None], callback)
-        )
+        with self._lock:
+            if event_type not in self.listeners:
+                self.listeners[event_type] = []
+            self.listeners[event_type].append(
+                Listener(cast(Callable[[Event], None], callback), priority)
+            )
+            self._tables = {}
 
-    def _listen_threadsafe(  # TODO typehint with Coroutine instead of Callable
-        self, event_type: type[E], callback: Callable[[E], None]
+    def _listen_threadsafe(
+        self,
+        event_type: type[E],
+        callback: Callable[[E], None],
+        queue_size: int,
+        policy: EventQueuePolicy,
+        priority: int,
     ) -> None:
-        """Register an event listener with a callback"""
-        if event_type not in self.threadsafe_listeners:
-            self.threadsafe_listeners[event_type] = []
-        self.threadsafe_listeners[event_type].append(
-            cast(Callable[[Event], None], callback)
-        )
+        """Register a threadsafe event listener with its own queue"""
+        with self._lock:
+            if event_type not in self.threadsafe_listeners:
+                self.threadsafe_listeners[event_type] = []
+            self.threadsafe_listeners[event_type].append(
+                ListenerQueue(
+                    cast(Callable[[Event], None], callback),
+                    queue_size,
+                    policy,
+                    priority,
+                )
+            )
+            self._tables = {}
+
+    def dispatch_table(self, event_type: type[Event]) -> DispatchTable:
+        """The listeners an event of exactly `event_type` is dispatched to.
+
+        Builds and caches the table if it isn't yet.
+        """
+
+        table = self._tables.get(event_type)
+        if table is not None:
+            return table
+
+        with self._lock:
+            listeners: list[Listener] = []
+            queues: list[ListenerQueue] = []
+            for cls in event_type.__mro__:
+                listeners += self.listeners.get(cls, ())
+                queues += self.threadsafe_listeners.get(cls, ())
+
+            # sorting is stable, so ties keep the hierarchy and
+            # registration order.
+            listeners.sort(key=lambda listener: -listener.priority)
+            queues.sort(key=lambda queue: -queue.priority)
+            table = DispatchTable(
+                tuple(queues),
+                tuple(listener.callback for listener in listeners),
+            )
+            self._tables[event_type] = table
+        return table
+
+    def queue(
+        self,
+        event_type: type[Event],
+        drain_on: type[Event],
+        policy: EventCoalescePolicy = EVENT_COALESCE_ALL,
+    ) -> CoalescingQueue:
+        """Defer an event type's dispatch to a frame event.
+
+        Emitted events of `event_type` are merged according to `policy`, and
+        dispatched to their listeners right before the next `drain_on`
+        event, on the thread emitting it.
+
+        Args:
+            event_type: The event type to queue.
+            drain_on: The frame event type, like `DrawCall` or `UpdateTick`.
+            policy: How queued events are merged.
+
+        Raises:
+            ValueError: if `event_type` is already queued, or is `drain_on`.
+        """
+
+        if event_type in self.queued:
+            raise ValueError(f"{event_type.__name__} is already queued")
+        if event_type is drain_on:
+            raise ValueError(f"{event_type.__name__} can't drain itself")
+
+        queue = CoalescingQueue(event_type, policy, drain_on)
+        self.queued[event_type] = queue
+        self.drains.setdefault(drain_on, []).append(queue)
+        return queue
+
+    def flush(self) -> int:
+        """Dispatch every queued event now, regardless of frame events.
+
+        Returns:
+            The number of dispatched events.
+        """
+
+        dispatched = 0
+        for queue in list(self.queued.values()):
+            dispatched += self._drain(queue)
+        return dispatched
+
+    def reuse(self, event: E) -> E:
+        """Mark an event as updated in place and emitted over and over.
+
+        Per-frame events like `DrawCall` can then be emitted without
+        allocating a new one each time::
+
+            draw_call = event_manager.reuse(DrawCall(dt=0.0))
+            while running:
+                draw_call.dt = dt
+                event_manager.emit(draw_call)
+
+        Synchronous listeners get the instance itself, so they must not keep
+        it past their call. Threadsafe listeners and coalescing queues, which
+        hold on to events, get a copy instead.
+
+        The event is kept alive until it's passed to :py:meth:`release`.
+
+        Returns:
+            `event`, for chaining.
+        """
+
+        self._reused[id(event)] = event
+        return event
+
+    def release(self, event: Event) -> None:
+        """Stop treating an event as reused, once it won't be emitted again.
+
+        Releasing an event which isn't reused does nothing.
+        """
+
+        _ = self._reused.pop(id(event), None)
+
+    def enable_stats(self, budget_ms: float = DEFAULT_BUDGET_MS) -> EventStats:
+        """Start recording event rates and listener latencies.
+
+        Args:
+            budget_ms: Listener calls slower than this are flagged.
+
+        Returns:
+            The stats, which are recorded into from then on.
+        """
+
+        stats = EventStats(budget_ms)
+        self.stats = stats
+        self.dispatcher.stats = stats
+        return stats
+
+    def disable_stats(self) -> None:
+        """Stop recording, leaving emitting with a single `None` check."""
+
+        self.stats = None
+        self.dispatcher.stats = None
 
     # TODO error handling
 
-    def _emit(self, event: Event) -> None:
-        event_type: type[Event] = type(event)
-        if event_type not in self.listeners:
-            return
-        callbacks = self.listeners[event_type]
+    @staticmethod
+    def _call_timed(
+        stats: EventStats,
+        callbacks: tuple[Callable[[Event], None], ...],
+        event: Event,
+    ) -> None:
         for callback in callbacks:
+            t0 = perf_counter_ns()
+            try:
+                callback(event)
+            finally:
+                stats.record_call(callback, perf_counter_ns() - t0)
+
+    def _dispatch(self, event: Event) -> None:
+        table = self._tables.get(type(event))
+        if table is None:
+            table = self.dispatch_table(type(event))
+
+        # threadsafe listeners first, so they can start while the
+        # synchronous ones run.
+        if table.queues:
+            queued = self._detached(event)
+            for queue in table.queues:
+                _ = self.dispatcher.submit(queue, queued)
+        if self.stats is not None:
+            self._call_timed(self.stats, table.callbacks, event)
+            return
+        for callback in table.callbacks:
             callback(event)
 
-    async def _emit_parallel(self, event: Event) -> None:
-        event_type: type[Event] = type(event)
+    def _detached(self, event: Event) -> Event:
+        """`event`, or a copy of it if it's going to be updated in place."""
+        if id(event) in self._reused:
+            return copy(event)
+        return event
+
+    def _drain(self, queue: CoalescingQueue) -> int:
+        events = queue.drain()
+        for event in events:
+            self._dispatch(event)
+        return len(events)
+
+    def emit(self, event: Event) -> None:
+        """Emit an event to its listeners.
+
+        Events of a queued type are only merged into their queue, and queues
+        draining on this event's type are dispatched before it.
+        """
 
-        if event_type not in self.threadsafe_listeners:
+        event_type = type(event)
+        if self.stats is not None:
+            self.stats.record_event(event_type)
+        queue = self.queued.get(event_type)
+        if queue is not None:
+            queue.push(self._detached(event))
             return
 
-        callbacks = self.listeners[event_type]
+        for queue in self.drains.get(event_type, ()):
+            _ = self._drain(queue)
+        self._dispatch(event)
 
-        async def run_callback(callback: Callable[[Event], None]) -> None:
-            async with self._semaphore:
-                await asyncio.to_thread(callback, event)
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until threadsafe listeners have handled every event.
 
-        tasks = [run_callback(callback) for callback in callbacks]
+        Returns:
+            False if `timeout` ran out first.
+        """
 
-        _ = await asyncio.gather(*tasks)
+        return self.dispatcher.join(timeout)
 
-    def emit(self, event: Event) -> None:
-        _ = asyncio.create_task(self._emit_parallel(event))
-        self._emit(event)
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the dispatcher's workers, once the queued events are handled."""
+
+        self.dispatcher.shutdown(wait)
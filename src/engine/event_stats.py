@@ -0,0 +1,219 @@
+"""Optional EventManager instrumentation: event rates and listener latency.
+
+Enabled with :py:meth:`src.engine.event_manager.EventManager.enable_stats`.
+While disabled, emitting costs a single `None` check.
+
+Listener latencies go into log2 buckets, so recording one is an integer
+`bit_length` and an increment, and percentiles are accurate to within a
+factor of two, which is plenty to spot the listener eating the frame.
+"""
+
+from collections.abc import Callable
+from logging import Logger, getLogger
+from threading import Lock
+from time import perf_counter_ns
+from typing import TYPE_CHECKING
+
+from src.engine.default_config import (
+    EVENT_LISTENER_BUDGET_MS as DEFAULT_BUDGET_MS,
+)
+
+if TYPE_CHECKING:
+    from .event_manager import Event
+
+# bucket 0 holds everything below 2**LATENCY_MIN_BITS ns (~1 us), the last
+# one everything from 2**(LATENCY_MIN_BITS + LATENCY_BUCKETS - 2) ns (~1 s).
+LATENCY_MIN_BITS = 10
+LATENCY_BUCKETS = 22
+RATE_WINDOW_NS = 1_000_000_000
+
+
+class LatencyHistogram:
+    """Log2-bucketed latencies of one listener, in nanoseconds.
+
+    Attributes:
+        buckets: How many calls fell in each bucket, see :py:meth:`bound`.
+        count: The number of recorded calls.
+        total_ns: Their summed latency.
+        max_ns: The slowest call.
+    """
+
+    buckets: list[int]
+    count: int
+    total_ns: int
+    max_ns: int
+
+    def __init__(self) -> None:
+        self.buckets = [0] * LATENCY_BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    @staticmethod
+    def bound(bucket: int) -> int:
+        """The exclusive upper bound of a bucket, in nanoseconds."""
+
+        return 1 << (LATENCY_MIN_BITS + bucket)
+
+    def record(self, ns: int) -> None:
+        bucket = ns.bit_length() - LATENCY_MIN_BITS
+        self.buckets[min(max(bucket, 0), LATENCY_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total_ns += ns
+        self.max_ns = max(self.max_ns, ns)
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> int:
+        """The upper bound of the bucket holding the `q`th percentile.
+
+        Args:
+            q: The percentile, between 0 and 100.
+        """
+
+        if not self.count:
+            return 0
+        target = self.count * q / 100
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target and count:
+                return min(self.bound(bucket), self.max_ns)
+        return self.max_ns
+
+
+class ListenerStats:
+    """The recorded calls of one listener.
+
+    Attributes:
+        name: The listener's qualified name.
+        histogram: Its latencies.
+        last_ns: The latency of its most recent call.
+        over_budget: How many calls took longer than the budget.
+    """
+
+    name: str
+    histogram: LatencyHistogram
+    last_ns: int
+    over_budget: int
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.histogram = LatencyHistogram()
+        self.last_ns = 0
+        self.over_budget = 0
+
+
+class EventStats:
+    """Event rates and listener latencies of an EventManager.
+
+    Safe to record into from the dispatcher's workers and the emitting
+    threads at the same time.
+
+    Attributes:
+        budget_ns: Calls slower than this are counted as over budget, and
+            the first one of every listener is logged.
+        counts: How many events of each type were emitted.
+        listeners: The stats of every called listener.
+        logger: Where listeners going over budget are reported.
+    """
+
+    budget_ns: int
+    counts: dict[type["Event"], int]
+    listeners: dict[Callable[["Event"], None], ListenerStats]
+    logger: Logger
+
+    _lock: Lock
+    _rates: dict[type["Event"], float]
+    _window_counts: dict[type["Event"], int]
+    _window_start: int
+
+    def __init__(self, budget_ms: float = DEFAULT_BUDGET_MS) -> None:
+        self.budget_ns = int(budget_ms * 1e6)
+        self.counts = {}
+        self.listeners = {}
+        self.logger = getLogger("EventStats")
+        self._lock = Lock()
+        self._rates = {}
+        self._window_counts = {}
+        self._window_start = perf_counter_ns()
+
+    def record_event(self, event_type: type["Event"]) -> None:
+        with self._lock:
+            self.counts[event_type] = self.counts.get(event_type, 0) + 1
+            self._roll_window(perf_counter_ns())
+
+    def record_call(self, callback: Callable[["Event"], None], ns: int) -> None:
+        with self._lock:
+            stats = self.listeners.get(callback)
+            if stats is None:
+                stats = ListenerStats(listener_name(callback))
+                self.listeners[callback] = stats
+
+            stats.histogram.record(ns)
+            stats.last_ns = ns
+            if ns <= self.budget_ns:
+                return
+            stats.over_budget += 1
+            if stats.over_budget == 1:
+                self.logger.warning(
+                    f"Listener {stats.name} took {ns / 1e6:.2f} ms,"
+                    + f" over the {self.budget_ns / 1e6:.2f} ms budget"
+                )
+
+    def rates(self) -> dict[type["Event"], float]:
+        """Events per second of each type, over the last full second."""
+
+        with self._lock:
+            self._roll_window(perf_counter_ns())
+            return dict(self._rates)
+
+    def slowest(self, n: int | None = None) -> list[ListenerStats]:
+        """Listeners by descending mean latency."""
+
+        with self._lock:
+            listeners = sorted(
+                self.listeners.values(),
+                key=lambda stats: stats.histogram.mean_ns,
+                reverse=True,
+            )
+        return listeners[:n]
+
+    def over_budget(self) -> list[ListenerStats]:
+        """Listeners which went over the budget at least once."""
+
+        with self._lock:
+            return [
+                stats for stats in self.listeners.values() if stats.over_budget
+            ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts.clear()
+            self.listeners.clear()
+            self._rates.clear()
+            self._window_counts.clear()
+            self._window_start = perf_counter_ns()
+
+    def _roll_window(self, now: int) -> None:
+        elapsed = now - self._window_start
+        if elapsed < RATE_WINDOW_NS:
+            return
+
+        seconds = elapsed / 1e9
+        self._rates = {
+            event_type: (count - self._window_counts.get(event_type, 0))
+            / seconds
+            for event_type, count in self.counts.items()
+        }
+        self._window_counts = dict(self.counts)
+        self._window_start = now
+
+
+def listener_name(callback: Callable[["Event"], None]) -> str:
+    """A readable name for a listener, looking through `functools.partial`."""
+
+    func = getattr(callback, "func", callback)
+    return getattr(func, "__qualname__", repr(callback))
@@ -5,38 +5,43 @@ from src.engine.types import KeyState
 
 
 # TODO group these into separate sections, separate files if it gets really big
-@dataclass
+@dataclass(slots=True)
 class DrawCall(Event):
     dt: float
 
 
-@dataclass
+@dataclass(slots=True)
 class DebugDrawCall(Event):
     dt: float
 
 
-@dataclass
+@dataclass(slots=True)
 class UpdateTick(Event):
     dt: float
 
 
-@dataclass
+@dataclass(slots=True)
 class QuadMeshCreated(Event):
     name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class QuadMeshUpdated(Event):
     name: str
 
 
-@dataclass
-class KeyEvent(Event):
+@dataclass(slots=True)
+class InputEvent(Event):
+    """Base of every user input event, to listen to all of them at once."""
+
+
+@dataclass(slots=True)
+class KeyEvent(InputEvent):
     key_name: str
     state: KeyState
 
 
-@dataclass
-class MouseMoveEvent(Event):
+@dataclass(slots=True)
+class MouseMoveEvent(InputEvent):
     x: int
     y: int
@@ -0,0 +1,213 @@
+"""Named, ordered stages for the listeners of a frame event.
+
+Plain `DrawCall` listeners run in registration order, so nothing guarantees
+that, say, the player moves the camera before the renderer reads it. A
+:py:class:`FrameSchedule` subscribes to the frame event once and runs its
+own listeners in stages instead, `pre_update`, `update`, `post_update` and
+`render` by default, so work lands in the frame it belongs to.
+
+Within a stage, listeners may also declare which listeners they run
+`after` or `before`, and each stage is split into batches along those
+constraints. A batch's threadsafe listeners may run on a worker pool, while
+the others stay on the emitting thread, which is what OpenGL and GLFW calls
+need, see :py:mod:`src.engine.stages`.
+"""
+
+from collections.abc import Callable, Collection
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import cast
+
+from src.engine.constants import (
+    FRAME_STAGE_POST_UPDATE,
+    FRAME_STAGE_PRE_UPDATE,
+    FRAME_STAGE_RENDER,
+    FRAME_STAGE_UPDATE,
+)
+from src.engine.default_config import (
+    FRAME_SCHEDULE_WORKERS as DEFAULT_WORKERS,
+)
+
+from .event_manager import E, Event, EventManager
+from .events import DrawCall
+from .stages import Stage, StagedRunner, Task
+
+type FrameCallback = Callable[[Event], None]
+
+DEFAULT_STAGES: tuple[str, ...] = (
+    FRAME_STAGE_PRE_UPDATE,
+    FRAME_STAGE_UPDATE,
+    FRAME_STAGE_POST_UPDATE,
+    FRAME_STAGE_RENDER,
+)
+
+
+@dataclass
+class FrameListener(Task):
+    """A listener registered into a stage, see
+    :py:class:`src.engine.stages.Task` for its name, stage and timings.
+
+    Attributes:
+        callback: Called with the frame event.
+        after: Names of listeners it runs after.
+        before: Names of listeners it runs before.
+    """
+
+    callback: FrameCallback
+    after: frozenset[str] = frozenset()
+    before: frozenset[str] = frozenset()
+
+
+class FrameSchedule(StagedRunner[FrameListener]):
+    """Runs frame listeners in ordered stages, in parallel where allowed.
+
+    Attributes:
+        event_manager: Where the frame event comes from, and where listener
+            latencies are recorded while its stats are enabled.
+    """
+
+    event_manager: EventManager
+
+    def __init__(
+        self,
+        event_manager: EventManager,
+        event_type: type[Event] = DrawCall,
+        stages: Collection[str] = DEFAULT_STAGES,
+        max_workers: int = DEFAULT_WORKERS,
+        executor: ThreadPoolExecutor | None = None,
+    ) -> None:
+        """Create the stages and subscribe to `event_type`.
+
+        Args:
+            event_manager: The event manager to subscribe to.
+            event_type: The frame event.
+            stages: The stage names, in execution order.
+            max_workers: The size of the worker pool.
+            executor: A worker pool to share instead of creating one.
+        """
+
+        super().__init__(stages, max_workers, "frame-listener", executor)
+        self.event_manager = event_manager
+
+        event_manager.listen(event_type, self.run)
+
+    def add(
+        self,
+        callback: Callable[[E], None],
+        stage: str = FRAME_STAGE_UPDATE,
+        name: str | None = None,
+        after: Collection[str] = (),
+        before: Collection[str] = (),
+        threadsafe: bool = False,
+    ) -> FrameListener:
+        """Register a listener into a stage.
+
+        Raises:
+            KeyError: if the stage doesn't exist.
+            ValueError: if a listener with the same name is already
+                registered.
+        """
+
+        return self._add(
+            FrameListener(
+                name=name or callback.__qualname__,
+                callback=cast(FrameCallback, callback),
+                stage=stage,
+                after=frozenset(after),
+                before=frozenset(before),
+                threadsafe=threadsafe,
+            )
+        )
+
+    def remove(self, name: str) -> None:
+        self._remove(name)
+
+    @property
+    def listeners(self) -> dict[str, FrameListener]:
+        return self.tasks
+
+    def run(self, event: Event) -> None:
+        """Run every stage once, in order.
+
+        Exceptions raised by listeners are re-raised once their batch is
+        done.
+
+        Raises:
+            ValueError: if the ordering constraints can't be satisfied.
+        """
+
+        self._run_stages(lambda listener: listener.callback(event))
+
+    def _record(self, task: FrameListener, elapsed_ns: int) -> None:
+        stats = self.event_manager.stats
+        if stats is not None:
+            stats.record_call(task.callback, elapsed_ns)
+
+    def _pack(self, stage: Stage[FrameListener]) -> list[list[FrameListener]]:
+        """Split the stage into batches along its ordering constraints.
+
+        A listener goes into the batch right after the last one holding a
+        listener it must run after, so unconstrained listeners share the
+        first batch. Constraints naming listeners of other stages are
+        checked against the stage order, unknown names are errors.
+        """
+
+        listeners = self.listeners
+        order = {name: index for index, name in enumerate(self.stages)}
+        names = {listener.name for listener in stage.tasks}
+        predecessors: dict[str, set[str]] = {name: set() for name in names}
+        for listener in stage.tasks:
+            for other, runs_first in [
+                *((name, True) for name in listener.after),
+                *((name, False) for name in listener.before),
+            ]:
+                if other not in listeners:
+                    raise ValueError(
+                        f"'{listener.name}' is ordered against unknown"
+                        + f" frame listener '{other}'"
+                    )
+                if other in names:
+                    if runs_first:
+                        predecessors[listener.name].add(other)
+                    else:
+                        predecessors[other].add(listener.name)
+                    continue
+
+                # the stage order already decides, it just has to agree.
+                other_first = order[listeners[other].stage] < order[stage.name]
+                if other_first != runs_first:
+                    raise ValueError(
+                        f"'{listener.name}' can't run"
+                        + f" {'after' if runs_first else 'before'}"
+                        + f" '{other}' of stage '{listeners[other].stage}'"
+                    )
+
+        batches: list[list[FrameListener]] = []
+        levels: dict[str, int] = {}
+        remaining = list(stage.tasks)
+        while remaining:
+            ready = [
+                listener
+                for listener in remaining
+                if predecessors[listener.name].issubset(levels)
+            ]
+            if not ready:
+                raise ValueError(
+                    f"Frame listeners of stage '{stage.name}' have cyclic"
+                    + f" ordering: {[listener.name for listener in remaining]}"
+                )
+            for listener in ready:
+                level = 1 + max(
+                    (levels[name] for name in predecessors[listener.name]),
+                    default=-1,
+                )
+                levels[listener.name] = level
+                if level == len(batches):
+                    batches.append([])
+                batches[level].append(listener)
+            remaining = [
+                listener
+                for listener in remaining
+                if listener.name not in levels
+            ]
+        return batches
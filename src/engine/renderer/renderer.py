@@ -2,7 +2,7 @@ from logging import Logger, getLogger
 from typing import TypedDict
 
 from src.engine import Core
-from src.engine.constants import RENDER_BACKEND_NONE
+from src.engine.constants import FRAME_STAGE_RENDER, RENDER_BACKEND_NONE
 from src.engine.events import DrawCall
 from src.engine.scene import SceneGraph
 from src.engine.types import RenderBackend as RenderBackedType
@@ -61,7 +61,7 @@ class Renderer:
             )
 
         # register listeners
-        self.core.event_manager().listen(DrawCall, self.render)
+        _ = self.core.frame_schedule().add(self.render, FRAME_STAGE_RENDER)
 
     def render(self, event: DrawCall) -> None:
         """Does nothing."""
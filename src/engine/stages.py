@@ -0,0 +1,190 @@
+"""Named stages of tasks, run batch by batch on a shared worker pool.
+
+The common ground of :py:class:`src.engine.ecs.scheduler.Scheduler` and
+:py:class:`src.engine.frame_schedule.FrameSchedule`. Both register named
+tasks into stages which run in order, and split every stage into batches
+their own way. A batch's threadsafe tasks run concurrently on the worker
+pool while the others run on the calling thread, and every batch waits for
+the previous one to finish.
+"""
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Collection
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from logging import Logger, getLogger
+from time import perf_counter_ns
+
+
+@dataclass(kw_only=True)
+class Task:
+    """A registered task and its timings.
+
+    Attributes:
+        name: Unique name, used for ordering, timings and error messages.
+        stage: The stage the task runs in.
+        threadsafe: Whether it may run on the worker pool, concurrently with
+            the rest of its batch.
+        last_time: Wall time of the most recent run, in seconds.
+        total_time: Accumulated wall time of every run, in seconds.
+        runs: How many times the task has run.
+    """
+
+    name: str
+    stage: str
+    threadsafe: bool
+    last_time: float = 0.0
+    total_time: float = 0.0
+    runs: int = 0
+
+
+@dataclass
+class Stage[T: Task]:
+    """A named group of tasks, split into ordered batches."""
+
+    name: str
+    tasks: list[T] = field(default_factory=list)
+    batches: list[list[T]] = field(default_factory=list)
+
+
+class StagedRunner[T: Task](ABC):
+    """Base for schedulers running tasks in stages.
+
+    Subclasses decide how a stage is split into batches, see
+    :py:meth:`_pack`, and how a task is called.
+
+    Attributes:
+        stages: The stages, in execution order.
+        executor: The worker pool. Pass it to another scheduler to share
+            its workers.
+    """
+
+    stages: dict[str, Stage[T]]
+    executor: ThreadPoolExecutor
+    logger: Logger
+    _owns_executor: bool
+    _dirty: bool
+
+    def __init__(
+        self,
+        stages: Collection[str],
+        max_workers: int,
+        thread_name_prefix: str,
+        executor: ThreadPoolExecutor | None = None,
+    ) -> None:
+        self.stages = {name: Stage(name) for name in stages}
+        self.logger = getLogger(type(self).__name__)
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=thread_name_prefix
+        )
+        self._dirty = False
+
+    @property
+    def tasks(self) -> dict[str, T]:
+        return {
+            task.name: task
+            for stage in self.stages.values()
+            for task in stage.tasks
+        }
+
+    def timings(self) -> dict[str, float]:
+        """The last run time of every task, in seconds."""
+
+        return {name: task.last_time for name, task in self.tasks.items()}
+
+    def shutdown(self) -> None:
+        """Stop the worker pool, unless it was passed in."""
+
+        if self._owns_executor:
+            self.executor.shutdown(wait=True)
+
+    def _add(self, task: T) -> T:
+        """Register a task into its stage.
+
+        Raises:
+            KeyError: if the stage doesn't exist.
+            ValueError: if a task with the same name is already registered.
+        """
+
+        if task.stage not in self.stages:
+            raise KeyError(f"Unknown stage '{task.stage}'")
+        if task.name in self.tasks:
+            raise ValueError(f"'{task.name}' is already registered")
+
+        self.stages[task.stage].tasks.append(task)
+        self._dirty = True
+        return task
+
+    def _remove(self, name: str) -> None:
+        task = self.tasks[name]
+        self.stages[task.stage].tasks.remove(task)
+        self._dirty = True
+
+    def _run_stages(
+        self,
+        call: Callable[[T], None],
+        after_stage: Callable[[], None] | None = None,
+    ) -> None:
+        """Run every stage once, in order, with `call` running each task.
+
+        Exceptions raised by tasks are re-raised once their batch is done.
+        """
+
+        if self._dirty:
+            self._build_batches()
+
+        for stage in self.stages.values():
+            for batch in stage.batches:
+                self._run_batch(batch, call)
+            if after_stage is not None:
+                after_stage()
+
+    def _run_batch(self, batch: list[T], call: Callable[[T], None]) -> None:
+        if len(batch) == 1:
+            self._run_task(batch[0], call)
+            return
+
+        futures: list[Future[None]] = [
+            self.executor.submit(self._run_task, task, call)
+            for task in batch
+            if task.threadsafe
+        ]
+        try:
+            for task in batch:
+                if not task.threadsafe:
+                    self._run_task(task, call)
+        finally:
+            _ = wait(futures)  # barrier
+        for future in futures:
+            future.result()
+
+    def _run_task(self, task: T, call: Callable[[T], None]) -> None:
+        t0 = perf_counter_ns()
+        try:
+            call(task)
+        finally:
+            elapsed = perf_counter_ns() - t0
+            task.last_time = elapsed / 1e9
+            task.total_time += task.last_time
+            task.runs += 1
+            self._record(task, elapsed)
+
+    def _record(self, task: T, elapsed_ns: int) -> None:
+        """Called after every run of a task with its wall time."""
+
+    @abstractmethod
+    def _pack(self, stage: Stage[T]) -> list[list[T]]:
+        """Split a stage's tasks into batches, to run in order."""
+
+    def _build_batches(self) -> None:
+        for stage in self.stages.values():
+            stage.batches = self._pack(stage)
+            self.logger.debug(
+                "Stage '%s': %d tasks in %d batches",
+                stage.name,
+                len(stage.tasks),
+                len(stage.batches),
+            )
+
+        self._dirty = False
@@ -2,7 +2,7 @@
 
 from dataclasses import dataclass
 from enum import Enum
-from typing import Literal
+from typing import ClassVar, Literal
 
 from wgpu.classes import GPUBuffer
 
@@ -65,11 +65,27 @@ class KeyState(Enum):
     REPEAT = 2
 
 
+type EventQueuePolicy = Literal["block", "drop_newest", "drop_oldest"]
+type EventCoalescePolicy = Literal["latest", "sum", "all"]
+
+
 # ecs
 type Entity = int
 type RowIndex = int
 type Archetype = int
+type ComponentStorage = Literal["table", "columnar", "sparse"]
 
 
 @dataclass
-class Component: ...
+class Component:
+    """Base component dataclass.
+
+    Attributes:
+        storage: How the ECS stores this component type. One of
+            {table, columnar, sparse}. Columnar components must only have
+            `bool`, `int` or `float` fields. Sparse components live outside
+            the archetype tables, so adding or removing them never moves
+            rows, which suits frequently toggled tags.
+    """
+
+    storage: ClassVar[ComponentStorage] = "table"
@@ -7,7 +7,7 @@ import imgui
 from imgui.integrations.glfw import GlfwRenderer
 
 from src.engine import Core
-from src.engine.constants import WINDOW_BACKEND_GLFW
+from src.engine.constants import EVENT_COALESCE_LATEST, WINDOW_BACKEND_GLFW
 from src.engine.default_config import (
     ENABLE_VSYNC as DEFAULT_ENABLE_VSYNC,
 )
@@ -114,6 +114,11 @@ class GlfwWindow(Window):
         )
 
         # Key state handlers
+        # cursor positions arrive once per OS sample, listeners only need
+        # the latest one per frame.
+        _ = self.core.event_manager().queue(
+            MouseMoveEvent, DrawCall, EVENT_COALESCE_LATEST
+        )
         glfw.set_key_callback(self.window, self.key_callback)
         glfw.set_cursor_pos_callback(self.window, self.cursor_pos_callback)
 
@@ -153,23 +158,31 @@ class GlfwWindow(Window):
         implemented yet.
         """
         dt = 1 / 60
+        event_manager = self.core.event_manager()
+        # updated in place, so frames don't allocate events.
+        draw_call = event_manager.reuse(DrawCall(dt=dt))
+        debug_draw_call = event_manager.reuse(DebugDrawCall(dt=dt))
 
         self.logger.info("Starting mainloop")
         while not glfw.window_should_close(self.window):
             t0 = perf_counter()
             glfw.poll_events()
 
-            self.core.event_manager().emit(DrawCall(dt=dt))
+            draw_call.dt = dt
+            event_manager.emit(draw_call)
 
             self.imgui_impl.process_inputs()
             imgui.new_frame()
-            self.core.event_manager().emit(DebugDrawCall(dt=dt))
+            debug_draw_call.dt = dt
+            event_manager.emit(debug_draw_call)
             imgui.render()
             self.imgui_impl.render(imgui.get_draw_data())
 
             glfw.swap_buffers(self.window)
             dt = perf_counter() - t0
 
+        event_manager.release(draw_call)
+        event_manager.release(debug_draw_call)
         glfw.terminate()
         self.logger.info("Window closed")
 
@@ -181,17 +194,22 @@ class GlfwWindow(Window):
         )
         glfw.make_context_current(shared_context)
         dt = 1 / 60
+        event_manager = self.core.event_manager()
+        update_tick = event_manager.reuse(UpdateTick(dt=dt))
 
         while not glfw.window_should_close(self.window):
             t0 = perf_counter()
             glfw.poll_events()
 
-            self.core.event_manager().emit(UpdateTick(dt=dt))
+            update_tick.dt = dt
+            event_manager.emit(update_tick)
 
             glfw.swap_buffers(shared_context)
             glfw.poll_events()
             dt = perf_counter() - t0
 
+        event_manager.release(update_tick)
+
     @override
     def request_mouse_lock(self, mode: bool) -> None:
         super().request_mouse_lock(mode)
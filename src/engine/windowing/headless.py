@@ -59,8 +59,13 @@ class Window:
 
     def mainloop(self) -> None:
         """A mainloop that does nothing. Forever. Until interrupted."""
-        while True:
-            self.core.event_manager().emit(DrawCall(dt=0.0))
+        event_manager = self.core.event_manager()
+        draw_call = event_manager.reuse(DrawCall(dt=0.0))
+        try:
+            while True:
+                event_manager.emit(draw_call)
+        finally:
+            event_manager.release(draw_call)
 
     def request_mouse_lock(self, mode: bool) -> None:
         """Request the window to lock the mouse pointer.
@@ -72,8 +77,13 @@ class Window:
         self.mouse_locked = mode
 
     def update_loop(self) -> None:
-        while True:
-            self.core.event_manager().emit(UpdateTick(dt=0.0))
+        event_manager = self.core.event_manager()
+        update_tick = event_manager.reuse(UpdateTick(dt=0.0))
+        try:
+            while True:
+                event_manager.emit(update_tick)
+        finally:
+            event_manager.release(update_tick)
 
     @property
     def size(self) -> tuple[int, int]:
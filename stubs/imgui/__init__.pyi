@@ -4,5 +4,9 @@ def render() -> None: ...
 def get_draw_data() -> int: ...  # TODO verify
 def begin(name: str) -> None: ...
 def text(text: str) -> None: ...
+def text_colored(
+    text: str, r: float, g: float, b: float, a: float = 1.0
+) -> None: ...
+def separator() -> None: ...
 def button(text: str) -> bool: ...
 def end() -> None: ...
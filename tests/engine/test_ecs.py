@@ -2,7 +2,21 @@ import unittest
 from dataclasses import dataclass
 from typing import cast
 
-from src.engine.ecs import ECS, Component
+import numpy as np
+
+from src.engine.constants import (
+    COMPONENT_STORAGE_COLUMNAR,
+    COMPONENT_STORAGE_SPARSE,
+)
+from src.engine.ecs import (
+    ECS,
+    Added,
+    ArrayColumn,
+    Changed,
+    Component,
+    Query,
+)
+from src.engine.ecs.entities import entity_generation, entity_index
 
 
 @dataclass
@@ -246,3 +260,1022 @@ class TestECS(unittest.TestCase):
 
         self.assertEqual(ecs.entity_rows[archetype][0], e1)
         self.assertEqual(ecs.entity_rows[archetype][1], e2)
+
+
+@dataclass
+class ColumnarPosition(Component):
+    storage = COMPONENT_STORAGE_COLUMNAR
+    x: float = 0.0
+    y: float = 0.0
+
+
+@dataclass
+class ColumnarVelocity(Component):
+    storage = COMPONENT_STORAGE_COLUMNAR
+    dx: float = 0.0
+    dy: float = 0.0
+
+
+class TestColumnarStorage(unittest.TestCase):
+    def test_columnar_components_use_array_column(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.set_components(entity, [ColumnarPosition(x=1.0, y=2.0)])
+
+        archetype, row = ecs.entities[entity]
+        column = ecs.components[archetype][ColumnarPosition]
+
+        self.assertIsInstance(column, ArrayColumn)
+        self.assertEqual(column[row], ColumnarPosition(x=1.0, y=2.0))
+
+    def test_non_numeric_columnar_component_raises(self):
+        @dataclass
+        class Name(Component):
+            storage = COMPONENT_STORAGE_COLUMNAR
+            value: str = ""
+
+        ecs = ECS()
+        entity = ecs.spawn()
+
+        with self.assertRaises(TypeError):
+            ecs.set_components(entity, [Name(value="steve")])
+
+    def test_mixed_field_types_are_rejected_at_registration(self):
+        @dataclass
+        class Mixed(Component):
+            storage = COMPONENT_STORAGE_COLUMNAR
+            id: int = 0
+            x: float = 0.0
+            flag: bool = False
+
+        ecs = ECS()
+        entity = ecs.spawn()
+
+        with self.assertRaises(TypeError):
+            ecs.set_components(entity, [Mixed(id=2**60 + 1, x=1.5, flag=True)])
+        self.assertNotIn(Mixed, ecs.types.inverse)
+        with self.assertRaises(TypeError):
+            ecs.register_type(Mixed, 0)
+
+    def test_int_and_bool_columns_keep_their_types(self):
+        @dataclass
+        class Ids(Component):
+            storage = COMPONENT_STORAGE_COLUMNAR
+            id: int = 0
+            parent: int = 0
+
+        @dataclass
+        class Flags(Component):
+            storage = COMPONENT_STORAGE_COLUMNAR
+            visible: bool = False
+            dirty: bool = False
+
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.set_components(entity, [Ids(2**60 + 1, -1), Flags(True, False)])
+
+        ids, flags = ecs.get(entity, Ids), ecs.get(entity, Flags)
+        self.assertEqual(ids, Ids(2**60 + 1, -1))
+        self.assertIs(type(ids.id), int)
+        self.assertIs(flags.visible, True)
+
+    def test_query_returns_writable_view(self):
+        ecs = ECS()
+        for i in range(100):
+            entity = ecs.spawn()
+            ecs.set_components(
+                entity,
+                [
+                    ColumnarPosition(x=float(i), y=0.0),
+                    ColumnarVelocity(dx=1.0, dy=2.0),
+                ],
+            )
+
+        _, components = ecs.query([ColumnarPosition, ColumnarVelocity])
+        position = components[ColumnarPosition]
+        velocity = components[ColumnarVelocity]
+        position += velocity * 0.5
+
+        _, components = ecs.query([ColumnarPosition])
+        self.assertEqual(components[ColumnarPosition].shape, (100, 2))
+        self.assertEqual(components[ColumnarPosition][10, 0], 10.5)
+        self.assertEqual(components[ColumnarPosition][10, 1], 1.0)
+
+    def test_remove_swaps_columnar_rows(self):
+        ecs = ECS()
+        e1 = ecs.spawn()
+        e2 = ecs.spawn()
+        e3 = ecs.spawn()
+
+        ecs.set_components(e1, [ColumnarPosition(x=1.0)])
+        ecs.set_components(e2, [ColumnarPosition(x=2.0)])
+        ecs.set_components(e3, [ColumnarPosition(x=3.0)])
+        ecs.remove(e1)
+
+        archetype, row = ecs.entities[e3]
+        column = ecs.components[archetype][ColumnarPosition]
+        self.assertEqual(len(column), 2)
+        self.assertEqual(column[row].x, 3.0)
+
+    def test_query_mixed_storage(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.set_components(
+            entity, [ColumnarPosition(x=1.0, y=2.0), Tag(name="player")]
+        )
+
+        entities, components = ecs.query([ColumnarPosition, Tag])
+
+        self.assertEqual(entities, [entity])
+        self.assertEqual(components[ColumnarPosition].tolist(), [[1.0, 2.0]])
+        self.assertEqual(components[Tag], [Tag(name="player")])
+
+
+class TestArchetypeIndex(unittest.TestCase):
+    def test_register_type_under_saved_id(self):
+        ecs = ECS()
+        ecs.register_type(Velocity, 3)
+        ecs.register_type(Velocity, 3)
+        archetype = ecs.determine_archetype(frozenset({Position, Velocity}))
+
+        self.assertEqual(ecs.types.inverse[Position], 4)
+        self.assertEqual(archetype, 1 << 3 | 1 << 4)
+        with self.assertRaises(ValueError):
+            ecs.register_type(Tag, 3)
+        with self.assertRaises(ValueError):
+            ecs.register_type(Velocity, 0)
+
+    def test_index_tracks_new_archetypes(self):
+        ecs = ECS()
+        e1 = ecs.spawn()
+        e2 = ecs.spawn()
+
+        ecs.set_components(e1, [Position(), Velocity()])
+        ecs.set_components(e2, [Position()])
+
+        both = ecs.determine_archetype(frozenset({Position, Velocity}))
+        position_only = ecs.determine_archetype(frozenset({Position}))
+        self.assertEqual(
+            ecs.archetypes_by_type[Position], [both, position_only]
+        )
+        self.assertEqual(ecs.archetypes_by_type[Velocity], [both])
+
+    def test_find_archetypes_uses_mask(self):
+        ecs = ECS()
+        e1 = ecs.spawn()
+        e2 = ecs.spawn()
+
+        ecs.set_components(e1, [Position(), Velocity()])
+        ecs.set_components(e2, [Position(), Tag()])
+
+        self.assertEqual(
+            ecs.find_archetypes([Position, Velocity]),
+            [ecs.entities[e1][0]],
+        )
+        self.assertEqual(len(ecs.find_archetypes([Position])), 2)
+
+    def test_query_unseen_type_creates_nothing(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.set_components(entity, [Position()])
+        archetype_count = len(ecs.entity_rows)
+
+        entities, _ = ecs.query([Position, Velocity])
+
+        self.assertEqual(entities, [])
+        self.assertEqual(len(ecs.entity_rows), archetype_count)
+        self.assertNotIn(Velocity, ecs.types.inverse)
+
+
+class TestCachedQuery(unittest.TestCase):
+    def test_query_reuses_results_without_changes(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.set_components(entity, [Position(), Velocity()])
+
+        first, _ = ecs.query([Position, Velocity])
+        second, _ = ecs.query([Position, Velocity])
+
+        self.assertIs(first, second)
+
+    def test_query_rebuilds_after_structural_change(self):
+        ecs = ECS()
+        e1 = ecs.spawn()
+        ecs.set_components(e1, [Position()])
+        first, _ = ecs.query([Position])
+
+        e2 = ecs.spawn()
+        ecs.set_components(e2, [Position()])
+        second, _ = ecs.query([Position])
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second, [e1, e2])
+
+        ecs.remove(e1)
+        third, _ = ecs.query([Position])
+        self.assertEqual(third, [e2])
+
+    def test_query_picks_up_new_archetypes(self):
+        ecs = ECS()
+        e1 = ecs.spawn()
+        ecs.set_components(e1, [Position()])
+        query = Query(ecs, [Position])
+        self.assertEqual(query.fetch()[0], [e1])
+
+        e2 = ecs.spawn()
+        ecs.set_components(e2, [Position(), Tag()])
+
+        self.assertEqual(sorted(query.fetch()[0]), [e1, e2])
+        self.assertEqual(len(query.archetypes), 2)
+
+    def test_unrelated_changes_keep_results(self):
+        ecs = ECS()
+        e1 = ecs.spawn()
+        ecs.set_components(e1, [Position()])
+        first, _ = ecs.query([Position])
+
+        e2 = ecs.spawn()
+        ecs.set_components(e2, [Velocity()])
+        second, _ = ecs.query([Position])
+
+        self.assertIs(first, second)
+
+
+class TestChunkIteration(unittest.TestCase):
+    def test_chunks_are_backed_by_storage(self):
+        ecs = ECS()
+        e1 = ecs.spawn()
+        e2 = ecs.spawn()
+        ecs.set_components(e1, [Position(x=1.0), Velocity()])
+        ecs.set_components(e2, [Position(x=2.0), Velocity(), Tag()])
+
+        chunks = list(ecs.query_chunks(Velocity, Position))
+
+        self.assertEqual(len(chunks), 2)
+        for entities, (velocities, positions) in chunks:
+            archetype, _ = ecs.entities[entities[0]]
+            self.assertIs(entities, ecs.entity_rows[archetype])
+            self.assertIs(positions, ecs.components[archetype][Position])
+            self.assertIs(velocities, ecs.components[archetype][Velocity])
+
+    def test_chunks_skip_empty_archetypes(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.set_components(entity, [Position()])
+        ecs.remove(entity)
+
+        self.assertEqual(list(ecs.query_chunks(Position)), [])
+
+    def test_columnar_chunks_write_back(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.set_components(
+            entity, [ColumnarPosition(x=1.0), ColumnarVelocity(dx=2.0)]
+        )
+        other = ecs.spawn()
+        ecs.set_components(
+            other,
+            [ColumnarPosition(), ColumnarVelocity(dx=1.0), Tag()],
+        )
+
+        for _, (position, velocity) in ecs.query_chunks(
+            ColumnarPosition, ColumnarVelocity
+        ):
+            position += velocity
+
+        archetype, row = ecs.entities[entity]
+        column = ecs.components[archetype][ColumnarPosition]
+        self.assertEqual(column[row].x, 3.0)
+        archetype, row = ecs.entities[other]
+        column = ecs.components[archetype][ColumnarPosition]
+        self.assertEqual(column[row].x, 1.0)
+
+    def test_iter_yields_each_entity(self):
+        ecs = ECS()
+        e1 = ecs.spawn()
+        e2 = ecs.spawn()
+        ecs.set_components(e1, [Position(x=1.0), Velocity(dx=1.0)])
+        ecs.set_components(e2, [Position(x=2.0), Velocity(dx=1.0), Tag()])
+
+        for _, (position, velocity) in ecs.iter(Position, Velocity):
+            position = cast(Position, position)
+            position.x += cast(Velocity, velocity).dx
+
+        seen = {
+            entity: cast(Position, position).x
+            for entity, (position,) in ecs.iter(Position)
+        }
+        self.assertEqual(seen, {e1: 2.0, e2: 3.0})
+
+
+class TestBatchOperations(unittest.TestCase):
+    def test_spawn_batch(self):
+        ecs = ECS()
+        ecs.spawn()
+
+        entities = ecs.spawn_batch(
+            3,
+            {
+                Position: [Position(x=float(i)) for i in range(3)],
+                Velocity: [Velocity() for _ in range(3)],
+            },
+        )
+
+        self.assertEqual(entities, [1, 2, 3])
+        for i, entity in enumerate(entities):
+            archetype, row = ecs.entities[entity]
+            self.assertEqual(row, i)
+            self.assertEqual(ecs.entity_rows[archetype][row], entity)
+            position = ecs.components[archetype][Position][row]
+            self.assertEqual(cast(Position, position).x, float(i))
+
+    def test_spawn_batch_rejects_mismatched_lengths(self):
+        ecs = ECS()
+
+        with self.assertRaises(ValueError):
+            _ = ecs.spawn_batch(2, {Position: [Position()]})
+
+    def test_spawn_batch_columnar_from_array(self):
+        ecs = ECS()
+        data = np.arange(8, dtype=np.float64).reshape(4, 2)
+
+        entities = ecs.spawn_batch(4, {ColumnarPosition: data})
+
+        _, components = ecs.query([ColumnarPosition])
+        self.assertEqual(len(entities), 4)
+        self.assertEqual(components[ColumnarPosition].tolist(), data.tolist())
+
+    def test_set_components_batch_moves_entities(self):
+        ecs = ECS()
+        entities = ecs.spawn_batch(3, {Position: [Position()] * 3})
+        untouched = ecs.spawn()
+        ecs.set_components(untouched, [Position(x=9.0)])
+
+        ecs.set_components_batch(
+            entities[:2],
+            {
+                Position: [Position(x=1.0), Position(x=2.0)],
+                Velocity: [Velocity(), Velocity()],
+            },
+        )
+
+        moved, components = ecs.query([Position, Velocity])
+        self.assertEqual(moved, entities[:2])
+        self.assertEqual(
+            [cast(Position, p).x for p in components[Position]], [1.0, 2.0]
+        )
+        remaining, _ = ecs.query([Position])
+        self.assertEqual(sorted(remaining), [*entities, untouched])
+
+
+class TestSingleComponentChanges(unittest.TestCase):
+    def test_add_component_moves_entity(self):
+        ecs = ECS()
+        e1 = ecs.spawn()
+        e2 = ecs.spawn()
+        ecs.set_components(e1, [Position(x=1.0)])
+        ecs.set_components(e2, [Position(x=2.0)])
+
+        ecs.add_component(e1, Velocity(dx=3.0))
+
+        archetype, row = ecs.entities[e1]
+        self.assertEqual(ecs.determine_types(archetype), {Position, Velocity})
+        self.assertEqual(ecs.components[archetype][Position][row].x, 1.0)
+        self.assertEqual(ecs.components[archetype][Velocity][row].dx, 3.0)
+        self.assertEqual(ecs.entities[e2][1], 0)
+
+    def test_add_existing_component_replaces(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.set_components(entity, [Position(x=1.0)])
+        archetype, _ = ecs.entities[entity]
+
+        ecs.add_component(entity, Position(x=5.0))
+
+        self.assertEqual(ecs.entities[entity], (archetype, 0))
+        self.assertEqual(ecs.components[archetype][Position][0].x, 5.0)
+
+    def test_add_existing_component_updates_cached_query(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.set_components(entity, [Position(x=1.0)])
+        _, components = ecs.query([Position])
+        self.assertEqual(components[Position][0].x, 1.0)
+
+        ecs.add_component(entity, Position(x=5.0))
+
+        _, components = ecs.query([Position])
+        self.assertEqual(components[Position][0].x, 5.0)
+
+    def test_remove_component_moves_entity(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.set_components(entity, [Position(x=1.0), Velocity()])
+
+        ecs.remove_component(entity, Velocity)
+        ecs.remove_component(entity, Tag)
+
+        archetype, row = ecs.entities[entity]
+        self.assertEqual(ecs.determine_types(archetype), {Position})
+        self.assertEqual(ecs.components[archetype][Position][row].x, 1.0)
+
+    def test_transitions_are_cached(self):
+        ecs = ECS()
+        e1 = ecs.spawn()
+        e2 = ecs.spawn()
+        ecs.add_component(e1, Position())
+        archetype_count = len(ecs.entity_rows)
+
+        ecs.determine_archetype = None  # pyright: ignore[reportAttributeAccessIssue]
+        ecs.add_component(e2, Position())
+
+        self.assertEqual(len(ecs.entity_rows), archetype_count)
+        self.assertEqual(ecs.entities[e1][0], ecs.entities[e2][0])
+
+    def test_columnar_rows_move_between_archetypes(self):
+        ecs = ECS()
+        e1 = ecs.spawn()
+        e2 = ecs.spawn()
+        ecs.set_components(e1, [ColumnarPosition(x=1.0, y=2.0)])
+        ecs.set_components(e2, [ColumnarPosition(x=3.0, y=4.0)])
+
+        ecs.add_component(e1, Tag(name="moved"))
+
+        archetype, row = ecs.entities[e1]
+        column = ecs.components[archetype][ColumnarPosition]
+        self.assertEqual(column[row], ColumnarPosition(x=1.0, y=2.0))
+        archetype, row = ecs.entities[e2]
+        column = ecs.components[archetype][ColumnarPosition]
+        self.assertEqual(len(column), 1)
+        self.assertEqual(column[row], ColumnarPosition(x=3.0, y=4.0))
+
+
+class TestChangeDetection(unittest.TestCase):
+    def test_added_filter(self):
+        ecs = ECS()
+        old = ecs.spawn()
+        ecs.set_components(old, [Position()])
+        since = ecs.advance_tick()
+
+        new = ecs.spawn()
+        ecs.set_components(new, [Position()])
+
+        entities, _ = ecs.query(
+            [Position], filters=[Added[Position]], since=since
+        )
+        self.assertEqual(entities, [new])
+
+    def test_changed_filter_tracks_marks(self):
+        ecs = ECS()
+        entities = ecs.spawn_batch(
+            3, {Position: [Position() for _ in range(3)]}
+        )
+        since = ecs.advance_tick()
+
+        self.assertEqual(
+            ecs.query([Position], filters=[Changed[Position]], since=since)[0],
+            [],
+        )
+
+        ecs.mark_changed(entities[1], Position)
+
+        changed, components = ecs.query(
+            [Position], filters=[Changed(Position)], since=since
+        )
+        self.assertEqual(changed, [entities[1]])
+        self.assertEqual(len(components[Position]), 1)
+
+    def test_mutable_access_marks_rows(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.set_components(entity, [Position(), Velocity()])
+        since = ecs.advance_tick()
+
+        for _ in ecs.iter(Position, Velocity, mutable=[Position]):
+            pass
+
+        changed = ecs.iter(Position, filters=[Changed[Position]], since=since)
+        self.assertEqual([e for e, _ in changed], [entity])
+        changed = ecs.iter(Velocity, filters=[Changed[Velocity]], since=since)
+        self.assertEqual([e for e, _ in changed], [])
+
+    def test_ticks_survive_moves(self):
+        ecs = ECS()
+        e1 = ecs.spawn()
+        e2 = ecs.spawn()
+        ecs.set_components(e1, [Position()])
+        ecs.set_components(e2, [Position()])
+        since = ecs.advance_tick()
+
+        ecs.mark_changed(e2, Position)
+        ecs.remove(e1)
+        ecs.add_component(e2, Tag())
+
+        added = ecs.query([Tag], filters=[Added[Position]], since=since)
+        changed = ecs.query([Tag], filters=[Changed[Position]], since=since)
+        self.assertEqual(added[0], [])
+        self.assertEqual(changed[0], [e2])
+
+    def test_filtered_columnar_chunks(self):
+        ecs = ECS()
+        data = np.arange(8, dtype=np.float64).reshape(4, 2)
+        entities = ecs.spawn_batch(4, {ColumnarPosition: data})
+        since = ecs.advance_tick()
+        ecs.mark_changed(entities[2], ColumnarPosition)
+
+        chunks = list(
+            ecs.query_chunks(
+                ColumnarPosition,
+                filters=[Changed[ColumnarPosition]],
+                since=since,
+            )
+        )
+
+        self.assertEqual(len(chunks), 1)
+        chunk_entities, (positions,) = chunks[0]
+        self.assertEqual(chunk_entities, [entities[2]])
+        self.assertEqual(positions.tolist(), [[4.0, 5.0]])
+
+
+class TestCommands(unittest.TestCase):
+    def test_remove_batch(self):
+        ecs = ECS()
+        entities = ecs.spawn_batch(
+            6, {Position: [Position(x=float(i)) for i in range(6)]}
+        )
+
+        ecs.remove_batch([entities[1], entities[4], entities[5]])
+
+        remaining, components = ecs.query([Position])
+        self.assertEqual(sorted(remaining), [0, 2, 3])
+        for entity, position in zip(remaining, components[Position]):
+            self.assertEqual(cast(Position, position).x, float(entity))
+            archetype, row = ecs.entities[entity]
+            self.assertEqual(ecs.entity_rows[archetype][row], entity)
+
+    def test_commands_are_deferred(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+
+        ecs.commands.remove(entity)
+        ecs.commands.spawn([Position()])
+
+        self.assertIn(entity, ecs.entities)
+        self.assertEqual(len(ecs.commands), 2)
+
+        ecs.commands.apply()
+
+        self.assertNotIn(entity, ecs.entities)
+        self.assertEqual(len(ecs.query([Position])[0]), 1)
+        self.assertEqual(len(ecs.commands), 0)
+
+    def test_commands_while_iterating(self):
+        ecs = ECS()
+        _ = ecs.spawn_batch(
+            4, {Position: [Position(x=float(i)) for i in range(4)]}
+        )
+
+        for entity, (position,) in ecs.iter(Position):
+            if cast(Position, position).x < 2:
+                ecs.commands.remove(entity)
+            else:
+                ecs.commands.add_component(entity, Tag(name="kept"))
+        ecs.commands.apply()
+
+        entities, components = ecs.query([Position, Tag])
+        self.assertEqual(sorted(entities), [2, 3])
+        self.assertEqual(len(ecs.entities), 2)
+        self.assertEqual(len(components[Tag]), 2)
+
+    def test_commands_set_and_edit_order(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+
+        ecs.commands.add_component(entity, Tag())
+        ecs.commands.set_components(entity, [Position(x=1.0)])
+        ecs.commands.remove_component(entity, Tag)
+        ecs.commands.add_component(entity, Velocity())
+        ecs.commands.apply()
+
+        archetype, _ = ecs.entities[entity]
+        self.assertEqual(ecs.determine_types(archetype), {Position, Velocity})
+
+    def test_commands_skip_dead_entities(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.remove(entity)
+
+        ecs.commands.remove(entity)
+        ecs.commands.add_component(entity, Tag())
+        ecs.commands.apply()
+
+        self.assertEqual(len(ecs.entities), 0)
+
+
+class TestEntityIds(unittest.TestCase):
+    def test_removed_ids_are_recycled_with_new_generation(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.remove(entity)
+
+        recycled = ecs.spawn()
+        self.assertNotEqual(recycled, entity)
+        self.assertEqual(entity_index(recycled), entity_index(entity))
+        self.assertEqual(entity_generation(recycled), 1)
+        self.assertEqual(ecs.entities.capacity, 1)
+
+    def test_stale_handles_are_detected(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.remove(entity)
+        recycled = ecs.spawn()
+
+        self.assertFalse(ecs.is_alive(entity))
+        self.assertTrue(ecs.is_alive(recycled))
+        self.assertNotIn(entity, ecs.entities)
+        with self.assertRaises(KeyError):
+            ecs.set_components(entity, [Position()])
+        with self.assertRaises(KeyError):
+            ecs.remove(entity)
+
+    def test_spawn_batch_recycles_free_slots_first(self):
+        ecs = ECS()
+        entities = ecs.spawn_batch(
+            4, {Position: [Position() for _ in range(4)]}
+        )
+        ecs.remove_batch(entities[:2])
+
+        spawned = ecs.spawn_batch(3, {Tag: [Tag(), Tag(), Tag()]})
+        self.assertEqual(
+            sorted(entity_index(entity) for entity in spawned), [0, 1, 4]
+        )
+        self.assertEqual(len(ecs.entities), 5)
+        self.assertEqual(set(ecs.entities), set(entities[2:]) | set(spawned))
+        for entity in spawned:
+            archetype, row = ecs.entities[entity]
+            self.assertEqual(ecs.entity_rows[archetype][row], entity)
+
+
+@dataclass
+class Static(Component): ...
+
+
+class TestArchetypeMetadata(unittest.TestCase):
+    def test_archetype_info_lists_types_in_column_order(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.set_components(entity, [Velocity(), Position()])
+
+        archetype, _ = ecs.entities[entity]
+        info = ecs.archetypes[archetype]
+        self.assertEqual(info.mask, archetype)
+        self.assertEqual(info.types, tuple(ecs.components[archetype]))
+        self.assertEqual(info.types, tuple(ecs.ticks[archetype]))
+        self.assertEqual(info.columns[info.types[1]], 1)
+        self.assertIn(Position, info)
+        self.assertNotIn(Tag, info)
+        self.assertEqual(ecs.determine_types(archetype), {Position, Velocity})
+
+    def test_determine_types_returns_a_copy(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.set_components(entity, [Position()])
+        archetype, _ = ecs.entities[entity]
+
+        ecs.determine_types(archetype).add(Tag)
+        self.assertEqual(ecs.determine_types(archetype), {Position})
+
+
+class TestQueryExclusion(unittest.TestCase):
+    def setUp(self):
+        self.ecs = ECS()
+        self.moving = self.ecs.spawn_batch(2, {Position: [Position()] * 2})
+        self.static = self.ecs.spawn_batch(
+            3, {Position: [Position()] * 3, Static: [Static()] * 3}
+        )
+        self.tagged = self.ecs.spawn_batch(
+            1, {Position: [Position()], Tag: [Tag()]}
+        )
+
+    def test_without_skips_archetypes(self):
+        entities, components = self.ecs.query([Position], without=[Static])
+        self.assertEqual(sorted(entities), sorted(self.moving + self.tagged))
+        self.assertEqual(len(components[Position]), 3)
+
+    def test_with_requires_without_fetching(self):
+        entities, components = self.ecs.query([Position], with_=[Static])
+        self.assertEqual(sorted(entities), sorted(self.static))
+        self.assertEqual(list(components), [Position])
+
+    def test_unregistered_types(self):
+        @dataclass
+        class Unused(Component): ...
+
+        entities, _ = self.ecs.query([Position], without=[Unused])
+        self.assertEqual(len(entities), 6)
+        entities, _ = self.ecs.query([Position], with_=[Unused])
+        self.assertEqual(entities, [])
+
+    def test_exclusion_follows_structural_changes(self):
+        self.ecs.remove_component(self.static[0], Static)
+        self.ecs.add_component(self.moving[0], Static())
+
+        entities = [
+            entity
+            for entity, _ in self.ecs.iter(
+                Position, with_=[Tag], without=[Static]
+            )
+        ]
+        self.assertEqual(entities, self.tagged)
+        entities, _ = self.ecs.query([Position], without=[Static, Tag])
+        self.assertEqual(
+            sorted(entities), sorted([self.moving[1], self.static[0]])
+        )
+
+
+@dataclass
+class Selected(Component):
+    storage = COMPONENT_STORAGE_SPARSE
+
+
+@dataclass
+class Dirty(Component):
+    storage = COMPONENT_STORAGE_SPARSE
+    reason: str = ""
+
+
+class TestSparseStorage(unittest.TestCase):
+    def setUp(self):
+        self.ecs = ECS()
+        self.entities = self.ecs.spawn_batch(
+            4, {Position: [Position(x=float(i)) for i in range(4)]}
+        )
+
+    def test_toggling_sparse_components_never_moves_rows(self):
+        entity = self.entities[1]
+        location = self.ecs.entities[entity]
+        generation = self.ecs.generations[location[0]]
+
+        self.ecs.add_component(entity, Selected())
+        self.assertIn(entity, self.ecs.sparse[Selected])
+        self.ecs.remove_component(entity, Selected)
+        self.assertNotIn(entity, self.ecs.sparse[Selected])
+
+        self.assertEqual(self.ecs.entities[entity], location)
+        self.assertEqual(self.ecs.generations[location[0]], generation)
+        self.assertNotIn(Selected, self.ecs.types.inverse)
+
+    def test_sparse_set_swap_removes(self):
+        sparse_set = self.ecs.sparse_set(Dirty)
+        for entity in self.entities:
+            sparse_set.insert(entity, Dirty(reason=str(entity)), tick=1)
+
+        self.assertTrue(sparse_set.discard(self.entities[0]))
+        self.assertFalse(sparse_set.discard(self.entities[0]))
+        self.assertEqual(len(sparse_set), 3)
+        for entity in self.entities[1:]:
+            self.assertEqual(sparse_set.get(entity).reason, str(entity))
+        with self.assertRaises(KeyError):
+            _ = sparse_set.get(self.entities[0])
+
+    def test_queries_join_sparse_and_table_components(self):
+        self.ecs.add_component(self.entities[3], Dirty(reason="a"))
+        self.ecs.add_component(self.entities[1], Dirty(reason="b"))
+        self.ecs.add_component(self.entities[1], Selected())
+        self.ecs.add_component(self.entities[2], Selected())
+
+        entities, components = self.ecs.query([Position, Dirty])
+        self.assertEqual(entities, [self.entities[1], self.entities[3]])
+        self.assertEqual([d.reason for d in components[Dirty]], ["b", "a"])
+        self.assertEqual([p.x for p in components[Position]], [1.0, 3.0])
+
+        entities, _ = self.ecs.query([Position], with_=[Dirty, Selected])
+        self.assertEqual(entities, [self.entities[1]])
+
+        entities, _ = self.ecs.query([Position], without=[Selected])
+        self.assertEqual(entities, [self.entities[0], self.entities[3]])
+
+        entities, _ = self.ecs.query([Selected])
+        self.assertEqual(sorted(entities), [self.entities[1], self.entities[2]])
+
+    def test_sparse_change_detection(self):
+        self.ecs.add_component(self.entities[0], Dirty())
+        self.ecs.add_component(self.entities[1], Dirty())
+        since = self.ecs.advance_tick()
+
+        self.ecs.add_component(self.entities[1], Dirty(reason="again"))
+        self.ecs.add_component(self.entities[2], Dirty())
+
+        entities, _ = self.ecs.query(
+            [Position], filters=[Changed[Dirty]], since=since
+        )
+        self.assertEqual(entities, [self.entities[1], self.entities[2]])
+        entities, _ = self.ecs.query(
+            [Position], filters=[Added[Dirty]], since=since
+        )
+        self.assertEqual(entities, [self.entities[2]])
+
+    def test_set_components_and_remove_clear_sparse_components(self):
+        entity = self.entities[0]
+        self.ecs.set_components(entity, [Position(), Selected(), Dirty()])
+        self.assertIn(entity, self.ecs.sparse[Dirty])
+
+        self.ecs.set_components(entity, [Position(), Selected()])
+        self.assertNotIn(entity, self.ecs.sparse[Dirty])
+        self.assertIn(entity, self.ecs.sparse[Selected])
+
+        self.ecs.remove(entity)
+        recycled = self.ecs.spawn()
+        self.assertNotIn(entity, self.ecs.sparse[Selected])
+        self.assertNotIn(recycled, self.ecs.sparse[Selected])
+
+    def test_set_components_runs_sparse_hooks(self):
+        added, removed = [], []
+        self.ecs.add_hooks(
+            Selected, on_add=added.append, on_remove=removed.append
+        )
+        entity = self.entities[0]
+
+        self.ecs.set_components(entity, [Position(), Selected()])
+        self.assertEqual(added, [entity])
+        self.ecs.set_components(entity, [Position()])
+        self.assertEqual(removed, [entity])
+
+        self.ecs.remove_hooks(Selected, on_add=added.append)
+        self.assertIn(Selected, self.ecs.hooks)
+        self.ecs.remove_hooks(Selected, on_remove=removed.append)
+        self.assertNotIn(Selected, self.ecs.hooks)
+
+    def test_spawn_batch_with_sparse_components(self):
+        entities = self.ecs.spawn_batch(
+            2, {Velocity: [Velocity(), Velocity()], Selected: [Selected()] * 2}
+        )
+
+        archetype, _ = self.ecs.entities[entities[0]]
+        self.assertEqual(self.ecs.determine_types(archetype), {Velocity})
+        found, _ = self.ecs.query([Velocity, Selected])
+        self.assertEqual(found, entities)
+
+
+class TestCompaction(unittest.TestCase):
+    def test_reserve_allocates_columns_once(self):
+        ecs = ECS()
+        archetype = ecs.reserve([ColumnarPosition, Position, Selected], 1000)
+        column = cast(ArrayColumn, ecs.components[archetype][ColumnarPosition])
+        self.assertEqual(column.capacity, 1000)
+
+        data = column.data
+        _ = ecs.spawn_batch(
+            1000,
+            {
+                ColumnarPosition: np.zeros((1000, 2)),
+                Position: [Position()] * 1000,
+            },
+        )
+        self.assertIs(column.data, data)
+
+    def test_compact_drops_empty_archetypes(self):
+        ecs = ECS()
+        entity = ecs.spawn()
+        ecs.add_component(entity, Position())
+        ecs.add_component(entity, Velocity())
+        ecs.remove_component(entity, Position)
+        stats = ecs.fragmentation()
+        self.assertEqual((stats.archetypes, stats.empty_archetypes), (4, 3))
+
+        self.assertEqual(ecs.compact(), 3)
+        self.assertEqual(list(ecs.archetypes), [ecs.entities[entity][0]])
+        self.assertEqual(ecs.find_archetypes([Position]), [])
+        self.assertEqual(ecs.fragmentation().empty_archetypes, 0)
+
+        ecs.add_component(entity, Position())
+        entities, components = ecs.query([Position, Velocity])
+        self.assertEqual(entities, [entity])
+        self.assertEqual(components[Position], [Position()])
+        self.assertEqual(len(ecs.query([Velocity])[0]), 1)
+
+    def test_recreated_archetypes_invalidate_cached_queries(self):
+        ecs = ECS()
+        ecs.remove(ecs.spawn_batch(1, {Position: [Position()]})[0])
+        self.assertEqual(ecs.query([Position])[0], [])
+
+        _ = ecs.compact()
+        entities = ecs.spawn_batch(1, {Position: [Position()]})
+        entities.append(ecs.spawn())
+        ecs.add_component(entities[1], Position())
+        self.assertEqual(ecs.query([Position])[0], entities)
+
+    def test_compact_shrinks_columns(self):
+        ecs = ECS()
+        entities = ecs.spawn_batch(
+            100,
+            {ColumnarPosition: np.ones((100, 2)), Position: [Position()] * 100},
+        )
+        ecs.remove_batch(entities[10:])
+        _, components = ecs.query([ColumnarPosition])
+        self.assertGreater(ecs.fragmentation().slack_bytes, 0)
+
+        ecs.compact()
+        self.assertEqual(ecs.fragmentation().slack_bytes, 0)
+        self.assertEqual(ecs.fragmentation().rows, 10)
+
+        # cached results are rebuilt on top of the new arrays.
+        _, compacted = ecs.query([ColumnarPosition], mutable=[ColumnarPosition])
+        self.assertIsNot(
+            compacted[ColumnarPosition], components[ColumnarPosition]
+        )
+        compacted[ColumnarPosition][:] = 5.0
+        self.assertEqual(
+            ecs.query([ColumnarPosition])[1][ColumnarPosition].sum(), 100.0
+        )
+
+
+class TestRandomAccess(unittest.TestCase):
+    def setUp(self):
+        self.ecs = ECS()
+        self.moving = self.ecs.spawn_batch(
+            3,
+            {
+                Position: [Position(x=i) for i in range(3)],
+                ColumnarPosition: np.arange(6.0).reshape(3, 2),
+            },
+        )
+        self.tagged = self.ecs.spawn_batch(
+            2,
+            {
+                Position: [Position(y=i) for i in range(2)],
+                ColumnarPosition: np.full((2, 2), -1.0),
+                Tag: [Tag(), Tag()],
+            },
+        )
+        self.ecs.add_component(self.moving[1], Selected())
+
+    def test_get(self):
+        self.assertEqual(self.ecs.get(self.moving[2], Position), Position(x=2))
+        self.assertEqual(
+            self.ecs.get(self.moving[1], ColumnarPosition),
+            ColumnarPosition(x=2.0, y=3.0),
+        )
+        self.assertEqual(self.ecs.get(self.moving[1], Selected), Selected())
+
+        with self.assertRaises(KeyError):
+            _ = self.ecs.get(self.moving[0], Tag)
+        with self.assertRaises(KeyError):
+            _ = self.ecs.get(self.moving[0], Selected)
+        self.ecs.remove(self.moving[0])
+        with self.assertRaises(KeyError):
+            _ = self.ecs.get(self.moving[0], Position)
+
+    def test_get_many_across_archetypes(self):
+        entities = [self.tagged[1], self.moving[2], self.tagged[0]]
+        self.assertEqual(
+            self.ecs.get_many(entities, Position),
+            [Position(y=1), Position(x=2), Position(y=0)],
+        )
+        np.testing.assert_array_equal(
+            self.ecs.get_many(np.array(entities), ColumnarPosition),
+            [[-1, -1], [4, 5], [-1, -1]],
+        )
+        self.assertEqual(self.ecs.get_many([], Position), [])
+
+        with self.assertRaises(KeyError):
+            _ = self.ecs.get_many([self.moving[0], self.tagged[0]], Tag)
+        self.ecs.remove(self.moving[0])
+        with self.assertRaises(KeyError):
+            _ = self.ecs.get_many([self.moving[0]], Position)
+
+    def test_set_many(self):
+        since = self.ecs.advance_tick()
+        entities = [self.tagged[0], self.moving[0]]
+        self.ecs.set_many(
+            entities, ColumnarPosition, np.array([[7, 7], [8, 8]])
+        )
+        self.ecs.set_many(entities, Position, [Position(x=9), Position(x=10)])
+
+        np.testing.assert_array_equal(
+            self.ecs.get_many(entities, ColumnarPosition), [[7, 7], [8, 8]]
+        )
+        self.assertEqual(self.ecs.get(self.moving[0], Position), Position(x=10))
+
+        changed, _ = self.ecs.query([Position], [Changed[Position]], since)
+        self.assertEqual(set(changed), set(entities))
+
+        with self.assertRaises(ValueError):
+            self.ecs.set_many(entities, Position, [Position()])
+
+    def test_set_many_updates_cached_queries(self):
+        entities, components = self.ecs.query([Position, ColumnarPosition])
+        self.assertEqual(components[Position][0], Position(x=0))
+
+        self.ecs.set_many(entities, Position, [Position(x=-1)] * len(entities))
+        self.ecs.set_many(
+            entities, ColumnarPosition, np.zeros((len(entities), 2))
+        )
+
+        _, components = self.ecs.query([Position, ColumnarPosition])
+        self.assertEqual(components[Position], [Position(x=-1)] * len(entities))
+        self.assertEqual(components[ColumnarPosition].sum(), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
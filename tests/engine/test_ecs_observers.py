@@ -0,0 +1,119 @@
+import unittest
+from dataclasses import dataclass
+
+from src.engine.constants import COMPONENT_STORAGE_SPARSE
+from src.engine.ecs import ECS, Component, OnAdd, OnChange, OnRemove
+
+
+@dataclass
+class Position(Component):
+    x: float = 0.0
+    y: float = 0.0
+
+
+@dataclass
+class Selected(Component):
+    storage = COMPONENT_STORAGE_SPARSE
+
+
+class TestObservers(unittest.TestCase):
+    def setUp(self):
+        self.ecs = ECS()
+        self.events: list[tuple[str, list[int]]] = []
+        self.ecs.observe(OnAdd[Position], self.recorder("add"))
+        self.ecs.observe(OnRemove[Position], self.recorder("remove"))
+        self.ecs.observe(OnChange[Position], self.recorder("change"))
+
+    def recorder(self, name):
+        def observer(entities):
+            self.events.append((name, list(entities)))
+
+        return observer
+
+    def test_batches_fire_on_apply(self):
+        entities = self.ecs.spawn_batch(3, {Position: [Position()] * 3})
+        self.assertEqual(self.events, [])
+
+        self.ecs.commands.apply()
+        self.assertEqual(self.events, [("add", entities)])
+
+        self.events.clear()
+        for entity in entities[:2]:
+            self.ecs.commands.remove(entity)
+        self.ecs.commands.apply()
+        self.assertEqual(self.events, [("remove", entities[:2])])
+
+    def test_changes(self):
+        entities = self.ecs.spawn_batch(3, {Position: [Position()] * 3})
+        self.ecs.commands.apply()
+        self.events.clear()
+
+        self.ecs.mark_changed(entities[1], Position)
+        self.ecs.commands.apply()
+        self.assertEqual(self.events, [("change", [entities[1]])])
+
+        self.events.clear()
+        self.ecs.commands.apply()
+        self.assertEqual(self.events, [])
+
+    def test_changes_are_coalesced(self):
+        entity = self.ecs.spawn()
+        self.ecs.add_component(entity, Position())
+        self.ecs.mark_changed(entity, Position)
+        self.ecs.remove_component(entity, Position)
+        self.ecs.add_component(entity, Position(x=1.0))
+        self.ecs.commands.apply()
+        self.assertEqual(self.events, [("add", [entity])])
+
+        self.events.clear()
+        self.ecs.set_components(entity, [])
+        self.ecs.add_component(entity, Position())
+        self.ecs.remove(entity)
+        self.ecs.commands.apply()
+        self.assertEqual(self.events, [("remove", [entity])])
+
+    def test_sparse_components(self):
+        selected = self.recorder("selected")
+        self.ecs.observe(OnAdd[Selected], selected)
+        entity = self.ecs.spawn()
+        self.ecs.add_component(entity, Selected())
+        self.ecs.commands.apply()
+        self.assertEqual(self.events, [("selected", [entity])])
+
+        self.events.clear()
+        self.ecs.unobserve(OnAdd[Selected], selected)
+        self.assertNotIn(Selected, self.ecs.hooks)
+        self.ecs.add_component(self.ecs.spawn(), Selected())
+        self.ecs.commands.apply()
+        self.assertEqual(self.events, [])
+
+    def test_sparse_components_set_with_others(self):
+        self.ecs.observe(OnAdd[Selected], self.recorder("selected"))
+        direct, deferred = self.ecs.spawn(), self.ecs.spawn()
+
+        self.ecs.set_components(direct, [Position(), Selected()])
+        self.ecs.commands.set_components(deferred, [Position(), Selected()])
+        self.ecs.commands.apply()
+        self.assertIn(("selected", [direct, deferred]), self.events)
+
+    def test_existing_entities_are_not_reported(self):
+        ecs = ECS()
+        _ = ecs.spawn_batch(2, {Position: [Position()] * 2})
+        ecs.observe(OnChange[Position], self.recorder("change"))
+        ecs.commands.apply()
+        self.assertEqual(self.events, [])
+
+    def test_observers_may_make_structural_changes(self):
+        def tag(entities):
+            for entity in entities:
+                self.ecs.remove_component(entity, Position)
+
+        self.ecs.observe(OnAdd[Position], tag)
+        entity = self.ecs.spawn_batch(1, {Position: [Position()]})[0]
+        self.ecs.commands.apply()
+        self.ecs.commands.apply()
+        self.assertEqual(self.events, [("add", [entity]), ("remove", [entity])])
+
+
+if __name__ == "__main__":
+    unittest.main()
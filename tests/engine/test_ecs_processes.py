@@ -0,0 +1,151 @@
+import multiprocessing
+import unittest
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from src.engine.constants import COMPONENT_STORAGE_COLUMNAR
+from src.engine.ecs import ECS, Changed, Component, SharedArrayColumn
+from src.engine.ecs.processes import ProcessPool, attach_block, split_rows
+
+
+@dataclass
+class Position(Component):
+    storage = COMPONENT_STORAGE_COLUMNAR
+    x: float = 0.0
+    y: float = 0.0
+
+
+@dataclass
+class Velocity(Component):
+    storage = COMPONENT_STORAGE_COLUMNAR
+    dx: float = 0.0
+    dy: float = 0.0
+
+
+@dataclass
+class Frozen(Component): ...
+
+
+def movement(
+    columns: dict[type[Component], npt.NDArray[Any]], dt: float
+) -> None:
+    positions = columns[Position]
+    velocities = columns[Velocity]
+    for row in range(len(positions)):
+        positions[row] += velocities[row] * dt
+
+
+class TestSharedArrayColumn(unittest.TestCase):
+    def test_data_lives_in_shared_memory(self):
+        column = SharedArrayColumn(Position, capacity=4)
+        column.extend([Position(x=1.0, y=2.0)])
+
+        handle = column.handle()
+        block = attach_block(handle.name)
+        try:
+            data = np.ndarray(handle.shape, handle.dtype, buffer=block.buf)
+            np.testing.assert_array_equal(data[:1], [[1.0, 2.0]])
+            data[0, 0] = 5.0
+            del data
+        finally:
+            block.close()
+
+        self.assertEqual(column[0], Position(x=5.0, y=2.0))
+        column.release()
+
+    def test_growing_unlinks_the_previous_block(self):
+        column = SharedArrayColumn(Position, capacity=1)
+        column.append(Position(x=1.0))
+        old = column.handle()
+
+        column.append(Position(x=2.0))
+        self.assertNotEqual(column.handle().name, old.name)
+        self.assertEqual(column.capacity, 2)
+        self.assertEqual(column[0], Position(x=1.0))
+        with self.assertRaises(FileNotFoundError):
+            _ = attach_block(old.name)
+        column.release()
+
+    def test_ecs_allocates_shared_columns_on_request(self):
+        ecs = ECS(shared_columns=True)
+        entity = ecs.spawn()
+        ecs.set_components(entity, [Position(), Frozen()])
+
+        archetype, _ = ecs.entities[entity]
+        columns = ecs.components[archetype]
+        self.assertIsInstance(columns[Position], SharedArrayColumn)
+        self.assertIsInstance(columns[Frozen], list)
+
+
+class TestProcessPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # fork keeps the workers' startup cheap for such small tests.
+        cls.pool = ProcessPool(
+            ECS(shared_columns=True),
+            max_workers=2,
+            mp_context=multiprocessing.get_context("fork"),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.shutdown()
+
+    def setUp(self):
+        self.ecs = self.pool.ecs = ECS(shared_columns=True)
+
+    def test_split_rows(self):
+        self.assertEqual(split_rows(10, 3, 1), [(0, 3), (3, 6), (6, 10)])
+        self.assertEqual(split_rows(10, 4, 4), [(0, 5), (5, 10)])
+        self.assertEqual(split_rows(3, 8, 4), [(0, 3)])
+
+    def test_run_writes_back_into_shared_columns(self):
+        n = 1000
+        _ = self.ecs.spawn_batch(
+            n, {Position: np.zeros((n, 2)), Velocity: np.ones((n, 2))}
+        )
+        frozen = self.ecs.spawn_batch(
+            2,
+            {
+                Position: np.zeros((2, 2)),
+                Velocity: np.ones((2, 2)),
+                Frozen: [Frozen(), Frozen()],
+            },
+        )
+        since = self.ecs.advance_tick()
+
+        self.pool.run(
+            movement,
+            [Position, Velocity],
+            dt=0.5,
+            mutable=[Position],
+            without=[Frozen],
+            min_rows=100,
+        )
+
+        entities, components = self.ecs.query([Position], without=[Frozen])
+        self.assertEqual(len(entities), n)
+        np.testing.assert_array_equal(components[Position], 0.5)
+
+        _, components = self.ecs.query([Position], with_=[Frozen])
+        np.testing.assert_array_equal(components[Position], 0.0)
+
+        entities, _ = self.ecs.query([Position], [Changed[Position]], since)
+        self.assertNotIn(frozen[0], entities)
+        self.assertEqual(len(entities), n)
+
+    def test_run_requires_shared_columns(self):
+        self.ecs = self.pool.ecs = ECS()
+        _ = self.ecs.spawn_batch(
+            1, {Position: [Position()], Velocity: [Velocity()]}
+        )
+
+        with self.assertRaises(TypeError):
+            self.pool.run(movement, [Position, Velocity])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import threading
+import unittest
+from dataclasses import dataclass
+
+from src.engine.ecs import ECS, Component, Scheduler
+from src.engine.event_manager import EventManager
+from src.engine.events import UpdateTick
+
+
+@dataclass
+class Position(Component):
+    x: float = 0.0
+
+
+@dataclass
+class Velocity(Component):
+    dx: float = 0.0
+
+
+@dataclass
+class Health(Component):
+    value: int = 100
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.ecs = ECS()
+        self.scheduler = Scheduler(self.ecs, max_workers=4)
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+
+    def test_non_conflicting_systems_share_a_batch(self):
+        def movement(ecs: ECS, dt: float) -> None: ...
+
+        def regen(ecs: ECS, dt: float) -> None: ...
+
+        def render(ecs: ECS, dt: float) -> None: ...
+
+        _ = self.scheduler.add_system(
+            movement, reads=[Velocity], writes=[Position]
+        )
+        _ = self.scheduler.add_system(regen, writes=[Health])
+        _ = self.scheduler.add_system(render, reads=[Position])
+        self.scheduler.run(0.0)
+
+        batches = [
+            [system.name for system in batch]
+            for batch in self.scheduler.stages["update"].batches
+        ]
+        self.assertEqual(
+            batches,
+            [
+                [movement.__qualname__, regen.__qualname__],
+                [render.__qualname__],
+            ],
+        )
+
+    def test_conflicting_systems_keep_registration_order(self):
+        order: list[str] = []
+
+        @self.scheduler.system(writes=[Position])
+        def first(ecs: ECS, dt: float) -> None:
+            order.append("first")
+
+        @self.scheduler.system(reads=[Position], writes=[Velocity])
+        def second(ecs: ECS, dt: float) -> None:
+            order.append("second")
+
+        @self.scheduler.system(writes=[Velocity])
+        def third(ecs: ECS, dt: float) -> None:
+            order.append("third")
+
+        self.scheduler.run(0.0)
+
+        self.assertEqual(order, ["first", "second", "third"])
+
+    def test_batch_runs_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def a(ecs: ECS, dt: float) -> None:
+            _ = barrier.wait()
+
+        def b(ecs: ECS, dt: float) -> None:
+            _ = barrier.wait()
+
+        _ = self.scheduler.add_system(a, writes=[Position])
+        _ = self.scheduler.add_system(b, writes=[Velocity])
+
+        self.scheduler.run(0.0)  # deadlocks unless both run at once
+
+    def test_stages_run_in_order(self):
+        scheduler = Scheduler(self.ecs, stages=["pre_update", "update"])
+        order: list[str] = []
+        _ = scheduler.add_system(
+            lambda ecs, dt: order.append("update"), name="update"
+        )
+        _ = scheduler.add_system(
+            lambda ecs, dt: order.append("pre"), stage="pre_update", name="pre"
+        )
+
+        scheduler.run(0.0)
+        scheduler.shutdown()
+
+        self.assertEqual(order, ["pre", "update"])
+
+    def test_timings_and_errors(self):
+        def broken(ecs: ECS, dt: float) -> None:
+            raise RuntimeError("boom")
+
+        system = self.scheduler.add_system(broken)
+
+        with self.assertRaises(RuntimeError):
+            self.scheduler.run(0.0)
+        self.assertEqual(system.runs, 1)
+        self.assertIn(system.name, self.scheduler.timings())
+
+    def test_duplicate_names_rejected(self):
+        _ = self.scheduler.add_system(lambda ecs, dt: None, name="system")
+
+        with self.assertRaises(ValueError):
+            _ = self.scheduler.add_system(lambda ecs, dt: None, name="system")
+
+    def test_runs_on_update_tick(self):
+        event_manager = EventManager()
+        dts: list[float] = []
+        _ = self.scheduler.add_system(lambda ecs, dt: dts.append(dt), name="s")
+        self.scheduler.listen(event_manager)
+
+        event_manager.emit(UpdateTick(dt=0.5))
+        self.assertTrue(event_manager.join(timeout=5))
+        event_manager.shutdown()
+
+        self.assertEqual(dts, [0.5])
+
+    def test_commands_applied_after_each_stage(self):
+        scheduler = Scheduler(self.ecs, stages=["spawn", "count"])
+        counts: list[int] = []
+
+        def spawner(ecs: ECS, dt: float) -> None:
+            ecs.commands.spawn([Position()])
+            counts.append(len(ecs.query([Position])[0]))
+
+        def counter(ecs: ECS, dt: float) -> None:
+            counts.append(len(ecs.query([Position])[0]))
+
+        _ = scheduler.add_system(spawner, writes=[Position], stage="spawn")
+        _ = scheduler.add_system(counter, reads=[Position], stage="count")
+        scheduler.run(0.0)
+        scheduler.shutdown()
+
+        self.assertEqual(counts, [0, 1])
@@ -0,0 +1,145 @@
+import os
+import tempfile
+import unittest
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.engine.constants import (
+    COMPONENT_STORAGE_COLUMNAR,
+    COMPONENT_STORAGE_SPARSE,
+)
+from src.engine.ecs import ECS, ArrayColumn, Changed, Component
+from src.engine.ecs.snapshot import load, save
+
+
+@dataclass
+class Position(Component):
+    storage = COMPONENT_STORAGE_COLUMNAR
+    x: float = 0.0
+    y: float = 0.0
+
+
+@dataclass
+class Health(Component):
+    value: int = 100
+    alive: bool = True
+
+
+@dataclass
+class Tag(Component): ...
+
+
+@dataclass
+class Selected(Component):
+    storage = COMPONENT_STORAGE_SPARSE
+    weight: float = 1.0
+
+
+@dataclass
+class Name(Component):
+    value: str = ""
+
+
+COMPONENT_TYPES = [Position, Health, Tag, Selected]
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "world.ecs")
+
+        self.ecs = ECS()
+        self.entities = self.ecs.spawn_batch(
+            3,
+            {
+                Position: np.array([[0, 1], [2, 3], [4, 5]], dtype=float),
+                Health: [Health(value=i, alive=i != 1) for i in range(3)],
+            },
+        )
+        self.tagged = self.ecs.spawn_batch(2, {Health: [Health()] * 2})
+        self.ecs.add_component(self.tagged[1], Tag())
+        self.ecs.add_component(self.entities[2], Selected(weight=0.5))
+        self.ecs.remove(self.entities[0])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        size = save(self.ecs, self.path)
+        self.assertEqual(size, os.path.getsize(self.path))
+
+        loaded = load(self.path, COMPONENT_TYPES)
+        self.assertEqual(dict(loaded.types), dict(self.ecs.types))
+        self.assertEqual(dict(loaded.entities), dict(self.ecs.entities))
+        self.assertEqual(loaded.entity_rows, self.ecs.entity_rows)
+
+        entities, components = loaded.query([Position, Health])
+        self.assertEqual(entities, self.entities[1:][::-1])
+        np.testing.assert_array_equal(components[Position], [[4, 5], [2, 3]])
+        self.assertEqual(
+            components[Health], [Health(2, True), Health(1, False)]
+        )
+
+        entities, _ = loaded.query([Health], with_=[Tag])
+        self.assertEqual(entities, [self.tagged[1]])
+        self.assertEqual(
+            loaded.sparse[Selected].get(self.entities[2]), Selected(0.5)
+        )
+
+    def test_entity_ids_keep_recycling(self):
+        save(self.ecs, self.path)
+        loaded = load(self.path, COMPONENT_TYPES)
+
+        self.assertFalse(loaded.is_alive(self.entities[0]))
+        self.assertEqual(loaded.spawn(), self.ecs.spawn())
+
+    def test_change_ticks_survive(self):
+        since = self.ecs.advance_tick()
+        self.ecs.mark_changed(self.tagged[0], Health)
+        save(self.ecs, self.path)
+
+        loaded = load(self.path, COMPONENT_TYPES)
+        self.assertEqual(loaded.change_tick, self.ecs.change_tick)
+        entities, _ = loaded.query([Health], [Changed[Health]], since=since)
+        self.assertEqual(entities, [self.tagged[0]])
+
+    def test_columnar_components_are_mapped(self):
+        save(self.ecs, self.path)
+        loaded = load(self.path, COMPONENT_TYPES)
+
+        archetype, _ = loaded.entities[self.entities[1]]
+        column = loaded.components[archetype][Position]
+        assert isinstance(column, ArrayColumn)
+        self.assertFalse(column.data.flags.owndata)
+
+        # copy-on-write, the file itself stays untouched.
+        column.view()[:] = 0
+        column.append(Position(x=9.0))
+        reloaded = load(self.path, COMPONENT_TYPES)
+        _, components = reloaded.query([Position])
+        np.testing.assert_array_equal(components[Position], [[4, 5], [2, 3]])
+
+    def test_non_numeric_components_are_rejected(self):
+        self.ecs.add_component(self.tagged[0], Name("bob"))
+
+        with self.assertRaises(TypeError):
+            save(self.ecs, self.path)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_unknown_component_types_are_rejected(self):
+        save(self.ecs, self.path)
+
+        with self.assertRaises(KeyError):
+            _ = load(self.path, [Position, Health, Tag])
+
+    def test_not_a_snapshot(self):
+        with open(self.path, "wb") as file:
+            _ = file.write(b"definitely not a snapshot")
+
+        with self.assertRaises(ValueError):
+            _ = load(self.path, COMPONENT_TYPES)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.engine.constants import COMPONENT_STORAGE_COLUMNAR
+from src.engine.ecs import ECS, Component, SpatialIndex
+
+
+@dataclass
+class Position(Component):
+    storage = COMPONENT_STORAGE_COLUMNAR
+    x: float = 0.0
+    y: float = 0.0
+
+
+@dataclass
+class Point(Component):
+    x: float = 0.0
+    y: float = 0.0
+    z: float = 0.0
+
+
+@dataclass
+class Tag(Component): ...
+
+
+class TestHooks(unittest.TestCase):
+    def setUp(self):
+        self.ecs = ECS()
+        self.added: list[int] = []
+        self.removed: list[int] = []
+        self.ecs.add_hooks(
+            Point, on_add=self.added.append, on_remove=self.removed.append
+        )
+
+    def test_add_and_remove(self):
+        entities = self.ecs.spawn_batch(2, {Point: [Point(), Point()]})
+        entity = self.ecs.spawn()
+        self.ecs.add_component(entity, Point())
+        self.assertEqual(self.added, [*entities, entity])
+
+        self.ecs.remove_component(entity, Point)
+        self.ecs.remove_component(entity, Point)
+        self.ecs.remove_batch(entities)
+        self.assertEqual(self.removed, [entity, *entities])
+
+    def test_set_components(self):
+        entity = self.ecs.spawn()
+        self.ecs.set_components(entity, [Point(), Tag()])
+        self.ecs.set_components(entity, [Tag()])
+        self.assertEqual((self.added, self.removed), ([entity], [entity]))
+
+    def test_moves_run_no_hooks(self):
+        entity = self.ecs.spawn()
+        self.ecs.add_component(entity, Point())
+        self.ecs.add_component(entity, Tag())
+        self.ecs.remove_component(entity, Tag)
+        self.assertEqual((self.added, self.removed), ([entity], []))
+
+    def test_remove_hooks(self):
+        self.ecs.remove_hooks(
+            Point, on_add=self.added.append, on_remove=self.removed.append
+        )
+        self.ecs.remove(self.ecs.spawn_batch(1, {Point: [Point()]})[0])
+        self.assertEqual((self.added, self.removed), ([], []))
+        self.assertNotIn(Point, self.ecs.hooks)
+
+
+class TestSpatialIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        self.positions = rng.uniform(-20, 20, (500, 2))
+        self.ecs = ECS()
+        self.entities = self.ecs.spawn_batch(
+            len(self.positions), {Position: self.positions.copy()}
+        )
+        self.index = SpatialIndex(self.ecs, Position, cell_size=3.0)
+        self.assertEqual(self.index.sync(), len(self.entities))
+
+    def brute_force(self, center, radius):
+        distances = np.linalg.norm(self.positions - center, axis=1)
+        return {self.entities[i] for i in np.flatnonzero(distances <= radius)}
+
+    def test_query_radius(self):
+        for center, radius in [((0, 0), 2.5), ((10, -5), 7.0), ((50, 50), 1)]:
+            self.assertEqual(
+                set(self.index.query_radius(center, radius)),
+                self.brute_force(np.array(center), radius),
+            )
+
+    def test_query_aabb(self):
+        low, high = np.array([-4, 1]), np.array([6, 9.5])
+        inside = ((self.positions >= low) & (self.positions <= high)).all(1)
+        self.assertEqual(
+            set(self.index.query_aabb(low, high)),
+            {self.entities[i] for i in np.flatnonzero(inside)},
+        )
+        self.assertEqual(
+            len(self.index.query_aabb((-100, -100), (100, 100))),
+            len(self.entities),
+        )
+
+    def test_pairs(self):
+        for radius in (1.5, 4.0):
+            differences = self.positions[:, None] - self.positions[None]
+            close = np.linalg.norm(differences, axis=2) <= radius
+            first, second = np.nonzero(np.triu(close, k=1))
+            expected = {
+                frozenset((self.entities[a], self.entities[b]))
+                for a, b in zip(first, second)
+            }
+
+            pairs = self.index.pairs(radius)
+            self.assertEqual(pairs.shape, (len(expected), 2))
+            self.assertEqual({frozenset(pair) for pair in pairs}, expected)
+
+    def test_sync_picks_up_changes(self):
+        entity = self.entities[0]
+        self.assertEqual(self.index.sync(), 0)
+
+        for entities, (columns,) in self.ecs.query_chunks(
+            Position, mutable=[Position]
+        ):
+            columns[entities.index(entity)] = (100.0, 100.0)
+        self.index.sync()
+        self.assertEqual(self.index.query_radius((100, 100), 0.5), [entity])
+        self.assertEqual(self.index.position(entity), (100.0, 100.0))
+
+        spawned = self.ecs.spawn()
+        self.ecs.add_component(spawned, Position(x=-100.0, y=-100.0))
+        self.assertEqual(self.index.sync(), 1)
+        self.assertEqual(self.index.cell_of((-100, -100)), (-34, -34))
+        self.assertEqual(self.index.query_radius((-100, -100), 1), [spawned])
+
+    def test_removed_entities_are_dropped(self):
+        self.ecs.remove(self.entities[0])
+        self.ecs.remove_component(self.entities[1], Position)
+        self.assertNotIn(self.entities[0], self.index)
+        self.assertNotIn(self.entities[1], self.index)
+        self.assertEqual(len(self.index), len(self.entities) - 2)
+        self.assertEqual(
+            sum(map(len, self.index.cells.values())), len(self.index)
+        )
+
+        self.index.close()
+        self.ecs.remove(self.entities[2])
+        self.assertIn(self.entities[2], self.index)
+
+    def test_table_storage_3d(self):
+        ecs = ECS()
+        entities = ecs.spawn_batch(
+            3, {Point: [Point(0, 0, 0), Point(0, 0, 1), Point(5, 5, 5)]}
+        )
+        index = SpatialIndex(ecs, Point, cell_size=1.0)
+        index.sync()
+
+        self.assertEqual(
+            set(index.query_radius((0, 0, 0), 1)), set(entities[:2])
+        )
+        pairs = [sorted(pair) for pair in index.pairs(1.0).tolist()]
+        self.assertEqual(pairs, [sorted(entities[:2])])
+
+
+if __name__ == "__main__":
+    unittest.main()
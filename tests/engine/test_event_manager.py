@@ -0,0 +1,519 @@
+import threading
+import time
+import unittest
+from dataclasses import dataclass
+from functools import partial
+
+from src.engine.constants import (
+    EVENT_COALESCE_ALL,
+    EVENT_COALESCE_LATEST,
+    EVENT_COALESCE_SUM,
+    EVENT_QUEUE_DROP_NEWEST,
+    EVENT_QUEUE_DROP_OLDEST,
+)
+from src.engine.event_manager import Event, EventManager
+from src.engine.event_stats import (
+    RATE_WINDOW_NS,
+    LatencyHistogram,
+    listener_name,
+)
+from src.engine.events import DrawCall, KeyEvent, MouseMoveEvent, UpdateTick
+from src.engine.types import KeyState
+
+
+@dataclass
+class Moved(Event):
+    x: int
+
+
+@dataclass
+class Pressed(Event):
+    key: str
+
+
+@dataclass
+class Scrolled(Event):
+    dx: float
+    dy: int
+    inverted: bool = False
+
+
+@dataclass
+class Frame(Event):
+    dt: float
+
+
+@dataclass
+class Dragged(Moved):
+    button: int = 0
+
+
+class TestEventManager(unittest.TestCase):
+    def setUp(self):
+        self.events = EventManager(workers=2)
+
+    def tearDown(self):
+        self.events.shutdown()
+
+    def test_synchronous_listeners(self):
+        received = []
+        self.events.listen(Moved, received.append)
+        self.events.emit(Moved(1))
+        self.events.emit(Pressed("A"))
+        self.assertEqual(received, [Moved(1)])
+
+    def test_threadsafe_listeners_without_event_loop(self):
+        received = []
+        threads = set()
+
+        def listener(event):
+            received.append(event.x)
+            threads.add(threading.current_thread().name)
+
+        self.events.listen(Moved, listener, threadsafe=True)
+        emitter = threading.Thread(
+            target=lambda: [self.events.emit(Moved(i)) for i in range(500)]
+        )
+        emitter.start()
+        emitter.join()
+
+        self.assertTrue(self.events.join(timeout=5))
+        self.assertEqual(received, list(range(500)))
+        self.assertTrue(all(t.startswith("EventDispatcher") for t in threads))
+        self.assertLessEqual(
+            threading.active_count(), 2 + self.events.dispatcher.workers
+        )
+
+    def test_backpressure_delivers_everything(self):
+        received = []
+        release = threading.Event()
+
+        def slow(event):
+            release.wait()
+            received.append(event.x)
+
+        self.events.listen(Moved, slow, threadsafe=True, queue_size=2)
+        emitter = threading.Thread(
+            target=lambda: [self.events.emit(Moved(i)) for i in range(10)]
+        )
+        emitter.start()
+        emitter.join(timeout=0.2)
+        self.assertTrue(emitter.is_alive())
+
+        release.set()
+        emitter.join(timeout=5)
+        self.assertTrue(self.events.join(timeout=5))
+        self.assertEqual(received, list(range(10)))
+
+    def test_drop_policies(self):
+        latest, earliest = [], []
+        release = threading.Event()
+
+        def blocked(received):
+            def listener(event):
+                release.wait()
+                received.append(event.x)
+
+            return listener
+
+        self.events.listen(
+            Moved,
+            blocked(latest),
+            threadsafe=True,
+            queue_size=1,
+            policy=EVENT_QUEUE_DROP_OLDEST,
+        )
+        self.events.listen(
+            Moved,
+            blocked(earliest),
+            threadsafe=True,
+            queue_size=1,
+            policy=EVENT_QUEUE_DROP_NEWEST,
+        )
+
+        # the first event is taken by a worker right away.
+        self.events.emit(Moved(0))
+        self.assertTrue(
+            self.wait_until(lambda: not self.events.dispatcher._ready)
+        )
+        for i in range(1, 10):
+            self.events.emit(Moved(i))
+        release.set()
+        self.assertTrue(self.events.join(timeout=5))
+
+        self.assertEqual(latest, [0, 9])
+        self.assertEqual(earliest, [0, 1])
+        queues = self.events.threadsafe_listeners[Moved]
+        self.assertEqual([queue.dropped for queue in queues], [8, 8])
+
+    def test_failing_listener_keeps_workers_alive(self):
+        received = []
+
+        def failing(event):
+            raise RuntimeError(event)
+
+        self.events.listen(Moved, failing, threadsafe=True)
+        self.events.listen(Moved, received.append, threadsafe=True)
+        with self.assertLogs("EventDispatcher", level="ERROR"):
+            self.events.emit(Moved(1))
+            self.assertTrue(self.events.join(timeout=5))
+        self.events.emit(Moved(2))
+        self.assertTrue(self.events.join(timeout=5))
+        self.assertEqual(received, [Moved(1), Moved(2)])
+
+    def test_emit_after_shutdown(self):
+        self.events.listen(Moved, lambda event: None, threadsafe=True)
+        self.events.shutdown()
+        with self.assertRaises(RuntimeError):
+            self.events.emit(Moved(1))
+
+    @staticmethod
+    def wait_until(condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.01)
+        return False
+
+
+class TestCoalescing(unittest.TestCase):
+    def setUp(self):
+        self.events = EventManager(workers=1)
+        self.received = []
+        self.events.listen(Moved, self.received.append)
+        self.events.listen(Scrolled, self.received.append)
+        self.events.listen(Frame, self.received.append)
+
+    def tearDown(self):
+        self.events.shutdown()
+
+    def test_latest(self):
+        queue = self.events.queue(Moved, Frame, EVENT_COALESCE_LATEST)
+        for x in range(100):
+            self.events.emit(Moved(x))
+        self.assertEqual(self.received, [])
+        self.assertEqual(len(queue), 1)
+
+        self.events.emit(Frame(0.1))
+        self.assertEqual(self.received, [Moved(99), Frame(0.1)])
+        self.assertEqual((queue.received, queue.dispatched), (100, 1))
+
+        # an empty queue dispatches nothing.
+        self.events.emit(Frame(0.2))
+        self.assertEqual(self.received[2:], [Frame(0.2)])
+
+    def test_sum(self):
+        _ = self.events.queue(Scrolled, Frame, EVENT_COALESCE_SUM)
+        self.events.emit(Scrolled(0.5, 1))
+        self.events.emit(Scrolled(0.25, -3, inverted=True))
+        self.events.emit(Scrolled(1.0, 1, inverted=True))
+        self.events.emit(Frame(0.1))
+        self.assertEqual(
+            self.received, [Scrolled(1.75, -1, inverted=True), Frame(0.1)]
+        )
+
+    def test_all(self):
+        _ = self.events.queue(Moved, Frame, EVENT_COALESCE_ALL)
+        self.events.emit(Moved(1))
+        self.events.emit(Moved(2))
+        self.assertEqual(self.received, [])
+        self.events.emit(Frame(0.1))
+        self.assertEqual(self.received, [Moved(1), Moved(2), Frame(0.1)])
+
+    def test_queues_drain_on_their_own_frame_event(self):
+        _ = self.events.queue(Moved, Frame, EVENT_COALESCE_LATEST)
+        _ = self.events.queue(Scrolled, Pressed, EVENT_COALESCE_SUM)
+        self.events.emit(Moved(1))
+        self.events.emit(Scrolled(1.0, 1))
+        self.events.emit(Frame(0.1))
+        self.assertEqual(self.received, [Moved(1), Frame(0.1)])
+
+        self.events.emit(Moved(2))
+        self.assertEqual(self.events.flush(), 2)
+        self.assertEqual(self.received[2:], [Moved(2), Scrolled(1.0, 1)])
+
+    def test_threadsafe_listeners_of_queued_events(self):
+        threadsafe = []
+        self.events.listen(Moved, threadsafe.append, threadsafe=True)
+        _ = self.events.queue(Moved, Frame, EVENT_COALESCE_LATEST)
+
+        emitters = [
+            threading.Thread(
+                target=lambda: [self.events.emit(Moved(x)) for x in range(100)]
+            )
+            for _ in range(4)
+        ]
+        for emitter in emitters:
+            emitter.start()
+        for emitter in emitters:
+            emitter.join()
+        self.events.emit(Frame(0.1))
+        self.assertTrue(self.events.join(timeout=5))
+        self.assertEqual(threadsafe, [Moved(99)])
+
+    def test_invalid_queues(self):
+        _ = self.events.queue(Moved, Frame)
+        with self.assertRaises(ValueError):
+            _ = self.events.queue(Moved, Pressed)
+        with self.assertRaises(ValueError):
+            _ = self.events.queue(Frame, Frame)
+        with self.assertRaises(ValueError):
+            _ = self.events.queue(Pressed, Frame, "first")
+
+
+class TestDispatchTables(unittest.TestCase):
+    def setUp(self):
+        self.events = EventManager(workers=1)
+        self.calls = []
+
+    def tearDown(self):
+        self.events.shutdown()
+
+    def listener(self, name):
+        return lambda event: self.calls.append((name, type(event).__name__))
+
+    def test_base_class_listeners(self):
+        self.events.listen(Event, self.listener("any"))
+        self.events.listen(Moved, self.listener("moved"))
+        self.events.listen(Dragged, self.listener("dragged"))
+
+        self.events.emit(Dragged(1))
+        self.events.emit(Moved(1))
+        self.events.emit(Pressed("A"))
+        self.assertEqual(
+            self.calls,
+            [
+                ("dragged", "Dragged"),
+                ("moved", "Dragged"),
+                ("any", "Dragged"),
+                ("moved", "Moved"),
+                ("any", "Moved"),
+                ("any", "Pressed"),
+            ],
+        )
+
+    def test_priorities(self):
+        self.events.listen(Moved, self.listener("first"))
+        self.events.listen(Event, self.listener("early"), priority=10)
+        self.events.listen(Moved, self.listener("second"))
+        self.events.listen(Dragged, self.listener("late"), priority=-1)
+
+        self.events.emit(Dragged(1))
+        self.assertEqual(
+            [name for name, _ in self.calls],
+            ["early", "first", "second", "late"],
+        )
+
+    def test_threadsafe_base_class_listeners(self):
+        received = []
+        self.events.listen(Moved, received.append, threadsafe=True)
+        self.events.emit(Dragged(1))
+        self.events.emit(Pressed("A"))
+        self.assertTrue(self.events.join(timeout=5))
+        self.assertEqual(received, [Dragged(1)])
+
+    def test_tables_are_rebuilt_when_listeners_change(self):
+        self.events.listen(Moved, self.listener("first"))
+        table = self.events.dispatch_table(Dragged)
+        self.assertIs(self.events.dispatch_table(Dragged), table)
+        self.assertEqual(len(table.callbacks), 1)
+        self.assertEqual(table.queues, ())
+
+        self.events.listen(Event, self.listener("second"))
+        table = self.events.dispatch_table(Dragged)
+        self.assertEqual(len(table.callbacks), 2)
+        self.events.listen(Moved, self.listener("third"), threadsafe=True)
+        self.assertEqual(len(self.events.dispatch_table(Dragged).queues), 1)
+
+    def test_queued_subclasses_reach_base_listeners(self):
+        self.events.listen(Moved, self.listener("moved"))
+        _ = self.events.queue(Dragged, Frame, EVENT_COALESCE_LATEST)
+        self.events.emit(Dragged(1))
+        self.events.emit(Dragged(2))
+        self.assertEqual(self.calls, [])
+        self.events.emit(Frame(0.1))
+        self.assertEqual(self.calls, [("moved", "Dragged")])
+
+
+class TestEventStats(unittest.TestCase):
+    def setUp(self):
+        self.events = EventManager(workers=1)
+
+    def tearDown(self):
+        self.events.shutdown()
+
+    def test_histogram(self):
+        histogram = LatencyHistogram()
+        for ns in [500] * 90 + [5_000] * 9 + [3_000_000]:
+            histogram.record(ns)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.max_ns, 3_000_000)
+        self.assertEqual(histogram.percentile(50), 1024)
+        self.assertEqual(histogram.percentile(95), 8192)
+        self.assertEqual(histogram.percentile(100), 3_000_000)
+        self.assertAlmostEqual(histogram.mean_ns, 30_900.0)
+        self.assertEqual(LatencyHistogram().percentile(50), 0)
+
+    def test_disabled_by_default(self):
+        received = []
+        self.events.listen(Moved, received.append)
+        self.events.emit(Moved(1))
+        self.assertIsNone(self.events.stats)
+        self.assertEqual(received, [Moved(1)])
+
+    def test_listener_latencies(self):
+        stats = self.events.enable_stats(budget_ms=1.0)
+
+        def slow(event):
+            time.sleep(0.002)
+
+        def fast(event):
+            pass
+
+        self.events.listen(Moved, fast)
+        self.events.listen(Moved, slow)
+        self.events.listen(Moved, slow, threadsafe=True)
+        with self.assertLogs("EventStats", level="WARNING") as logs:
+            for x in range(3):
+                self.events.emit(Moved(x))
+            self.assertTrue(self.events.join(timeout=5))
+
+        self.assertEqual(stats.counts, {Moved: 3})
+        self.assertEqual(
+            [s.name for s in stats.slowest()][-1], fast.__qualname__
+        )
+        slowest = stats.slowest(1)[0]
+        self.assertEqual(slowest.histogram.count, 6)
+        self.assertGreaterEqual(slowest.last_ns, 2_000_000)
+        self.assertEqual(stats.over_budget(), [slowest])
+        self.assertEqual(slowest.over_budget, 6)
+        # only the first call over budget is logged.
+        self.assertEqual(len(logs.output), 1)
+
+    def test_failing_listeners_are_timed(self):
+        stats = self.events.enable_stats()
+
+        def failing(event):
+            raise RuntimeError(event)
+
+        self.events.listen(Moved, failing)
+        with self.assertRaises(RuntimeError):
+            self.events.emit(Moved(1))
+        self.assertEqual(stats.listeners[failing].histogram.count, 1)
+
+    def test_listener_names(self):
+        def listener(prefix, event):
+            pass
+
+        self.assertEqual(
+            listener_name(partial(listener, "moved")), listener.__qualname__
+        )
+        self.assertEqual(listener_name(print), "print")
+
+    def test_rates(self):
+        stats = self.events.enable_stats()
+        _ = self.events.queue(Moved, Frame)
+        for x in range(30):
+            self.events.emit(Moved(x))
+        self.events.emit(Frame(0.1))
+        self.assertEqual(stats.counts, {Moved: 30, Frame: 1})
+
+        start = stats._window_start  # pyright: ignore[reportPrivateUsage]
+        stats._roll_window(start + 2 * RATE_WINDOW_NS)  # pyright: ignore[reportPrivateUsage]
+        self.assertEqual(stats.rates(), {Moved: 15.0, Frame: 0.5})
+
+    def test_disable(self):
+        stats = self.events.enable_stats()
+        self.events.listen(Moved, lambda event: None)
+        self.events.emit(Moved(1))
+        self.events.disable_stats()
+        self.events.emit(Moved(2))
+        self.assertIsNone(self.events.stats)
+        self.assertEqual(stats.counts, {Moved: 1})
+
+        stats.reset()
+        self.assertEqual((stats.counts, stats.listeners), ({}, {}))
+
+
+class TestReusedEvents(unittest.TestCase):
+    def setUp(self):
+        self.events = EventManager(workers=1)
+
+    def tearDown(self):
+        self.events.shutdown()
+
+    def test_engine_events_are_slotted(self):
+        for event in (
+            DrawCall(0.1),
+            UpdateTick(0.1),
+            MouseMoveEvent(1, 2),
+            KeyEvent("A", KeyState.PRESS),
+        ):
+            self.assertFalse(hasattr(event, "__dict__"))
+            with self.assertRaises(AttributeError):
+                event.unknown = 1
+
+    def test_synchronous_listeners_get_the_instance(self):
+        received = []
+        self.events.listen(DrawCall, lambda event: received.append(event))
+        draw_call = self.events.reuse(DrawCall(0.0))
+        for dt in (0.1, 0.2):
+            draw_call.dt = dt
+            self.events.emit(draw_call)
+        self.assertEqual([id(event) for event in received], [id(draw_call)] * 2)
+
+    def test_held_events_are_copied(self):
+        release = threading.Event()
+        received = []
+
+        def slow(event):
+            release.wait()
+            received.append(event.dt)
+
+        self.events.listen(DrawCall, slow, threadsafe=True)
+        _ = self.events.queue(UpdateTick, Frame)
+        self.events.listen(UpdateTick, lambda event: received.append(event.dt))
+
+        draw_call = self.events.reuse(DrawCall(0.0))
+        update_tick = self.events.reuse(UpdateTick(0.0))
+        for dt in (0.1, 0.2):
+            draw_call.dt = update_tick.dt = dt
+            self.events.emit(draw_call)
+            self.events.emit(update_tick)
+        draw_call.dt = update_tick.dt = 0.3
+
+        release.set()
+        self.assertTrue(self.events.join(timeout=5))
+        self.assertEqual(received, [0.1, 0.2])
+        self.events.emit(Frame(0.0))
+        self.assertEqual(received[2:], [0.1, 0.2])
+
+    def test_threadsafe_listeners_get_a_copy(self):
+        synchronous, threadsafe = [], []
+        self.events.listen(DrawCall, synchronous.append)
+        self.events.listen(DrawCall, threadsafe.append, threadsafe=True)
+
+        draw_call = self.events.reuse(DrawCall(0.1))
+        self.events.emit(draw_call)
+        self.assertTrue(self.events.join(timeout=5))
+
+        self.assertIs(synchronous[0], draw_call)
+        self.assertIsNot(threadsafe[0], draw_call)
+        self.assertEqual(threadsafe[0], draw_call)
+
+    def test_released_events_are_no_longer_copied(self):
+        received = []
+        self.events.listen(DrawCall, received.append, threadsafe=True)
+        draw_call = self.events.reuse(DrawCall(0.1))
+
+        self.events.release(draw_call)
+        self.events.release(draw_call)
+        self.events.emit(draw_call)
+        self.assertTrue(self.events.join(timeout=5))
+        self.assertIs(received[0], draw_call)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import threading
+import unittest
+
+from src.engine.constants import (
+    FRAME_STAGE_POST_UPDATE,
+    FRAME_STAGE_PRE_UPDATE,
+    FRAME_STAGE_RENDER,
+    FRAME_STAGE_UPDATE,
+)
+from src.engine.ecs import ECS, Scheduler
+from src.engine.event_manager import EventManager
+from src.engine.events import DrawCall, UpdateTick
+from src.engine.frame_schedule import FrameSchedule
+
+
+class TestFrameSchedule(unittest.TestCase):
+    def setUp(self):
+        self.events = EventManager(workers=1)
+        self.schedule = FrameSchedule(self.events, max_workers=4)
+        self.calls = []
+
+    def tearDown(self):
+        self.schedule.shutdown()
+        self.events.shutdown()
+
+    def listener(self, name):
+        def callback(event):
+            self.calls.append(name)
+
+        return callback
+
+    def add(self, name, stage=FRAME_STAGE_UPDATE, **kwargs):
+        return self.schedule.add(
+            self.listener(name), stage, name=name, **kwargs
+        )
+
+    def test_stages_run_in_order(self):
+        _ = self.add("render", FRAME_STAGE_RENDER)
+        _ = self.add("post", FRAME_STAGE_POST_UPDATE)
+        _ = self.add("update", FRAME_STAGE_UPDATE)
+        _ = self.add("pre", FRAME_STAGE_PRE_UPDATE)
+
+        self.events.emit(DrawCall(dt=0.1))
+        self.assertEqual(self.calls, ["pre", "update", "post", "render"])
+        self.events.emit(UpdateTick(dt=0.1))
+        self.assertEqual(len(self.calls), 4)
+
+    def test_ordering_constraints(self):
+        _ = self.add("camera", after=["input"])
+        _ = self.add("physics", before=["camera"])
+        _ = self.add("input")
+        _ = self.add("audio")
+
+        self.events.emit(DrawCall(dt=0.1))
+        self.assertLess(self.calls.index("input"), self.calls.index("camera"))
+        self.assertLess(self.calls.index("physics"), self.calls.index("camera"))
+
+        batches = self.schedule.stages[FRAME_STAGE_UPDATE].batches
+        self.assertEqual(
+            [[listener.name for listener in batch] for batch in batches],
+            [["physics", "input", "audio"], ["camera"]],
+        )
+
+    def test_cross_stage_constraints(self):
+        _ = self.add("render", FRAME_STAGE_RENDER, after=["camera"])
+        _ = self.add("camera", before=["render"])
+        self.events.emit(DrawCall(dt=0.1))
+        self.assertEqual(self.calls, ["camera", "render"])
+
+        _ = self.add("late", FRAME_STAGE_RENDER, before=["camera"])
+        with self.assertRaises(ValueError):
+            self.events.emit(DrawCall(dt=0.1))
+
+    def test_invalid_constraints(self):
+        _ = self.add("a", after=["b"])
+        _ = self.add("b", after=["a"])
+        with self.assertRaises(ValueError):
+            self.schedule.run(DrawCall(dt=0.1))
+
+        self.schedule.remove("b")
+        _ = self.add("b", after=["missing"])
+        with self.assertRaises(ValueError):
+            self.schedule.run(DrawCall(dt=0.1))
+
+    def test_registration_errors(self):
+        _ = self.add("a")
+        with self.assertRaises(ValueError):
+            _ = self.add("a", FRAME_STAGE_RENDER)
+        with self.assertRaises(KeyError):
+            _ = self.add("b", "physics")
+
+    def test_threadsafe_listeners_run_in_parallel(self):
+        barrier = threading.Barrier(2, timeout=5)
+        threads = []
+
+        def parallel(event):
+            threads.append(threading.current_thread().name)
+            _ = barrier.wait()
+
+        _ = self.schedule.add(parallel, name="first", threadsafe=True)
+        _ = self.schedule.add(parallel, name="second", threadsafe=True)
+        _ = self.add("main")
+        _ = self.add("after", after=["first", "second"])
+
+        self.events.emit(DrawCall(dt=0.1))
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(t.startswith("frame-listener") for t in threads))
+        self.assertEqual(self.calls, ["main", "after"])
+
+    def test_exceptions_after_batch(self):
+        def failing(event):
+            raise RuntimeError("boom")
+
+        _ = self.schedule.add(failing, name="failing", threadsafe=True)
+        _ = self.add("sibling")
+        _ = self.add("next", after=["failing"])
+
+        with self.assertRaises(RuntimeError):
+            self.events.emit(DrawCall(dt=0.1))
+        self.assertEqual(self.calls, ["sibling"])
+
+    def test_timings_and_stats(self):
+        stats = self.events.enable_stats()
+        listener = self.add("update")
+        self.events.emit(DrawCall(dt=0.1))
+        self.events.emit(DrawCall(dt=0.1))
+
+        self.assertEqual(listener.runs, 2)
+        self.assertIn("update", self.schedule.timings())
+        self.assertEqual(stats.listeners[listener.callback].histogram.count, 2)
+
+    def test_shared_executor(self):
+        scheduler = Scheduler(ECS(), executor=self.schedule.executor)
+        barrier = threading.Barrier(2, timeout=5)
+        threads = []
+
+        def system(ecs, dt):
+            threads.append(threading.current_thread().name)
+            _ = barrier.wait()
+
+        _ = scheduler.add_system(system, name="first")
+        _ = scheduler.add_system(system, name="second")
+        scheduler.run(0.1)
+        scheduler.shutdown()
+
+        self.assertTrue(all(t.startswith("frame-listener") for t in threads))
+        _ = self.add("update")
+        self.events.emit(DrawCall(dt=0.1))
+        self.assertEqual(self.calls, ["update"])
+
+
+if __name__ == "__main__":
+    unittest.main()
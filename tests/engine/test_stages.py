@@ -0,0 +1,15 @@
+import unittest
+
+from src.engine.stages import StagedRunner, Task
+
+
+class TestStagedRunner(unittest.TestCase):
+    def test_subclasses_must_pack_stages(self):
+        class Unpacked(StagedRunner[Task]): ...
+
+        with self.assertRaises(TypeError):
+            _ = Unpacked(["update"], max_workers=1, thread_name_prefix="test")
+
+
+if __name__ == "__main__":
+    unittest.main()